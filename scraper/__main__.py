@@ -1,54 +1,263 @@
+import sys
 import argparse
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
 
 import pandas as pd
 
 from .src.program_page import get_pagination, scrape_data_from_pages
-from .src.placement_page import update_placement
-from .src.database import update_dataset
+from .src.placement_page import update_placement, fetch_placement_history
+from .src.database import update_dataset, load_dataset, dataset_lock, _get_latest_version
+from .src.aggregates import export_aggregates
+from .src.review_queue import review_pending
+from .src.reextract import reextract_programs, select_programs, PLACEMENT_COLUMNS
+from .src.metrics import program_context, with_program, export_metrics, summary_table
 from .src.utils import read_programs, load_logging
 
 
-def main(filename: str) -> pd.DataFrame:
+def main(filename: str, headless: bool = False, selected: Optional[List[str]] = None) -> pd.DataFrame:
     """
     Main function to scrape data for a list of programs.
 
+    The placement history of every program is fetched in the background while the program pages are scraped.
+    Metrics of the run are exported and summarized at the end.
+
     Args:
         filename (str): The file with program URLs.
+        headless (bool): If True, search modules are validated without user input,
+            and questionable extractions are queued for review.
+        selected (Optional[List[str]]): University names or program URLs to scrape. If given, only these programs
+            are scraped and their existing entries are replaced. Default is all programs, merged into the dataset.
     Returns:
         pd.DataFrame: The object with scraped data.
     """
-    programs = read_programs(filename)
+    programs = select_programs(read_programs(filename), selected)
     data = pd.DataFrame()
 
-    for program_tuple in programs:
-        pagination = get_pagination(program_tuple)
-        data = scrape_data_from_pages(data, program_tuple, page_urls=pagination)
-        data = update_placement(data, placement_page=program_tuple[1], log=False)
-        update_dataset(data)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        histories = [
+            executor.submit(with_program, program_tuple[2], fetch_placement_history, program_tuple[1])
+            for program_tuple in programs
+        ]
+
+        for index, (program_tuple, history) in enumerate(zip(programs, histories)):
+            with program_context(program_tuple[2]):
+                pagination = get_pagination(program_tuple)
+                data = scrape_data_from_pages(data, program_tuple, page_urls=pagination, headless=headless)
+                data = _update_program_placement(data, program_tuple, history.result())
+                replace = [scraped[2] for scraped in programs[:index + 1]] if selected else None
+                update_dataset(data, replace=replace)
+
+    export_metrics()
+    logging.info("Run summary:\n" + summary_table())
 
     return data
 
 
-if __name__ == '__main__':
-    load_logging()
+def _update_program_placement(
+        data: pd.DataFrame,
+        program_tuple: Tuple[str, str, str],
+        history: Optional[pd.DataFrame]
+) -> pd.DataFrame:
+    """
+    Updates the placements of one program in the data scraped so far.
+
+    Only the entries of the program are matched against its placement page, so that the placements of the
+    programs scraped before are kept.
 
+    Args:
+        data (pd.DataFrame): The scraped data of all programs so far.
+        program_tuple (Tuple[str, str, str]): A tuple containing the base URL, placement URL, and program name.
+        history (Optional[pd.DataFrame]): Placement names with first-seen dates from fetch_placement_history.
+    Returns:
+        pd.DataFrame: The data with the placements of the program updated.
+    """
+    if 'University' not in data.columns:
+        return data
+    selected = data['University'] == program_tuple[2]
+    rows = update_placement(data[selected].copy(), placement_page=program_tuple[1], log=False, history=history)
+    return pd.concat([data[~selected], rows]).sort_index(kind='stable')
+
+
+def update_placements(filename: str, selected: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Updates only the placements of the programs in the existing dataset.
+
+    Program pages are not scraped. The placement history of each program is fetched, and the entries of the
+    programs whose placements changed are replaced in the dataset. Programs whose placement page yields no names,
+    e.g. when it cannot be fetched, keep their placements.
+
+    Args:
+        filename (str): The file with program URLs.
+        selected (Optional[List[str]]): University names or program URLs to update. Default is all programs.
+    Returns:
+        pd.DataFrame: The updated entries.
+    """
+    dataset = load_dataset()
+    data = pd.DataFrame()
+    universities = []
+
+    for program_tuple in select_programs(read_programs(filename), selected):
+        with program_context(program_tuple[2]):
+            rows = dataset[dataset['University'] == program_tuple[2]].reset_index(drop=True) \
+                if 'University' in dataset.columns else dataset
+            if rows.empty:
+                logging.info(f"No entries found for {program_tuple[2]}")
+                continue
+
+            history = fetch_placement_history(program_tuple[1])
+            if history is None or history.empty:
+                logging.warning(f"No placement names found for {program_tuple[2]}. Keeping the placements.")
+                continue
+
+            updated = update_placement(rows.copy(), placement_page=program_tuple[1], history=history)
+            columns = [column for column in PLACEMENT_COLUMNS if column in updated.columns]
+            if updated[columns].astype(object).equals(rows.reindex(columns=columns).astype(object)):
+                continue
+
+            data = pd.concat([data, updated], ignore_index=True)
+            universities.append(program_tuple[2])
+
+    if universities:
+        update_dataset(data, replace=universities)
+    else:
+        logging.info("No placement changes found. Skipping update.")
+
+    export_metrics()
+    return data
+
+
+def delete_programs(universities: List[str]) -> None:
+    """
+    Deletes the entries of the programs from the dataset.
+
+    Args:
+        universities (List[str]): The university names of the programs to delete.
+    """
+    dataset = load_dataset()
+    known = set(dataset['University']) if 'University' in dataset.columns else set()
+    for university in universities:
+        if university not in known:
+            logging.warning(f"No entries found for {university}")
+
+    universities = [university for university in universities if university in known]
+    if universities:
+        update_dataset(pd.DataFrame(), replace=universities)
+
+
+def _parse_args(argv: List[str]) -> argparse.Namespace:
+    """
+    Parses the command line arguments.
+
+    Without a command, the arguments are parsed as a full scrape of the programs file, as in earlier versions.
+
+    Args:
+        argv (List[str]): The command line arguments without the program name.
+    Returns:
+        argparse.Namespace: The parsed arguments with the 'command' attribute.
+    """
     parser = argparse.ArgumentParser(
+        prog="python -m scraper",
         description="Scrape appearance data and update placement."
     )
-    parser.add_argument(
+    subparsers = parser.add_subparsers(dest="command")
+
+    scrape = subparsers.add_parser("scrape", help="Scrape all programs in the file (default).")
+    scrape.add_argument(
         "file",
         nargs='?',
         default="public/programs.csv",
         type=str,
         help="The file with URLs."
     )
+    scrape.add_argument(
+        "--headless",
+        action="store_true",
+        help="Validate search modules without user input and queue questionable extractions for review."
+    )
+    scrape.add_argument(
+        "--review",
+        action="store_true",
+        help="Review the queued extractions instead of scraping."
+    )
+
+    program = subparsers.add_parser("program", help="Scrape the selected programs and replace their entries.")
+    program.add_argument(
+        "program",
+        nargs='+',
+        help="University names or program URLs to scrape."
+    )
+    program.add_argument(
+        "--headless",
+        action="store_true",
+        help="Validate search modules without user input and queue questionable extractions for review."
+    )
 
-    args = parser.parse_args()
+    placement = subparsers.add_parser("placement", help="Update only the placements of the existing entries.")
+    placement.add_argument(
+        "--program",
+        nargs='+',
+        help="University names or program URLs to update. Default is all programs in the file."
+    )
+
+    delete = subparsers.add_parser("delete", help="Delete the entries of programs from the dataset.")
+    delete.add_argument(
+        "university",
+        nargs='+',
+        help="University names of the programs to delete."
+    )
+
+    reextract = subparsers.add_parser(
+        "reextract",
+        help="Re-extract student data from locally stored pages without downloading."
+    )
+    reextract.add_argument(
+        "--program",
+        nargs='+',
+        help="University names or program URLs to re-extract. Default is all programs in the file."
+    )
+    reextract.add_argument(
+        "--workers",
+        type=int,
+        help="The number of worker processes. Default is the number of CPUs."
+    )
+
+    subparsers.add_parser("aggregates", help="Export the aggregate tables of the latest dataset version.")
 
-    if args.file is None:
-        new_data = main('../public/programs.csv')
+    for subparser in (program, placement, reextract):
+        subparser.add_argument(
+            "--file",
+            default="public/programs.csv",
+            type=str,
+            help="The file with URLs."
+        )
+
+    if not argv or argv[0] not in subparsers.choices and argv[0] not in ('-h', '--help'):
+        argv = ["scrape"] + argv
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    load_logging()
+
+    args = _parse_args(sys.argv[1:])
+
+    if args.command == "program":
+        main(args.file, headless=args.headless, selected=args.program)
+    elif args.command == "placement":
+        update_placements(args.file, selected=args.program)
+    elif args.command == "delete":
+        delete_programs(args.university)
+    elif args.command == "reextract":
+        reextract_programs(select_programs(read_programs(args.file), args.program), workers=args.workers)
+    elif args.command == "aggregates":
+        with dataset_lock():
+            export_aggregates(load_dataset(), _get_latest_version())
+    elif args.review:
+        review_pending()
     else:
-        new_data = main(args.file)
+        main(args.file, headless=args.headless)
 
 # todo: report
 
@@ -61,11 +270,8 @@ if __name__ == '__main__':
 
 # fixme: fix placement
 
-# todo: delete a program command
-
 # todo: pass error e to chat, but log only error info
 # todo: prompt only if name list changed
-# todo: update only placement
 # todo: add graduate page to the program tuple
 # todo: log every page, log at the end of url search
 # todo: handle empty name list, possible for pagination
@@ -0,0 +1,429 @@
+"""
+Benchmark harness for the scraper pipeline on a recorded corpus of snapshots.
+
+The corpus is recorded once from the Wayback Machine for the programs in a programs file, and then replayed
+without network access. Each run times the search modules, data processing, placement update, dataset merge
+and the end-to-end program scrape, with the data stages repeated on synthetic datasets scaled 10x and 100x.
+Results are saved as JSON, together with the commit they were measured on, and compared with a baseline.
+
+Usage:
+    python -m scraper.benchmark record [programs_file]
+    python -m scraper.benchmark run [--scales 1 10 100] [--repeat 3] [--save-baseline] [--compare FILE]
+
+Functions:
+    record_corpus(filename: str, corpus_dir: str = CORPUS_DIR) -> None:
+        Records the snapshots of the program and placement pages into the corpus.
+
+    run_benchmarks(scales: List[int], repeat: int, corpus_dir: str = CORPUS_DIR) -> dict:
+        Times the pipeline stages on the recorded corpus.
+
+    save_results(results: dict, baseline: bool = False) -> str:
+        Saves the benchmark results.
+
+    compare_results(results: dict, baseline_path: str) -> str:
+        Formats a comparison of the results with a baseline.
+"""
+
+import os
+import json
+import time
+import random
+import hashlib
+import logging
+import argparse
+import datetime
+import tempfile
+import statistics
+import subprocess
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from .src import program_page, placement_page
+from .src.program_page import fetch_pages, scrape_data_from_pages, _extract_timestamps_from_snapshot
+from .src.placement_page import update_placement, fetch_placement_history
+from .src.snapshot_url import get_snapshot_urls
+from .src.search_module import search_names
+from .src.selector_spec import spec_path
+from .src.database import process_data, _merge_and_save
+from .src.utils import read_config, resolve_path, read_programs, parse_module_name, load_logging
+
+_config = read_config()
+BENCHMARK_DIR = resolve_path(_config.get("BENCHMARK_DIR", "scraper/benchmarks"))
+CORPUS_DIR = os.path.join(BENCHMARK_DIR, "corpus")
+RESULTS_DIR = os.path.join(BENCHMARK_DIR, "results")
+
+
+def record_corpus(filename: str, corpus_dir: str = CORPUS_DIR) -> None:
+    """
+    Records the snapshots of the program and placement pages into the corpus.
+
+    The corpus consists of a manifest with the snapshot URLs of each program, and the content of every page.
+
+    Args:
+        filename (str): The file with program URLs.
+        corpus_dir (str): The folder to record the corpus to.
+    """
+    os.makedirs(os.path.join(corpus_dir, "pages"), exist_ok=True)
+    manifest = []
+
+    for program_tuple in read_programs(filename):
+        url, placement_url, university = program_tuple[:3]
+        snapshot_urls = get_snapshot_urls(program_tuple)
+        placement_urls = get_snapshot_urls((placement_url,)) if placement_url else []
+
+        for page_url, content in zip(snapshot_urls + placement_urls, fetch_pages(snapshot_urls + placement_urls)):
+            if content:
+                with open(_page_path(corpus_dir, page_url), 'w', encoding='utf-8') as file:
+                    file.write(content)
+
+        manifest.append({
+            "url": url,
+            "placement_url": placement_url,
+            "university": university,
+            "snapshots": snapshot_urls,
+            "placement_snapshots": placement_urls
+        })
+        logging.info(f"Recorded {len(snapshot_urls) + len(placement_urls)} pages for {university}")
+
+    with open(os.path.join(corpus_dir, "manifest.json"), 'w') as file:
+        json.dump(manifest, file, indent=4)
+
+
+def run_benchmarks(scales: List[int], repeat: int, corpus_dir: str = CORPUS_DIR) -> dict:
+    """
+    Times the pipeline stages on the recorded corpus.
+
+    Programs without a search module are skipped. The search stage is timed on all recorded snapshots, the data
+    stages on the extracted data and on synthetic datasets with every student copied to the given scales,
+    and the end-to-end stage on a full scrape of every program from the corpus.
+
+    Args:
+        scales (List[int]): The dataset scales to time the data stages at.
+        repeat (int): The number of times each stage is run, the median time is reported.
+        corpus_dir (str): The folder with the recorded corpus.
+
+    Returns:
+        dict: The results, with the median seconds and the number of items for each stage and scale.
+    """
+    with open(os.path.join(corpus_dir, "manifest.json"), 'r') as file:
+        manifest = [entry for entry in json.load(file) if _has_search_module(entry["url"])]
+
+    results = {
+        "commit": _current_commit(),
+        "date": datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        "programs": len(manifest),
+        "stages": {}
+    }
+
+    with _replay(corpus_dir, manifest):
+        snapshots = [
+            (url, content, entry["university"]) for entry in manifest for url in entry["snapshots"]
+            if (content := program_page.get_page(url))
+        ]
+        _record(results, "search_names", 1, len(snapshots), repeat,
+                lambda: [search_names(content, url) for url, content, _ in snapshots])
+
+        timestamps = pd.concat(
+            [_extract_timestamps_from_snapshot(content, url, university=university)
+             for url, content, university in snapshots]
+            or [pd.DataFrame(columns=['Name', 'University', 'URL', 'Active'])],
+            ignore_index=True
+        )
+        histories = {entry["placement_url"]: fetch_placement_history(entry["placement_url"]) for entry in manifest}
+
+        for scale in scales:
+            scaled = _scale_timestamps(timestamps, scale)
+            _record(results, "process_data", scale, len(scaled), repeat,
+                    lambda: process_data(scaled.copy(), log=False))
+
+            students = process_data(scaled.copy(), log=False)
+            _record(results, "update_placement", scale, len(students), repeat,
+                    lambda: _update_placements(students.copy(), manifest, histories))
+
+            placed = _update_placements(students.copy(), manifest, histories)
+            _record(results, "merge_and_save", scale, len(placed), repeat, lambda: _merge_twice(placed))
+
+        _record(results, "end_to_end", 1, len(manifest), repeat, lambda: _scrape_programs(manifest))
+
+    return results
+
+
+def save_results(results: dict, baseline: bool = False) -> str:
+    """
+    Saves the benchmark results.
+
+    Results are saved under the commit and date they were measured on, and optionally as the baseline.
+
+    Args:
+        results (dict): The benchmark results.
+        baseline (bool): If True, the results are also saved as baseline.json. Default is False.
+
+    Returns:
+        str: The path of the saved results.
+    """
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    stamp = results["date"].replace(' ', '_').replace(':', '')
+    filepath = os.path.join(RESULTS_DIR, f"{stamp}_{results['commit'] or 'unknown'}.json")
+    paths = [filepath] + ([os.path.join(BENCHMARK_DIR, "baseline.json")] if baseline else [])
+    for path in paths:
+        with open(path, 'w') as file:
+            json.dump(results, file, indent=4)
+    return filepath
+
+
+def compare_results(results: dict, baseline_path: str) -> str:
+    """
+    Formats a comparison of the results with a baseline.
+
+    Args:
+        results (dict): The benchmark results.
+        baseline_path (str): The path of the baseline results.
+
+    Returns:
+        str: A table with the baseline and current median times and their ratio for each stage and scale.
+    """
+    with open(baseline_path, 'r') as file:
+        baseline = json.load(file)
+
+    lines = [f"Baseline {baseline.get('commit')} ({baseline.get('date')}) vs {results.get('commit')}",
+             f"{'Stage':<20}{'Scale':>7}{'Items':>9}{'Base s':>10}{'Now s':>10}{'Ratio':>8}"]
+    for stage, by_scale in results["stages"].items():
+        for scale, current in by_scale.items():
+            previous = baseline["stages"].get(stage, {}).get(scale)
+            base_seconds = f"{previous['seconds']:.3f}" if previous else "-"
+            ratio = f"{current['seconds'] / previous['seconds']:.2f}" if previous and previous['seconds'] else "-"
+            lines.append(f"{stage:<20}{scale + 'x':>7}{current['items']:>9}{base_seconds:>10}"
+                         f"{current['seconds']:>10.3f}{ratio:>8}")
+    return "\n".join(lines)
+
+
+def _has_search_module(url: str) -> bool:
+    """
+    Checks if the program has a search module, either a Python module or a selector spec.
+
+    Args:
+        url (str): The URL of the program page.
+
+    Returns:
+        bool: True if the search module exists.
+    """
+    filepath = parse_module_name(url)[1]
+    return os.path.exists(filepath) or os.path.exists(spec_path(filepath))
+
+
+def _record(results: dict, stage: str, scale: int, items: int, repeat: int, func: Callable) -> None:
+    """
+    Runs a stage several times and records the median time.
+
+    Args:
+        results (dict): The results to add the stage to.
+        stage (str): The name of the stage.
+        scale (int): The dataset scale.
+        items (int): The number of items processed by the stage.
+        repeat (int): The number of runs.
+        func (Callable): The stage to run.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    results["stages"].setdefault(stage, {})[str(scale)] = {
+        "seconds": statistics.median(times),
+        "min_seconds": min(times),
+        "items": items
+    }
+    logging.info(f"{stage} {scale}x: {statistics.median(times):.3f}s for {items} items")
+
+
+def _scale_timestamps(timestamps: pd.DataFrame, scale: int) -> pd.DataFrame:
+    """
+    Builds a synthetic dataset with every student copied to the given scale.
+
+    The copies keep the snapshots and dates of the original student, but have random names and belong
+    to a copy of the university, so that every copy is resolved as a different person.
+
+    Args:
+        timestamps (pd.DataFrame): The extracted timestamps with 'Name' and 'University' columns.
+        scale (int): The number of copies of each student, including the original.
+
+    Returns:
+        pd.DataFrame: The scaled timestamps.
+    """
+    rng = random.Random(scale)
+    copies = [timestamps]
+    for copy in range(1, scale):
+        names = {name: _synthetic_name(rng) for name in timestamps['Name'].unique()}
+        scaled = timestamps.copy()
+        scaled['Name'] = scaled['Name'].map(names)
+        scaled['University'] = scaled['University'].astype(str) + f" #{copy}"
+        copies.append(scaled)
+    return pd.concat(copies, ignore_index=True)
+
+
+def _synthetic_name(rng: random.Random) -> str:
+    """
+    Generates a random two-word name.
+
+    Args:
+        rng (random.Random): The random number generator.
+
+    Returns:
+        str: The name.
+    """
+    def word(length):
+        return ''.join(rng.choice('bcdfghjklmnprstvz') + rng.choice('aeiou') for _ in range(length)).capitalize()
+    return f"{word(rng.randint(2, 3))} {word(rng.randint(2, 4))}"
+
+
+def _update_placements(students: pd.DataFrame, manifest: List[dict], histories: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """
+    Updates the placements of the students of every program from the recorded placement history.
+
+    The students of each program, including the synthetic copies of its university, are matched only against the
+    placement page of the program, as in a scrape.
+
+    Args:
+        students (pd.DataFrame): The processed student data.
+        manifest (List[dict]): The corpus manifest.
+        histories (Dict[str, pd.DataFrame]): The placement history of each placement page.
+
+    Returns:
+        pd.DataFrame: The student data with placements.
+    """
+    programs = students['University'].astype(str).str.replace(r' #\d+$', '', regex=True)
+    updated = [students[~programs.isin([entry["university"] for entry in manifest])]]
+    for entry in manifest:
+        rows = students[programs == entry["university"]].copy()
+        updated.append(update_placement(rows, entry["placement_url"], log=False,
+                                        history=histories[entry["placement_url"]]))
+    return pd.concat(updated).sort_index(kind='stable')
+
+
+def _merge_twice(data: pd.DataFrame) -> None:
+    """
+    Saves the data as a new dataset in a temporary folder and merges it again into the saved version.
+
+    Args:
+        data (pd.DataFrame): The student data.
+    """
+    with tempfile.TemporaryDirectory() as data_folder:
+        version = _merge_and_save(data.copy(), 0, data_folder=data_folder)
+        _merge_and_save(data.copy(), version or 0, data_folder=data_folder)
+
+
+def _scrape_programs(manifest: List[dict]) -> None:
+    """
+    Scrapes every program of the corpus, from the snapshot list to the merged dataset.
+
+    Args:
+        manifest (List[dict]): The corpus manifest.
+    """
+    with tempfile.TemporaryDirectory() as data_folder:
+        version = 0
+        for entry in manifest:
+            program_tuple = (entry["url"], entry["placement_url"], entry["university"])
+            history = fetch_placement_history(entry["placement_url"])
+            data = scrape_data_from_pages(pd.DataFrame(), program_tuple, page_urls=[entry["url"]], headless=True)
+            data = update_placement(data, placement_page=entry["placement_url"], log=False, history=history)
+            version = _merge_and_save(data, version, data_folder=data_folder) or version
+
+
+@contextmanager
+def _replay(corpus_dir: str, manifest: List[dict]) -> Iterator[None]:
+    """
+    Serves snapshot lists and pages from the corpus instead of the network.
+
+    Search modules are used as they are, without validation or generation.
+
+    Args:
+        corpus_dir (str): The folder with the recorded corpus.
+        manifest (List[dict]): The corpus manifest.
+    """
+    snapshot_lists = {}
+    for entry in manifest:
+        snapshot_lists[entry["url"]] = entry["snapshots"]
+        snapshot_lists[entry["placement_url"]] = entry["placement_snapshots"]
+
+    def get_page(url: str, *args, **kwargs) -> str:
+        path = _page_path(corpus_dir, url)
+        if not os.path.exists(path):
+            return ''
+        with open(path, 'r', encoding='utf-8') as file:
+            return file.read()
+
+    def get_snapshots(url_tuple: Tuple[str, ...], *args, **kwargs) -> List[str]:
+        return list(snapshot_lists.get(url_tuple[0], [url_tuple[0]]))
+
+    replaced = [
+        (program_page, "get_page", get_page),
+        (program_page, "get_snapshot_urls", get_snapshots),
+        (program_page, "load_search_module", lambda *args, **kwargs: None),
+        (placement_page, "get_snapshot_urls", get_snapshots)
+    ]
+    originals = [(module, name, getattr(module, name)) for module, name, _ in replaced]
+    for module, name, replacement in replaced:
+        setattr(module, name, replacement)
+    try:
+        yield
+    finally:
+        for module, name, original in originals:
+            setattr(module, name, original)
+
+
+def _page_path(corpus_dir: str, url: str) -> str:
+    """
+    Returns the path of a recorded page.
+
+    Args:
+        corpus_dir (str): The folder with the recorded corpus.
+        url (str): The URL of the page.
+
+    Returns:
+        str: The file path of the page.
+    """
+    return os.path.join(corpus_dir, "pages", hashlib.sha256(url.encode('utf-8')).hexdigest() + ".html")
+
+
+def _current_commit() -> Optional[str]:
+    """
+    Returns the short hash of the current git commit.
+
+    Returns:
+        Optional[str]: The hash, or None outside of a git repository.
+    """
+    try:
+        output = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True)
+        return output.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+if __name__ == '__main__':
+    load_logging()
+
+    parser = argparse.ArgumentParser(description="Benchmark the scraper on a recorded corpus of snapshots.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    record_parser = subparsers.add_parser("record", help="Record the corpus from the Wayback Machine.")
+    record_parser.add_argument("file", nargs='?', default="public/programs.csv", help="The file with URLs.")
+
+    run_parser = subparsers.add_parser("run", help="Run the benchmarks on the recorded corpus.")
+    run_parser.add_argument("--scales", nargs='+', type=int, default=[1, 10, 100],
+                            help="The dataset scales for the data stages.")
+    run_parser.add_argument("--repeat", type=int, default=3, help="The number of runs of each stage.")
+    run_parser.add_argument("--save-baseline", action="store_true", help="Save the results as the baseline.")
+    run_parser.add_argument("--compare", default=os.path.join(BENCHMARK_DIR, "baseline.json"),
+                            help="The baseline results to compare with.")
+
+    args = parser.parse_args()
+
+    if args.command == "record":
+        record_corpus(args.file)
+    else:
+        benchmark_results = run_benchmarks(args.scales, args.repeat)
+        logging.info(f"Saved results to {save_results(benchmark_results, baseline=args.save_baseline)}")
+        if os.path.exists(args.compare):
+            print(compare_results(benchmark_results, args.compare))
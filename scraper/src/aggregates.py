@@ -0,0 +1,162 @@
+"""
+This module provides aggregate tables of the dataset for the viewer and the report.
+The tables are computed when a dataset version is saved and written next to it, so that program statistics
+are loaded as a few kilobytes instead of being recomputed from the full student data.
+
+Functions:
+    compute_aggregates(data: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+        Computes the per-program and per-cohort aggregate tables.
+
+    export_aggregates(data: pd.DataFrame, version: int, data_folder: str = 'public/data') -> None:
+        Writes the aggregate tables of a dataset version.
+
+    _years_to_degree(data: pd.DataFrame) -> pd.Series:
+        Estimates the time-to-degree of every student from the snapshots of the program.
+"""
+
+import os
+import json
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+from .utils import resolve_path, atomic_write
+from .schema import capture_dates
+from .analytics import cohort_table, survival_curve, median_time_in_program, report_statistics
+
+PROGRAM_COLUMNS = [
+    'University', 'URL', 'PlacementURL', 'Total_Entries', 'Currently_Active', 'Placed', 'Placement_Rate', 'Exited',
+    'Median_Years_To_Exit', 'Median_Years_In_Program', 'Completed', 'Mean_Years_To_Degree', 'Earliest_Record',
+    'Snapshots'
+]
+COHORT_COLUMNS = [
+    'University', 'Cohort', 'Size', 'Active', 'Exited', 'Placed', 'Median_Years_To_Exit', 'Attrition_Rate'
+]
+
+
+def compute_aggregates(data: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """
+    Computes the per-program and per-cohort aggregate tables.
+
+    The program table holds the program and placement page URLs, the entry, active and placed counts, the
+    placement rate in percent, the median years to exit of students who left the page, the Kaplan-Meier median time
+    in the program with active students censored, and the mean time-to-degree estimated as in the viewer, from the
+    midpoints between the first and last appearance of a student and the neighbouring snapshots. The cohort table is computed by analytics.cohort_table.
+
+    Args:
+        data (pd.DataFrame): The dataset with 'University', 'Start_Date', 'End_Date', 'Active', 'Placement',
+            'Years' and 'Snapshots' columns.
+
+    Returns:
+        Dict[str, pd.DataFrame]: The 'programs' and 'cohorts' tables.
+    """
+    if data.empty:
+        return {'programs': pd.DataFrame(columns=PROGRAM_COLUMNS), 'cohorts': pd.DataFrame(columns=COHORT_COLUMNS)}
+
+    data = data.assign(
+        Start_Date=pd.to_datetime(data['Start_Date']),
+        End_Date=pd.to_datetime(data['End_Date']),
+        Active=data['Active'].astype(bool),
+        Placement=data['Placement'].fillna(False).astype(bool) if 'Placement' in data.columns else False,
+        Years=pd.to_numeric(data['Years'], errors='coerce')
+    )
+    data['Exit_Years'] = data['Years'].where(~data['Active'])
+    data['Degree_Years'] = _years_to_degree(data)
+
+    snapshots = data[['University', 'Snapshots']].explode('Snapshots').dropna()
+    snapshots['Date'] = capture_dates(snapshots['Snapshots'])
+
+    programs = data.groupby('University', observed=True).agg(
+        Total_Entries=('University', 'size'),
+        Currently_Active=('Active', 'sum'),
+        Placed=('Placement', 'sum'),
+        Exited=('Exit_Years', 'count'),
+        Median_Years_To_Exit=('Exit_Years', 'median'),
+        Completed=('Degree_Years', 'count'),
+        Mean_Years_To_Degree=('Degree_Years', 'mean'),
+        Earliest_Record=('Start_Date', 'min')
+    )
+    programs['Placement_Rate'] = programs['Placed'] / programs['Total_Entries'] * 100
+    for column in ('URL', 'PlacementURL'):
+        programs[column] = data.groupby('University', observed=True)[column].first().astype(object) \
+            if column in data.columns else None
+    programs['Snapshots'] = snapshots.groupby('University', observed=True)['Date'].nunique()
+    programs['Snapshots'] = programs['Snapshots'].fillna(0).astype(int)
+    programs['Earliest_Record'] = programs['Earliest_Record'].dt.strftime('%Y-%m-%d %H:%M:%S')
+    programs['Median_Years_In_Program'] = median_time_in_program(survival_curve(data, by_program=True))
+
+    return {
+        'programs': programs.reset_index()[PROGRAM_COLUMNS].round(2),
+        'cohorts': cohort_table(data)[COHORT_COLUMNS].round(2)
+    }
+
+
+def export_aggregates(data: pd.DataFrame, version: int, data_folder: str = 'public/data') -> None:
+    """
+    Writes the aggregate tables of a dataset version.
+
+    The tables are written to 'aggregates_v<version>.json' for the viewer, with the statistics of the report
+    under 'summary', and the latest tables are written to 'program_aggregates.csv' and 'cohort_aggregates.csv'.
+    Every file is replaced atomically.
+
+    Args:
+        data (pd.DataFrame): The dataset of the version.
+        version (int): The version number of the dataset.
+        data_folder (str): The folder where the data files are stored, relative to the project root.
+    """
+    data_folder = resolve_path(data_folder)
+    tables = compute_aggregates(data)
+
+    aggregates = {'version': version}
+    for name, table in tables.items():
+        aggregates[name] = json.loads(table.to_json(orient='records'))
+    if not data.empty:
+        aggregates['summary'] = {
+            key: None if pd.isna(value) else round(value, 4) for key, value in report_statistics(data).items()
+        }
+    with atomic_write(os.path.join(data_folder, f'aggregates_v{version}.json')) as file:
+        json.dump(aggregates, file, indent=4)
+
+    with atomic_write(os.path.join(data_folder, 'program_aggregates.csv')) as file:
+        tables['programs'].to_csv(file, index=False)
+    with atomic_write(os.path.join(data_folder, 'cohort_aggregates.csv')) as file:
+        tables['cohorts'].to_csv(file, index=False)
+
+
+def _years_to_degree(data: pd.DataFrame) -> pd.Series:
+    """
+    Estimates the time-to-degree of every student from the snapshots of the program.
+
+    Enrollment is placed midway between the first appearance and the preceding snapshot of the program, and
+    completion midway between the last appearance and the following snapshot. Students without a preceding
+    snapshot, active students and students without a following snapshot have no estimate.
+
+    Args:
+        data (pd.DataFrame): The dataset with datetime 'Start_Date' and 'End_Date' columns.
+
+    Returns:
+        pd.Series: The time-to-degree in years, NaN where it cannot be estimated.
+    """
+    years = pd.Series(np.nan, index=data.index)
+
+    for university, rows in data.groupby('University', observed=True):
+        urls = rows['Snapshots'].explode().dropna()
+        dates = np.unique(capture_dates(urls).to_numpy())
+        if len(dates) == 0:
+            continue
+
+        start = rows['Start_Date'].to_numpy(dtype='datetime64[ns]')
+        end = rows['End_Date'].to_numpy(dtype='datetime64[ns]')
+        preceding = np.searchsorted(dates, start, side='left') - 1
+        following = np.searchsorted(dates, end, side='right')
+
+        known = (preceding >= 0) & (following < len(dates)) & ~rows['Active'].to_numpy()
+        enrollment = start[known] - (start[known] - dates[preceding[known]]) / 2
+        completion = end[known] + (dates[following[known]] - end[known]) / 2
+
+        duration = (completion - enrollment) / np.timedelta64(1, 'D') / 365.25
+        years.loc[rows.index[known]] = duration
+
+    return years
+
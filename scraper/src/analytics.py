@@ -0,0 +1,223 @@
+"""
+This module provides vectorized analytics of student cohorts and time in the program.
+All tables are computed with grouped array operations, so they scale linearly with the number of students,
+and are available per program or over all programs. Students who are still enrolled are treated as censored
+observations: they are counted as at risk of leaving until their last appearance, but never as exits.
+
+Functions:
+    yearly_metrics(data: pd.DataFrame, by_program: bool = False) -> pd.DataFrame:
+        Counts the students entering, leaving and enrolled in every calendar year.
+
+    cohort_table(data: pd.DataFrame, by_program: bool = True) -> pd.DataFrame:
+        Summarizes the cohorts of students by the year of their first appearance.
+
+    survival_curve(data: pd.DataFrame, by_program: bool = False) -> pd.DataFrame:
+        Computes the Kaplan-Meier estimate of the fraction of students remaining in the program.
+
+    median_time_in_program(survival: pd.DataFrame) -> pd.Series:
+        Returns the median time in the program from a survival curve.
+
+    report_statistics(data: pd.DataFrame) -> Dict[str, float]:
+        Computes the statistics of the report across programs.
+
+    _prepare(data: pd.DataFrame, by_program: bool) -> pd.DataFrame:
+        Normalizes the columns used by the analytics and adds the group column.
+"""
+
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+OVERALL = 'All'
+
+
+def yearly_metrics(data: pd.DataFrame, by_program: bool = False) -> pd.DataFrame:
+    """
+    Counts the students entering, leaving and enrolled in every calendar year.
+
+    A student is enrolled in a year if they appeared before its end and did not leave before its start.
+    The attrition rate is the number of students who left in a year divided by the number enrolled in it.
+
+    Args:
+        data (pd.DataFrame): The dataset with 'University', 'Start_Date', 'End_Date' and 'Active' columns.
+        by_program (bool): If True, the metrics are computed per university. Default is False.
+
+    Returns:
+        pd.DataFrame: The 'Entered', 'Exited', 'Enrolled' and 'Attrition_Rate' columns indexed by
+            'University' and 'Year'. The university is 'All' unless by_program is set.
+    """
+    data = _prepare(data, by_program)
+    if data.empty:
+        return pd.DataFrame(columns=['Entered', 'Exited', 'Enrolled', 'Attrition_Rate'])
+
+    years = np.arange(data['Start_Date'].dt.year.min(), data['End_Date'].dt.year.max() + 1)
+    entered = pd.crosstab(data['University'], data['Start_Date'].dt.year).reindex(columns=years, fill_value=0)
+    exits = data[~data['Active']]
+    exited = pd.crosstab(exits['University'], exits['End_Date'].dt.year) \
+        .reindex(index=entered.index, columns=years, fill_value=0)
+
+    # Enrolled in a year: entered up to that year, minus exited before it
+    enrolled = entered.cumsum(axis=1) - exited.cumsum(axis=1).shift(1, axis=1, fill_value=0)
+
+    metrics = pd.DataFrame({
+        'Entered': entered.stack(),
+        'Exited': exited.stack(),
+        'Enrolled': enrolled.stack()
+    })
+    metrics.index.names = ['University', 'Year']
+    metrics['Attrition_Rate'] = (metrics['Exited'] / metrics['Enrolled'].where(metrics['Enrolled'] > 0)).round(4)
+    return metrics
+
+
+def cohort_table(data: pd.DataFrame, by_program: bool = True) -> pd.DataFrame:
+    """
+    Summarizes the cohorts of students by the year of their first appearance.
+
+    Args:
+        data (pd.DataFrame): The dataset with 'University', 'Start_Date', 'End_Date', 'Active', 'Placement'
+            and 'Years' columns.
+        by_program (bool): If True, the cohorts are split by university. Default is True.
+
+    Returns:
+        pd.DataFrame: The 'University', 'Cohort', 'Size', 'Active', 'Exited', 'Placed', 'Median_Years_To_Exit'
+            and 'Attrition_Rate' columns, one row per cohort.
+    """
+    columns = ['University', 'Cohort', 'Size', 'Active', 'Exited', 'Placed', 'Median_Years_To_Exit', 'Attrition_Rate']
+    data = _prepare(data, by_program)
+    if data.empty:
+        return pd.DataFrame(columns=columns)
+
+    data['Cohort'] = data['Start_Date'].dt.year
+    data['Exit_Years'] = data['Years'].where(~data['Active'])
+
+    cohorts = data.groupby(['University', 'Cohort'], observed=True).agg(
+        Size=('University', 'size'),
+        Active=('Active', 'sum'),
+        Exited=('Exit_Years', 'count'),
+        Placed=('Placement', 'sum'),
+        Median_Years_To_Exit=('Exit_Years', 'median')
+    ).reset_index()
+    cohorts['Attrition_Rate'] = cohorts['Exited'] / cohorts['Size']
+    return cohorts[columns]
+
+
+def survival_curve(data: pd.DataFrame, by_program: bool = False) -> pd.DataFrame:
+    """
+    Computes the Kaplan-Meier estimate of the fraction of students remaining in the program.
+
+    The time of every student is the number of years between the first and last appearance. Students who left
+    are events at their time, and active students are censored at it.
+
+    Args:
+        data (pd.DataFrame): The dataset with 'University', 'Start_Date', 'End_Date', 'Active' and 'Years' columns.
+        by_program (bool): If True, a curve is computed per university. Default is False.
+
+    Returns:
+        pd.DataFrame: The 'University', 'Years', 'At_Risk', 'Exits' and 'Survival' columns, one row per distinct
+            time of each group, in order of time.
+    """
+    columns = ['University', 'Years', 'At_Risk', 'Exits', 'Survival']
+    data = _prepare(data, by_program)
+    data = data[data['Years'].notna()]
+    if data.empty:
+        return pd.DataFrame(columns=columns)
+
+    data['Exit'] = (~data['Active']).astype(int)
+    curve = data.groupby(['University', 'Years'], observed=True, sort=True).agg(
+        Exits=('Exit', 'sum'),
+        Total=('Exit', 'size')
+    ).reset_index()
+
+    # Students at risk at a time: all students of the group whose time is not shorter
+    curve['At_Risk'] = curve.iloc[::-1].groupby('University', observed=True)['Total'].cumsum().iloc[::-1]
+    curve['Survival'] = (1 - curve['Exits'] / curve['At_Risk']).groupby(curve['University'], observed=True).cumprod()
+    return curve[columns]
+
+
+def median_time_in_program(survival: pd.DataFrame) -> pd.Series:
+    """
+    Returns the median time in the program from a survival curve.
+
+    Args:
+        survival (pd.DataFrame): The curve returned by survival_curve.
+
+    Returns:
+        pd.Series: The first time at which at most half of the students remain, indexed by university.
+            Groups whose curve never drops to one half are NaN.
+    """
+    universities = survival['University'].unique()
+    below = survival[survival['Survival'] <= 0.5]
+    return below.groupby('University', observed=True)['Years'].first().reindex(universities)
+
+
+def report_statistics(data: pd.DataFrame) -> Dict[str, float]:
+    """
+    Computes the statistics of the report across programs.
+
+    Programs with a single snapshot date cannot show anyone leaving and are excluded from the duration statistics.
+    The duration of a program is the mean time in the program of students who left it.
+
+    Args:
+        data (pd.DataFrame): The dataset with 'University', 'Start_Date', 'End_Date', 'Active', 'Placement',
+            'Years' and 'Snapshots' columns.
+
+    Returns:
+        Dict[str, float]: The number of programs, the number with a single snapshot date, the mean and standard
+            deviation across programs of the mean duration in years and of the placement rate in percent,
+            and the overall Kaplan-Meier median time in the program.
+    """
+    data = _prepare(data, by_program=True)
+    snapshot_dates = data[['University', 'Snapshots']].explode('Snapshots').dropna()
+    snapshot_dates = snapshot_dates['Snapshots'].astype(str).str.extract(r'/web/(\d{8})', expand=False) \
+        .fillna('live').groupby(snapshot_dates['University'], observed=True).nunique()
+    single = snapshot_dates[snapshot_dates <= 1].index
+
+    programs = data.assign(Exit_Years=data['Years'].where(~data['Active'])).groupby('University', observed=True).agg(
+        Duration=('Exit_Years', 'mean'),
+        Placement_Rate=('Placement', 'mean')
+    )
+    durations = programs.loc[~programs.index.isin(single), 'Duration'].dropna()
+    placement_rates = programs['Placement_Rate'] * 100
+
+    return {
+        'programs': int(len(programs)),
+        'single_snapshot_programs': int(len(single)),
+        'mean_duration': float(durations.mean()),
+        'std_duration': float(durations.std(ddof=0)),
+        'mean_placement_rate': float(placement_rates.mean()),
+        'std_placement_rate': float(placement_rates.std(ddof=0)),
+        'median_time_in_program': float(median_time_in_program(survival_curve(data)).iloc[0])
+        if not data.empty else float('nan')
+    }
+
+
+def _prepare(data: pd.DataFrame, by_program: bool) -> pd.DataFrame:
+    """
+    Normalizes the columns used by the analytics and adds the group column.
+
+    Args:
+        data (pd.DataFrame): The dataset.
+        by_program (bool): If False, the 'University' column is replaced by 'All'.
+
+    Returns:
+        pd.DataFrame: A copy with datetime dates, boolean 'Active' and 'Placement', numeric 'Years',
+            and the group in the 'University' column, without unused categories.
+    """
+    data = data.copy()
+    if data.empty:
+        return data
+
+    data['Start_Date'] = pd.to_datetime(data['Start_Date'])
+    data['End_Date'] = pd.to_datetime(data['End_Date'])
+    data['Active'] = data['Active'].fillna(False).astype(bool)
+    data['Placement'] = data['Placement'].fillna(False).astype(bool) if 'Placement' in data.columns else False
+    if 'Years' in data.columns:
+        data['Years'] = pd.to_numeric(data['Years'], errors='coerce')
+    else:
+        data['Years'] = (data['End_Date'] - data['Start_Date']).dt.days / 365.25
+    if not by_program:
+        data['University'] = OVERALL
+    elif isinstance(data['University'].dtype, pd.CategoricalDtype):
+        data['University'] = data['University'].cat.remove_unused_categories()
+    return data
@@ -3,9 +3,15 @@ This module provides functions to update, process, and view a dataset of student
 It includes functionality to merge new data, process existing data, and calculate yearly metrics.
 
 Functions:
-    update_dataset(new_data: pd.DataFrame) -> None:
+    update_dataset(new_data: pd.DataFrame, replace: Optional[List[str]] = None) -> None:
         Updates the dataset with new data and increments the version.
 
+    load_dataset(data_folder: str = 'public/data') -> pd.DataFrame:
+        Loads the latest version of the dataset.
+
+    dataset_lock(data_folder: str = 'public/data') -> Iterator[None]:
+        Holds the exclusive lock of the data folder.
+
     process_data(data: pd.DataFrame, log: bool) -> pd.DataFrame:
         Processes student data to create a summary DataFrame.
 
@@ -18,38 +24,64 @@ Functions:
     _get_latest_version(data_folder: str = 'public/data') -> int:
         Retrieves the latest version number of the dataset.
 
-    _merge_and_save(new_data: pd.DataFrame, latest_version: int, data_folder: str = 'public/data') -> int:
+    _read_manifest(data_folder: str) -> Optional[dict]:
+        Reads the manifest of the committed dataset version.
+
+    _data_path(data_folder: str, version: int) -> str:
+        Returns the path of the data file of a dataset version.
+
+    _combine_entries(data: pd.DataFrame) -> pd.DataFrame:
+        Combines the entries of every person into one.
+
+    _merge_and_save(new_data: pd.DataFrame, latest_version: int, data_folder: str = 'public/data',
+                    replace: Optional[List[str]] = None) -> int:
         Merges new data with existing data and saves it.
 """
 
-import numpy as np
-from typing import Dict
+from typing import Iterator, List, Optional
 import pandas as pd
+import contextlib
+import datetime
 import logging
 import json
 import os
 
-from .utils import parent_url
+from .utils import parent_url, resolve_path, atomic_write, file_lock
+from .person_id import resolve_person_ids
+from .metrics import timed, record_bytes
+from .aggregates import export_aggregates
+from .analytics import yearly_metrics
+from .schema import observations, dataset, concat, snapshot_arrays, capture_table
+from .dataset_file import read_dataset, write_dataset, DATASET_FORMAT
 
+MANIFEST_FILE = 'versions.json'
+LOCK_FILE = '.lock'
 
-def update_dataset(new_data: pd.DataFrame) -> None:
+
+def update_dataset(new_data: pd.DataFrame, replace: Optional[List[str]] = None) -> None:
     """
     Updates the dataset with new data and increments the version.
 
+    The latest version is looked up and the new version committed under the lock of the data folder, so that
+    concurrent processes merge into each other's versions instead of writing the same version number.
+
     Args:
         new_data (pd.DataFrame): The new data to be merged with the existing dataset.
+        replace (Optional[List[str]]): Universities whose existing entries are replaced by the new data.
 
     Raises:
         IOError: If an I/O operation fails during data processing.
     """
-    latest_version = _get_latest_version()
-    if latest_version is None:
-        # logging.info("Creating new data file")
-        latest_version = 0
-    # else:
-        # logging.info(f"Current version of data is v{latest_version}")
+    with dataset_lock():
+        latest_version = _get_latest_version()
+        if latest_version is None:
+            # logging.info("Creating new data file")
+            latest_version = 0
+        # else:
+            # logging.info(f"Current version of data is v{latest_version}")
 
-    new_version = _merge_and_save(new_data, latest_version)
+        with timed("merge_and_save"):
+            new_version = _merge_and_save(new_data, latest_version, replace=replace)
 
     if new_version is not None:
         logging.info(f"Dataset updated to version v{new_version}")
@@ -59,6 +91,8 @@ def process_data(data: pd.DataFrame, log: bool) -> pd.DataFrame:
     """
     Processes student data to create a summary DataFrame.
 
+    Name variants of the same person are resolved to one person ID, and the most recent spelling is kept.
+
     Args:
         data (pd.DataFrame): The original dataset containing student information.
         log (bool): Whether to log the processing information.
@@ -70,31 +104,73 @@ def process_data(data: pd.DataFrame, log: bool) -> pd.DataFrame:
         ValueError: If there is an issue with data format or content.
         KeyError: If expected columns are not present in the DataFrame.
     """
-    columns = ['Name', 'University', 'URL', 'Date', 'Active', 'Placement', 'Years', 'Snapshots']
+    columns = ['Name', 'Person_ID', 'University', 'URL', 'Date', 'Active', 'Placement', 'Years', 'Snapshots']
     student_info = pd.DataFrame(columns=columns)
 
     try:
-        data['Date'] = pd.to_datetime(data['Date'])
+        data = observations(data)
+        data['Person_ID'] = resolve_person_ids(data)
+        data = data.sort_values('Date', kind='stable')
 
-        student_info = data.groupby('Name').agg(
+        student_info = data.groupby('Person_ID').agg(
+            Name=('Name', 'last'),
             University=('University', 'first'),
-            URL=('URL', lambda x: parent_url(x.iloc[0])),
+            URL=('URL', 'first'),
             Start_Date=('Date', 'min'),
             End_Date=('Date', 'max'),
             Active=('Active', 'sum')
         )
 
+        student_info['URL'] = student_info['URL'].map(parent_url).astype('category')
+        student_info['University'] = student_info['University'].astype(data['University'].dtype)
         student_info['Years'] = (student_info['End_Date'] - student_info['Start_Date']).dt.days / 365.25
         student_info['Active'] = student_info['Active'] > 0
 
-        student_info['Snapshots'] = data.groupby('Name')['URL'].unique()
+        captures = data[['Person_ID', 'URL']].drop_duplicates()
+        student_info['Snapshots'] = snapshot_arrays(captures['Person_ID'], captures['URL'])
 
         if log:
             logging.info(f"Found {len(student_info)} candidates in {len(data)} timestamps")
     except Exception as e:
         logging.error(f"Error processing data: {e}")
 
-    return student_info.reset_index()
+    student_info = student_info.reset_index()
+    return student_info[['Name'] + [column for column in student_info.columns if column != 'Name']]
+
+
+def load_dataset(data_folder: str = 'public/data') -> pd.DataFrame:
+    """
+    Loads the latest version of the dataset.
+
+    Args:
+        data_folder (str): The folder where the data files are stored, relative to the project root.
+
+    Returns:
+        pd.DataFrame: The dataset in the typed schema, or an empty DataFrame if there is no version yet.
+    """
+    data_folder = resolve_path(data_folder)
+    latest_version = _get_latest_version(data_folder)
+    if latest_version is None:
+        return pd.DataFrame()
+    return read_dataset(_data_path(data_folder, latest_version))
+
+
+@contextlib.contextmanager
+def dataset_lock(data_folder: str = 'public/data') -> Iterator[None]:
+    """
+    Holds the exclusive lock of the data folder.
+
+    The lock is held on the '.lock' file of the folder with utils.file_lock. Readers do not need the lock,
+    since a version is only visible once it is committed to the manifest.
+
+    Args:
+        data_folder (str): The folder where the data files are stored, relative to the project root.
+    """
+    data_folder = resolve_path(data_folder)
+    os.makedirs(data_folder, exist_ok=True)
+
+    with file_lock(os.path.join(data_folder, LOCK_FILE)):
+        yield
 
 
 def view_data(latest_data_path: str) -> None:
@@ -104,9 +180,7 @@ def view_data(latest_data_path: str) -> None:
     Args:
         latest_data_path (str): The path to the latest data file.
     """
-    with open(latest_data_path, 'r') as file:
-        data = json.load(file)
-    df = pd.DataFrame(data)
+    df = read_dataset(latest_data_path)
 
     with pd.option_context('display.max_rows', None, 'display.max_columns', None, 'display.width', None):
         print(df['Snapshots'].apply(lambda x: len(x)))
@@ -117,108 +191,205 @@ def calculate_yearly_metrics(data: pd.DataFrame) -> pd.DataFrame:
     Calculates yearly metrics for students.
 
     Args:
-        data (pd.DataFrame): The DataFrame containing student data with date information.
+        data (pd.DataFrame): The processed student data with 'Start_Date', 'End_Date' and 'Active' columns.
 
     Returns:
-        pd.DataFrame: A DataFrame summarizing the total and graduated students per year.
+        pd.DataFrame: The students entering, leaving and enrolled, and the attrition rate, per year.
     """
-    data['Year'] = data['Date'].dt.year
-
-    agg_dict: Dict[str, pd.NamedAgg] = {
-        'Total_Students': pd.NamedAgg(column='Name', aggfunc='nunique'),  # Count of unique students per year
-        'Graduated_Students': pd.NamedAgg(
-            column='End_Date',
-            aggfunc=lambda x: (x < data['Date'].max()).sum()  # Count of students graduated till the last date in data
-        )
-    }
-    return data.groupby('Year').agg(**agg_dict)
+    return yearly_metrics(data).droplevel('University')
 
 
 def _get_latest_version(data_folder: str = 'public/data') -> int:
     """
     Retrieves the latest version number of the dataset.
 
+    The version is read from the manifest, which points to the last committed version. Files of versions that
+    were written but never committed, e.g. by a process that crashed, are ignored and overwritten by the next
+    commit. Without a valid manifest, the folder is scanned for the highest version instead.
+
     Args:
-        data_folder (str): The folder where the data files are stored.
+        data_folder (str): The folder where the data files are stored, relative to the project root.
 
     Returns:
         int: The latest version number or None if no versions are found.
     """
     versions = []
 
-    data_folder = os.path.join(os.getcwd(), data_folder)
+    data_folder = resolve_path(data_folder)
     if not os.path.exists(data_folder):
         os.makedirs(data_folder)
 
+    manifest = _read_manifest(data_folder)
+    if manifest is not None:
+        return manifest['latest_version']
+
     for filename in os.listdir(data_folder):
-        if filename.startswith("student_data_v"):
+        if filename.startswith("student_data_v") and filename.endswith(".json"):
             version_number = int(filename.split('_v')[1].split('.json')[0])
             versions.append(version_number)
     return max(versions, default=None)
 
 
-def _merge_and_save(new_data: pd.DataFrame, latest_version: int, data_folder: str = 'public/data') -> int:
+def _read_manifest(data_folder: str) -> Optional[dict]:
+    """
+    Reads the manifest of the committed dataset version.
+
+    Args:
+        data_folder (str): The absolute path of the data folder.
+
+    Returns:
+        Optional[dict]: The manifest, or None if it is missing, unreadable or points to a missing data file.
+    """
+    try:
+        with open(os.path.join(data_folder, MANIFEST_FILE), 'r') as file:
+            manifest = json.load(file)
+        version = manifest['latest_version']
+    except (OSError, ValueError, TypeError, KeyError):
+        return None
+
+    data_file = manifest.get('data_file', f'student_data_v{version}.json')
+    if not isinstance(version, int) or not os.path.exists(os.path.join(data_folder, data_file)):
+        return None
+    return manifest
+
+
+def _data_path(data_folder: str, version: int) -> str:
+    """
+    Returns the path of the data file of a dataset version.
+
+    Args:
+        data_folder (str): The absolute path of the data folder.
+        version (int): The version number.
+
+    Returns:
+        str: The data file named by the manifest if it commits the version, otherwise the default file name.
+    """
+    manifest = _read_manifest(data_folder)
+    if manifest is not None and manifest['latest_version'] == version:
+        return os.path.join(data_folder, manifest.get('data_file', f'student_data_v{version}.json'))
+    return os.path.join(data_folder, f'student_data_v{version}.json')
+
+
+def _combine_entries(data: pd.DataFrame) -> pd.DataFrame:
+    """
+    Combines the entries of every person into one.
+
+    The first entry of a person is kept, with the tenure of all its entries: the earliest start date, the latest
+    end date, active if any entry is active, and the union of the snapshots in chronological order.
+
+    Args:
+        data (pd.DataFrame): The typed student entries with a 'Person_ID' column.
+
+    Returns:
+        pd.DataFrame: One entry per person, in the order of the first entries.
+    """
+    duplicated = data['Person_ID'].duplicated(keep=False)
+    combined = data.drop_duplicates(subset=['Person_ID']).copy()
+    if not duplicated.any():
+        return combined
+
+    groups = data[duplicated].groupby('Person_ID', sort=False)
+    rows = combined['Person_ID'].isin(groups.groups)
+    person_ids = combined.loc[rows, 'Person_ID']
+
+    combined.loc[rows, 'Start_Date'] = person_ids.map(groups['Start_Date'].min())
+    combined.loc[rows, 'End_Date'] = person_ids.map(groups['End_Date'].max())
+    combined.loc[rows, 'Active'] = person_ids.map(groups['Active'].any()).astype(bool)
+    combined.loc[rows, 'Years'] = (combined.loc[rows, 'End_Date'] - combined.loc[rows, 'Start_Date']).dt.days / 365.25
+
+    snapshots = groups['Snapshots'].agg(
+        lambda arrays: list(capture_table({url for array in arrays for url in array}).categories)
+    )
+    combined['Snapshots'] = combined['Snapshots'].where(~rows, person_ids.map(snapshots))
+    return dataset(combined)
+
+
+def _merge_and_save(
+        new_data: pd.DataFrame,
+        latest_version: int,
+        data_folder: str = 'public/data',
+        replace: Optional[List[str]] = None
+) -> int:
     """
     Merges new data with existing data and saves it.
 
+    Person IDs are resolved over the merged data, keeping the IDs of the existing data, so that entries of the
+    same person are combined across versions even if the name is spelled differently.
+    Existing entries of the replaced universities are dropped before the merge, but their person IDs are kept
+    for the new entries of the same people. The aggregate tables of the new version are exported with it.
+    The existing version is parsed and the new version written incrementally, without intermediate copies of
+    the serialized data.
+
+    Every file is written to a temporary file and renamed into place, and the manifest is written last, so that
+    the new version is committed at once when the manifest is replaced. A crash before that leaves the previous
+    version committed. The caller holds the lock of the data folder. An existing version that cannot be read
+    raises an error rather than being replaced by a version without its entries.
+
     Args:
         new_data (pd.DataFrame): The new data to merge.
         latest_version (int): The latest version number of the existing data.
-        data_folder (str): The folder where the data files are stored.
+        data_folder (str): The folder where the data files are stored, relative to the project root.
+        replace (Optional[List[str]]): Universities whose existing entries are replaced by the new data.
 
     Returns:
         int: The new version number of the dataset.
     """
-    old_data_path = os.path.join(data_folder, f'student_data_v{latest_version}.json')
+    data_folder = resolve_path(data_folder)
+    old_data_path = _data_path(data_folder, latest_version)
 
     if os.path.exists(old_data_path):
-        try:
-            with open(old_data_path, 'r') as file:
-                old_data = pd.DataFrame(json.load(file))
-        except:
-            old_data = pd.DataFrame()
-
-        merged_data = pd.concat([old_data, new_data], ignore_index=True)
-        total_entries = len(merged_data)
-        duplicate_entries = merged_data.duplicated(subset=['Name']).sum()
-        if len(new_data) == 0:
+        old_data = read_dataset(old_data_path)
+
+        previous_data = old_data
+        removed_entries = 0
+        if replace and 'University' in old_data.columns:
+            kept = ~old_data['University'].isin(replace)
+            removed_entries = int((~kept).sum())
+            old_data = old_data[kept].reset_index(drop=True)
+
+        if len(new_data) == 0 and not removed_entries:
             logging.info("No new entries found. Skipping update.")
             return None
 
-        if duplicate_entries == len(new_data):
+        new_data = dataset(new_data)
+        merged_data = concat([old_data, new_data])
+        merged_data['Person_ID'] = resolve_person_ids(merged_data, existing=previous_data)
+        old_ids = merged_data['Person_ID'].iloc[:len(old_data)]
+        if 'Person_ID' in previous_data.columns:
+            old_ids = previous_data['Person_ID']
+        new_ids = merged_data['Person_ID'].iloc[len(old_data):].drop_duplicates()
+        added_entries = int((~new_ids.isin(old_ids)).sum())
+
+        if not added_entries and not removed_entries:
             logging.info("Entries already exist - Skipping update")
             return None
 
-        logging.info(f"Items added {total_entries - duplicate_entries}")
+        if removed_entries:
+            logging.info(f"Items replaced {removed_entries}")
+        logging.info(f"Items added {added_entries}")
 
-        merged_data = merged_data.drop_duplicates(subset=['Name'])
+        merged_data = _combine_entries(merged_data)
     else:
-        merged_data = new_data
-
-    for column in merged_data.select_dtypes(include=['datetime64[ns]', 'datetime64[ns, UTC]']).columns:
-        merged_data[column] = merged_data[column].dt.strftime('%Y-%m-%d %H:%M:%S')
-
-    for column in merged_data.columns:
-        if merged_data[column].dtype == 'object':
-            merged_data[column] = merged_data[column].apply(lambda x: x.tolist() if isinstance(x, np.ndarray) else x)
-
-    def convert_to_serializable(obj):
-        if isinstance(obj, pd.Timestamp):
-            return obj.strftime('%Y-%m-%d %H:%M:%S')
-        if isinstance(obj, np.ndarray):
-            return obj.tolist()
-        return obj
-
-    data_to_save = json.loads(json.dumps(merged_data.to_dict(orient='records'), default=convert_to_serializable))
+        merged_data = dataset(new_data)
 
     new_version = latest_version + 1
-    with open(os.path.join(data_folder, f'student_data_v{new_version}.json'), 'w') as file:
-        json.dump(data_to_save, file, indent=4)
+    new_data_path = os.path.join(data_folder, f'student_data_v{new_version}.json')
+    write_dataset(merged_data, new_data_path)
+    record_bytes("merge_and_save", os.path.getsize(new_data_path))
+    export_aggregates(merged_data, new_version, data_folder)
 
     # with open(os.path.join(data_folder, f'versions.json'), 'wb') as file:
     #     pickle.dump({"latest_version": 2}, file)
 
-    with open(os.path.join(data_folder, f'versions.json'), 'w') as file:
-        json.dump({"latest_version": new_version}, file, indent=4)
+    manifest = {
+        "latest_version": new_version,
+        "data_file": os.path.basename(new_data_path),
+        "aggregates_file": f'aggregates_v{new_version}.json',
+        "format": DATASET_FORMAT,
+        "entries": len(merged_data),
+        "committed": datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    }
+    with atomic_write(os.path.join(data_folder, MANIFEST_FILE)) as file:
+        json.dump(manifest, file, indent=4)
 
     return new_version
@@ -0,0 +1,637 @@
+"""
+This module provides the on-disk format of dataset versions.
+Most of a dataset file in the record format is repeated snapshot URLs. The compact format stores the columns of the
+dataset instead of records: categorical columns as their categories and integer codes, and the snapshots of every
+university as a capture table with the archive prefix and the page URLs stored once and the capture times
+delta-encoded. The snapshots of a student are delta-encoded indexes into the capture table of the university.
+Files in the record format of earlier versions are still read.
+
+Files are written and parsed incrementally, DATASET_CHUNK_SIZE entries at a time, so that neither the text of a
+file nor the JSON values of all entries are held in memory next to the typed dataset.
+
+Functions:
+    write_dataset(data: pd.DataFrame, path: str) -> None:
+        Writes a dataset version in the configured format.
+
+    read_dataset(path: str) -> pd.DataFrame:
+        Reads a dataset version in either format.
+
+    encode_dataset(data: pd.DataFrame) -> dict:
+        Encodes typed student entries in the compact format.
+
+    decode_dataset(content: Union[list, dict]) -> pd.DataFrame:
+        Decodes the content of a dataset file to typed student entries.
+
+    _write_records(data: pd.DataFrame, file: TextIO) -> None:
+        Writes student entries as a list of records.
+
+    _write_compact(data: pd.DataFrame, file: TextIO) -> None:
+        Writes student entries in the compact format.
+
+    _write_array(file: TextIO, values: Union[pd.Series, Iterable]) -> None:
+        Writes a JSON array in chunks.
+
+    _read_records(stream: _JsonStream) -> pd.DataFrame:
+        Reads a list of records in chunks.
+
+    _read_compact(stream: _JsonStream) -> pd.DataFrame:
+        Reads a dataset in the compact format.
+
+    _stream_columns(stream: _JsonStream) -> Iterator[Tuple[str, Any]]:
+        Reads the encoded columns of a compact dataset one at a time.
+
+    _decode_columns(length: int, columns: Iterable[Tuple[str, Any]]) -> pd.DataFrame:
+        Builds typed student entries from encoded columns.
+
+    _encode_snapshots(data: pd.DataFrame) -> Tuple[List[dict], Iterator[List[int]]]:
+        Encodes the snapshots of the students against the capture table of their university.
+
+    _decode_snapshots(captures: List[dict], codes: Iterable[List[int]], universities: Optional[pd.Series],
+                      length: int) -> np.ndarray:
+        Decodes the snapshot arrays of the students.
+
+    _encode_captures(urls: pd.Index) -> dict:
+        Encodes the capture table of a university.
+
+    _decode_captures(table: dict) -> pd.CategoricalDtype:
+        Decodes the capture table of a university.
+
+    _json_values(values: pd.Series) -> list:
+        Converts a column to JSON values.
+
+    _chunks(values: Iterable, size: int) -> Iterator[list]:
+        Splits an iterable into lists of the given size.
+
+Classes:
+    _JsonStream:
+        Incremental reader of JSON values from a text file.
+"""
+
+import io
+import re
+import json
+import textwrap
+import functools
+from itertools import islice
+from typing import Any, Iterable, Iterator, List, Optional, TextIO, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .utils import read_config, atomic_write
+from .schema import dataset, concat, to_records, capture_table, DATE_COLUMNS, DATE_FORMAT
+
+_config = read_config()
+DATASET_FORMAT = _config.get("DATASET_FORMAT", "compact")
+DATASET_CHUNK_SIZE = _config.get("DATASET_CHUNK_SIZE", 10000)
+
+COMPACT_FORMAT = 2
+CAPTURE_URL = re.compile(r'^(.*?/web/)(\d{14})/(.*)$')
+NUMBER_CHARACTERS = '0123456789.eE+-'
+
+_dumps = functools.partial(json.dumps, separators=(',', ':'))
+
+
+def write_dataset(data: pd.DataFrame, path: str) -> None:
+    """
+    Writes a dataset version in the configured format.
+
+    The file is replaced atomically, so that readers never see a partly written version. The compact format is
+    written without indentation. With DATASET_FORMAT set to 'records', the version is
+    written as a list of records, as read by earlier versions of the viewer.
+
+    Args:
+        data (pd.DataFrame): The typed student entries.
+        path (str): The path of the dataset file.
+    """
+    data = dataset(data).reset_index(drop=True)
+    with atomic_write(path) as file:
+        if DATASET_FORMAT == "records":
+            _write_records(data, file)
+        else:
+            _write_compact(data, file)
+
+
+def read_dataset(path: str) -> pd.DataFrame:
+    """
+    Reads a dataset version in either format.
+
+    Args:
+        path (str): The path of the dataset file.
+
+    Returns:
+        pd.DataFrame: The student entries in the typed schema.
+    """
+    with open(path, 'r') as file:
+        stream = _JsonStream(file)
+        if stream.peek() == '[':
+            return _read_records(stream)
+        return _read_compact(stream)
+
+
+def encode_dataset(data: pd.DataFrame) -> dict:
+    """
+    Encodes typed student entries in the compact format.
+
+    Args:
+        data (pd.DataFrame): The typed student entries with a 'University' column.
+
+    Returns:
+        dict: The 'format', the number of entries as 'length', and the encoded 'columns' in the order of the data.
+    """
+    buffer = io.StringIO()
+    _write_compact(dataset(data).reset_index(drop=True), buffer)
+    return json.loads(buffer.getvalue())
+
+
+def decode_dataset(content: Union[list, dict]) -> pd.DataFrame:
+    """
+    Decodes the content of a dataset file to typed student entries.
+
+    Args:
+        content (Union[list, dict]): The parsed dataset file, a list of records or the compact format.
+
+    Returns:
+        pd.DataFrame: The student entries in the typed schema.
+    """
+    if isinstance(content, list):
+        return dataset(pd.DataFrame(content))
+    return _decode_columns(content['length'], content['columns'].items())
+
+
+def _write_records(data: pd.DataFrame, file: TextIO) -> None:
+    """
+    Writes student entries as a list of records.
+
+    The output is the same as json.dump of all records with an indentation of 4.
+
+    Args:
+        data (pd.DataFrame): The typed student entries.
+        file (TextIO): The file to write to.
+    """
+    if data.empty:
+        file.write('[]')
+        return
+
+    file.write('[\n')
+    for start in range(0, len(data), DATASET_CHUNK_SIZE):
+        for position, record in enumerate(to_records(data.iloc[start:start + DATASET_CHUNK_SIZE])):
+            file.write((',\n' if start or position else '') + textwrap.indent(json.dumps(record, indent=4), ' ' * 4))
+    file.write('\n]')
+
+
+def _write_compact(data: pd.DataFrame, file: TextIO) -> None:
+    """
+    Writes student entries in the compact format.
+
+    Args:
+        data (pd.DataFrame): The typed student entries with a 'University' column and a new index.
+        file (TextIO): The file to write to.
+    """
+    file.write(f'{{"format":{COMPACT_FORMAT},"length":{len(data)},"columns":{{')
+    for position, column in enumerate(data.columns):
+        file.write((',' if position else '') + _dumps(column) + ':')
+        values = data[column]
+        if column == 'Snapshots':
+            captures, codes = _encode_snapshots(data)
+            file.write('{"captures":' + _dumps(captures) + ',"codes":')
+            _write_array(file, codes)
+            file.write('}')
+        elif isinstance(values.dtype, pd.CategoricalDtype):
+            values = values.cat.remove_unused_categories()
+            file.write('{"categories":' + _dumps(values.cat.categories.tolist()) + ',"codes":')
+            _write_array(file, values.cat.codes)
+            file.write('}')
+        else:
+            _write_array(file, values)
+    file.write('}}')
+
+
+def _write_array(file: TextIO, values: Union[pd.Series, Iterable]) -> None:
+    """
+    Writes a JSON array in chunks.
+
+    Args:
+        file (TextIO): The file to write to.
+        values (Union[pd.Series, Iterable]): A column, or an iterable of JSON values.
+    """
+    if isinstance(values, pd.Series):
+        chunks = (_json_values(values.iloc[start:start + DATASET_CHUNK_SIZE])
+                  for start in range(0, len(values), DATASET_CHUNK_SIZE))
+    else:
+        chunks = _chunks(values, DATASET_CHUNK_SIZE)
+
+    file.write('[')
+    for position, chunk in enumerate(chunks):
+        file.write((',' if position else '') + _dumps(chunk)[1:-1])
+    file.write(']')
+
+
+def _read_records(stream: '_JsonStream') -> pd.DataFrame:
+    """
+    Reads a list of records in chunks.
+
+    Args:
+        stream (_JsonStream): The stream positioned at the list.
+
+    Returns:
+        pd.DataFrame: The student entries in the typed schema.
+    """
+    frames = [dataset(pd.DataFrame(chunk)) for chunk in _chunks(stream.items(), DATASET_CHUNK_SIZE)]
+    return concat(frames)
+
+
+def _read_compact(stream: '_JsonStream') -> pd.DataFrame:
+    """
+    Reads a dataset in the compact format.
+
+    Args:
+        stream (_JsonStream): The stream positioned at the dataset object.
+
+    Returns:
+        pd.DataFrame: The student entries in the typed schema.
+    """
+    header = {}
+    for key in stream.members():
+        if key == 'columns':
+            return _decode_columns(header['length'], _stream_columns(stream))
+        header[key] = stream.value()
+    return pd.DataFrame()
+
+
+def _stream_columns(stream: '_JsonStream') -> Iterator[Tuple[str, Any]]:
+    """
+    Reads the encoded columns of a compact dataset one at a time.
+
+    The snapshot codes are yielded as an iterator over the file, and must be consumed before the next column.
+
+    Args:
+        stream (_JsonStream): The stream positioned at the columns object.
+
+    Returns:
+        Iterator[Tuple[str, Any]]: The name and encoded values of every column.
+    """
+    for column in stream.members():
+        if stream.peek() == '[':
+            yield column, list(stream.items())
+            continue
+
+        values = {}
+        for key in stream.members():
+            if column == 'Snapshots' and key == 'codes':
+                # The snapshot codes are the last member, so they are decoded as they are read
+                values[key] = stream.items()
+                yield column, values
+            elif key == 'codes':
+                values[key] = np.fromiter(stream.items(), dtype=np.int64)
+            else:
+                values[key] = list(stream.items())
+        if column != 'Snapshots':
+            yield column, values
+
+
+def _decode_columns(length: int, columns: Iterable[Tuple[str, Any]]) -> pd.DataFrame:
+    """
+    Builds typed student entries from encoded columns.
+
+    Args:
+        length (int): The number of entries.
+        columns (Iterable[Tuple[str, Any]]): The name and encoded values of every column, in order.
+
+    Returns:
+        pd.DataFrame: The student entries in the typed schema.
+    """
+    data = pd.DataFrame(index=pd.RangeIndex(length))
+    for column, values in columns:
+        if column == 'Snapshots':
+            universities = data['University'] if 'University' in data.columns else None
+            data[column] = _decode_snapshots(values['captures'], values['codes'], universities, length)
+        elif isinstance(values, dict):
+            data[column] = pd.Categorical.from_codes(values['codes'], categories=values['categories'])
+        elif column in DATE_COLUMNS:
+            data[column] = pd.to_datetime(pd.Series(values, dtype=object), format=DATE_FORMAT)
+        else:
+            data[column] = pd.Series(values, dtype=object).infer_objects()
+    return dataset(data)
+
+
+def _encode_snapshots(data: pd.DataFrame) -> Tuple[List[dict], Iterator[List[int]]]:
+    """
+    Encodes the snapshots of the students against the capture table of their university.
+
+    The capture table of a university is built from the categories of its snapshot arrays, so the snapshot URLs
+    of the students are not expanded, and the indexes of every student are computed as they are written.
+
+    Args:
+        data (pd.DataFrame): The typed student entries with 'University' and 'Snapshots' columns and a new index.
+
+    Returns:
+        Tuple[List[dict], Iterator[List[int]]]: The capture table of every university category, and the
+            delta-encoded capture indexes of every student.
+    """
+    universities = data['University'].cat.remove_unused_categories()
+    university_codes = universities.cat.codes.to_numpy()
+
+    categories = {}
+    used = {}
+    for university, snapshots in zip(university_codes, data['Snapshots']):
+        key = (university, id(snapshots.categories))
+        if key not in used:
+            categories[key] = snapshots.categories
+            used[key] = np.zeros(len(snapshots.categories), dtype=bool)
+        used[key][snapshots.codes[snapshots.codes >= 0]] = True
+
+    tables = {}
+    positions = {}
+    for university in dict.fromkeys(university for university, _ in categories):
+        keys = [key for key in categories if key[0] == university]
+        urls = np.concatenate([categories[key].to_numpy(dtype=object)[used[key]] for key in keys])
+        table = capture_table(pd.Index(urls).unique()).categories
+        tables[university] = _encode_captures(table)
+        for key in keys:
+            positions[key] = table.get_indexer(categories[key])
+
+    def codes():
+        for university, snapshots in zip(university_codes, data['Snapshots']):
+            indexes = positions[university, id(snapshots.categories)][snapshots.codes[snapshots.codes >= 0]]
+            # Delta encoding within each student: the first index is absolute
+            yield np.diff(indexes, prepend=0).tolist()
+
+    empty = _encode_captures(pd.Index([], dtype=object))
+    return [tables.get(code, empty) for code in range(len(universities.cat.categories))], codes()
+
+
+def _decode_snapshots(
+        captures: List[dict],
+        codes: Iterable[List[int]],
+        universities: Optional[pd.Series],
+        length: int
+) -> np.ndarray:
+    """
+    Decodes the snapshot arrays of the students.
+
+    Args:
+        captures (List[dict]): The capture table of every university category.
+        codes (Iterable[List[int]]): The delta-encoded capture indexes of every student.
+        universities (Optional[pd.Series]): The categorical universities of the students.
+        length (int): The number of students.
+
+    Returns:
+        np.ndarray: The snapshot array of every student.
+    """
+    tables = [_decode_captures(table) for table in captures]
+    university_codes = universities.cat.codes.to_numpy() if universities is not None \
+        else np.zeros(length, dtype=int)
+
+    arrays = np.empty(length, dtype=object)
+    for row, deltas in enumerate(codes):
+        arrays[row] = pd.Categorical.from_codes(np.cumsum(deltas, dtype=np.int64), dtype=tables[university_codes[row]],
+                                                validate=False)
+    return arrays
+
+
+def _encode_captures(urls: pd.Index) -> dict:
+    """
+    Encodes the capture table of a university.
+
+    Captures under the most common archive prefix are stored as the index of the archived page and the capture
+    time in seconds, delta-encoded. Live pages and other URLs are stored as pages without a time.
+
+    Args:
+        urls (pd.Index): The snapshot URLs in the order of the capture table.
+
+    Returns:
+        dict: The 'archive' prefix, the 'pages', and the 'page' and 'time' of every capture.
+    """
+    parts = pd.Series(urls, dtype=object).str.extract(CAPTURE_URL)
+    archive = parts[0].mode().iloc[0] if parts[0].notna().any() else ''
+    archived = (parts[0] == archive).to_numpy()
+
+    pages = parts[2].where(archived, pd.Series(urls, dtype=object))
+    page_index, page_urls = pd.factorize(pages)
+
+    times = [None] * len(urls)
+    if archived.any():
+        dates = pd.to_datetime(parts[1][archived], format='%Y%m%d%H%M%S')
+        seconds = ((dates - pd.Timestamp(0)) // pd.Timedelta(seconds=1)).to_numpy(dtype=np.int64)
+        for position, delta in zip(np.flatnonzero(archived), np.diff(seconds, prepend=0).tolist()):
+            times[position] = delta
+
+    return {
+        'archive': archive,
+        'pages': page_urls.tolist(),
+        'page': page_index.tolist(),
+        'time': times
+    }
+
+
+def _decode_captures(table: dict) -> pd.CategoricalDtype:
+    """
+    Decodes the capture table of a university.
+
+    Args:
+        table (dict): The capture table written by _encode_captures.
+
+    Returns:
+        pd.CategoricalDtype: The snapshot URLs in the order of the capture table.
+    """
+    pages = np.asarray(table['pages'], dtype=object)[np.asarray(table['page'], dtype=np.int64)]
+    times = pd.Series(table['time'], dtype=object)
+    archived = times.notna().to_numpy()
+
+    seconds = np.cumsum(times[archived].to_numpy(dtype=np.int64))
+    stamps = pd.to_datetime(seconds, unit='s').strftime('%Y%m%d%H%M%S')
+
+    urls = pages.copy()
+    urls[archived] = table['archive'] + stamps.to_numpy(dtype=object) + '/' + pages[archived]
+    return pd.CategoricalDtype(pd.Index(urls, dtype=object))
+
+
+def _json_values(values: pd.Series) -> list:
+    """
+    Converts a column to JSON values.
+
+    Args:
+        values (pd.Series): The column.
+
+    Returns:
+        list: The values, with dates formatted and missing values as None.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        values = values.dt.strftime(DATE_FORMAT)
+    return values.astype(object).where(values.notna(), None).tolist()
+
+
+def _chunks(values: Iterable, size: int) -> Iterator[list]:
+    """
+    Splits an iterable into lists of the given size.
+
+    Args:
+        values (Iterable): The values.
+        size (int): The size of the lists.
+
+    Returns:
+        Iterator[list]: The lists, the last one possibly shorter.
+    """
+    values = iter(values)
+    while True:
+        chunk = list(islice(values, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class _JsonStream:
+    """
+    Incremental reader of JSON values from a text file.
+
+    Arrays and objects are iterated without reading them whole, and other values are decoded from a buffer that
+    is refilled as needed, so that memory does not grow with the size of the file.
+
+    Attributes:
+        file (TextIO): The file being read.
+        buffer (str): The text read but not yet consumed, from position on.
+        position (int): The position of the next character in the buffer.
+        fills (int): The number of blocks read.
+    """
+
+    def __init__(self, file: TextIO, buffer_size: int = 1 << 16):
+        self.file = file
+        self.buffer = ''
+        self.position = 0
+        self.buffer_size = buffer_size
+        self.fills = 0
+        self.decoder = json.JSONDecoder()
+
+    def peek(self) -> str:
+        """
+        Skips whitespace and returns the next character without consuming it.
+
+        Returns:
+            str: The next character, or an empty string at the end of the file.
+        """
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position].isspace():
+                self.position += 1
+            if self.position < len(self.buffer) or not self._fill():
+                return self.buffer[self.position:self.position + 1]
+
+    def value(self) -> Any:
+        """
+        Reads the next JSON value.
+
+        Returns:
+            Any: The decoded value.
+
+        Raises:
+            json.JSONDecodeError: If the file does not hold a valid value at the position.
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # A number at the end of the buffer may continue in the file
+            if not self.buffer[end:].strip(NUMBER_CHARACTERS) and self._fill():
+                continue
+            self.position = end
+            return value
+
+    def items(self) -> Iterator[Any]:
+        """
+        Iterates the values of the next array.
+
+        Returns:
+            Iterator[Any]: The values of the array.
+        """
+        self._expect('[')
+        if self.peek() == ']':
+            self.position += 1
+            return
+        failed_fill = None
+        while True:
+            # The text up to a comma in the buffer is a list of whole values if the comma separates the values of
+            # this array; otherwise it is not valid JSON, and the values are read one at a time until the next fill
+            cut = self.buffer.rfind(',', self.position)
+            if cut > self.position and failed_fill != self.fills:
+                try:
+                    values = json.loads('[' + self.buffer[self.position:cut] + ']')
+                except json.JSONDecodeError:
+                    failed_fill = self.fills
+                else:
+                    self.position = cut + 1
+                    yield from values
+                    continue
+            yield self.value()
+            if self._separator(']'):
+                return
+
+    def members(self) -> Iterator[str]:
+        """
+        Iterates the keys of the next object.
+
+        The value of every key must be read by the caller before the iteration continues.
+
+        Returns:
+            Iterator[str]: The keys of the object.
+        """
+        self._expect('{')
+        if self.peek() == '}':
+            self.position += 1
+            return
+        while True:
+            key = self.value()
+            self._expect(':')
+            yield key
+            if self._separator('}'):
+                return
+
+    def _fill(self) -> bool:
+        """
+        Reads the next block of the file into the buffer, dropping the consumed text.
+
+        Returns:
+            bool: False at the end of the file.
+        """
+        block = self.file.read(self.buffer_size)
+        if not block:
+            return False
+        self.buffer = self.buffer[self.position:] + block
+        self.position = 0
+        self.fills += 1
+        return True
+
+    def _expect(self, character: str) -> None:
+        """
+        Consumes the next character, which must be the given one.
+
+        Args:
+            character (str): The expected character.
+
+        Raises:
+            ValueError: If the next character is different.
+        """
+        if self.peek() != character:
+            raise ValueError(f"Expected '{character}' in dataset file, found '{self.peek()}'")
+        self.position += 1
+
+    def _separator(self, closing: str) -> bool:
+        """
+        Consumes the separator after a value of an array or object.
+
+        Args:
+            closing (str): The closing character of the array or object.
+
+        Returns:
+            bool: True if the array or object ended.
+        """
+        character = self.peek()
+        self.position += 1
+        if character == closing:
+            return True
+        if character != ',':
+            raise ValueError(f"Expected ',' or '{closing}' in dataset file, found '{character}'")
+        return False
@@ -16,6 +16,9 @@ Classes:
     WaybackMachineError:
         Raised when an HTTP error occurs with the Wayback Machine.
 
+    TransportError:
+        Raised when a request cannot be served by the fetch transport.
+
 Functions:
     handle_exception(exc_type, exc_value, exc_traceback):
         Logs unhandled exceptions, except for keyboard interrupts.
@@ -151,6 +154,52 @@ class ModuleError(Exception):
         """
         return cls("Failed to load")
 
+    @classmethod
+    def parse_error(cls):
+        """
+        Creates a ModuleError for a page that cannot be parsed.
+
+        Returns:
+            ModuleError: An instance of ModuleError.
+        """
+        return cls("Failed to parse page")
+
+    @classmethod
+    def no_valid_candidate(cls, failures):
+        """
+        Creates a ModuleError for candidate modules that all failed validation.
+
+        Args:
+            failures (list): The validation failure of every candidate.
+
+        Returns:
+            ModuleError: An instance of ModuleError.
+        """
+        return cls(f"No candidate passed validation: {'; '.join(map(str, failures)) or 'no candidates'}")
+
+    @classmethod
+    def timeout(cls, seconds):
+        """
+        Creates a ModuleError for execution exceeding the time limit.
+
+        Args:
+            seconds (float): The time limit in seconds.
+
+        Returns:
+            ModuleError: An instance of ModuleError.
+        """
+        return cls(f"Execution exceeded {seconds}s")
+
+    @classmethod
+    def memory_limit(cls):
+        """
+        Creates a ModuleError for execution exceeding the memory limit.
+
+        Returns:
+            ModuleError: An instance of ModuleError.
+        """
+        return cls("Execution exceeded memory limit")
+
     @classmethod
     def file_not_found(cls, filepath):
         """
@@ -207,6 +256,16 @@ class OpenAIError(Exception):
         """
         return cls("API key not found. Ensure the OPENAI_API_KEY environment variable is set.")
 
+    @classmethod
+    def cache_miss(cls):
+        """
+        Creates an OpenAIError for a request missing from the response cache in replay mode.
+
+        Returns:
+            OpenAIError: An instance of OpenAIError.
+        """
+        return cls("Response not found in cache (replay mode)")
+
 
 class WaybackMachineError(HTTPError, ConnectionError, Timeout, NewConnectionError):
     """
@@ -218,3 +277,29 @@ class WaybackMachineError(HTTPError, ConnectionError, Timeout, NewConnectionErro
 
     def __init__(self, message="Connection Failed"):
         super().__init__(f"Wayback Machine: {message}")
+
+
+class TransportError(Exception):
+    """
+    Raised when a request cannot be served by the fetch transport.
+
+    Attributes:
+        message (str): The error message.
+    """
+
+    def __init__(self, message="Failed"):
+        self.message = f"Transport: {message}"
+        super().__init__(self.message)
+
+    @classmethod
+    def not_recorded(cls, url):
+        """
+        Creates a TransportError for a URL missing from the WARC archive in replay mode.
+
+        Args:
+            url (str): The requested URL.
+
+        Returns:
+            TransportError: An instance of TransportError.
+        """
+        return cls(f"{url} not recorded (replay mode)")
@@ -4,25 +4,101 @@ It includes functionality to load configuration, handle exceptions, and manage c
 
 Functions:
     get_gpt_response(gpt_chat: tuple, prompt: str) -> str:
-        Fetches the response from the GPT API for the given prompt.
+        Fetches the response from the GPT API for the given prompt, replaying cached responses when available.
 
     init_gpt_chat() -> tuple:
         Initializes the GPT chat session by loading the API key and setup prompts.
+
+    resample_source(prompts: dict, source: str, seed: int = 0) -> ChatHistory:
+        Resets the chat history with a new sample of the page source.
+
+Classes:
+    ChatHistory:
+        Chat message list that keeps a running token count and trims the oldest update turns.
 """
 
 import os
-from dotenv import load_dotenv
 import logging
-import yaml
-
-import openai
-from openai import OpenAI
 
 from .exceptions import OpenAIError
-from .utils import load_config, _chunk_html
+from .gpt_cache import CACHE_MODE, load_response, save_response
+from .page_source import condense_source
+from .utils import load_config, read_config, count_tokens
+from .metrics import timed, record_cache, increment
+
+
+MODEL, _, MAX_HISTORY_TOKENS, SOURCE_TOKEN_BUDGET = load_config()
+MODULE_FORMAT = read_config().get("MODULE_FORMAT", "python")
+
+# Tokens added by the chat format to every message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+class ChatHistory(list):
+    """
+    Chat message list that keeps a running token count and trims the oldest update turns.
 
+    The token count of each message is computed once when it is appended, so the size of the history is known
+    without re-reading it. The first two messages, the setup prompt and the prompt with the page source, are
+    never evicted, and neither is the latest assistant response, which holds the code being updated.
 
-MODEL, _, MAX_HISTORY_LEN, SOURCE_CHUNK_LEN = load_config()
+    Attributes:
+        num_tokens (int): The number of tokens in the history.
+    """
+
+    NUM_PINNED = 2
+
+    def __init__(self, messages=()):
+        super().__init__()
+        self._token_counts = []
+        self.num_tokens = 0
+        for message in messages:
+            self.append(message)
+
+    def append(self, message: dict) -> None:
+        """
+        Appends a message and adds its tokens to the count.
+
+        Args:
+            message (dict): The chat message with role and content.
+        """
+        tokens = count_tokens(message['content'], MODEL) + MESSAGE_OVERHEAD_TOKENS
+        super().append(message)
+        self._token_counts.append(tokens)
+        self.num_tokens += tokens
+
+    def copy(self) -> 'ChatHistory':
+        """
+        Returns a copy of the history that shares the token counts of the messages.
+
+        Returns:
+            ChatHistory: The copy.
+        """
+        history = ChatHistory()
+        list.extend(history, self)
+        history._token_counts = list(self._token_counts)
+        history.num_tokens = self.num_tokens
+        return history
+
+    def trim(self, max_tokens: int) -> bool:
+        """
+        Evicts the oldest update turns until the history fits into the token limit.
+
+        Args:
+            max_tokens (int): The maximum number of tokens in the history.
+
+        Returns:
+            bool: True if the history fits into the limit, False if nothing more can be evicted.
+        """
+        while self.num_tokens > max_tokens:
+            assistant_indices = [i for i, message in enumerate(self) if message['role'] == 'assistant']
+            latest_code = assistant_indices[-1] if assistant_indices else len(self) - 1
+            index = self.NUM_PINNED if self.NUM_PINNED < latest_code else None
+            if index is None:
+                return False
+            del self[index]
+            self.num_tokens -= self._token_counts.pop(index)
+        return True
 
 
 def get_gpt_response(gpt_chat: tuple, prompt: str, source: str) -> tuple:
@@ -30,7 +106,9 @@ def get_gpt_response(gpt_chat: tuple, prompt: str, source: str) -> tuple:
     Fetches the response from the GPT API for the given prompt.
 
     This function sends a prompt to the GPT API and returns the response. It manages the chat history
-    to include previous exchanges and ensures that the history does not exceed the maximum allowed length.
+    to include previous exchanges and ensures that the history does not exceed the maximum number of tokens,
+    evicting the oldest update turns first and resampling the source only if that is not enough.
+    Responses are looked up in the response cache first, and new responses are recorded to it.
 
     Args:
         source: html source
@@ -41,39 +119,41 @@ def get_gpt_response(gpt_chat: tuple, prompt: str, source: str) -> tuple:
         str: The response content from the GPT API.
 
     Raises:
-        OpenAIError: If there is an error with the GPT API call, such as API errors, connection errors, or rate limits.
+        OpenAIError: If there is an error with the GPT API call, such as API errors, connection errors, or rate limits,
+                     or if the response is not cached in replay mode.
     """
     client, prompts, history = gpt_chat
+    if not isinstance(history, ChatHistory):
+        history = ChatHistory(history)
     history.append({"role": "user", "content": prompt})
 
-    if len("".join(item['content'] for item in history)) > MAX_HISTORY_LEN:
-        history = resample_source(prompts, source)
-        # logging.info('Resampling source example')
-        # source_sample = "\n".join(_chunk_html(source, SOURCE_CHUNK_LEN))
-        # history = [
-        #     {
-        #         "role": "user",
-        #         "content": prompts["setup_prompt"]
-        #     },
-        #     {
-        #         "role": "user",
-        #         "content": prompts['generate_function_prompt'].format(html_chunks=source_sample)
-        #     }
-        # ]
-
-    try:
-        response = client.chat.completions.create(
-            model=MODEL,
-            messages=history
-        )
-        response_content = response.choices[0].message.content.strip()
-
-        history.append({"role": "assistant", "content": response_content})
-
-        return client, prompts, history
-    except (openai.APIError, openai.APIConnectionError, openai.RateLimitError) as e:
-        status_code = getattr(e, 'code', None)
-        raise OpenAIError(status_code)
+    if not history.trim(MAX_HISTORY_TOKENS):
+        history = resample_source(prompts, source, seed=len(history))
+
+    response_content = load_response(MODEL, history)
+    record_cache("gpt", response_content is not None)
+    if response_content is None:
+        if client is None:
+            raise OpenAIError.cache_miss() if CACHE_MODE == "replay" else OpenAIError.client_required()
+        import openai
+        try:
+            with timed("gpt_request"):
+                response = client.chat.completions.create(
+                    model=MODEL,
+                    messages=history
+                )
+            response_content = response.choices[0].message.content.strip()
+            if response.usage is not None:
+                increment("gpt_tokens", response.usage.prompt_tokens, kind="prompt")
+                increment("gpt_tokens", response.usage.completion_tokens, kind="completion")
+        except (openai.APIError, openai.APIConnectionError, openai.RateLimitError) as e:
+            status_code = getattr(e, 'code', None)
+            raise OpenAIError(status_code)
+        save_response(MODEL, history, response_content)
+
+    history.append({"role": "assistant", "content": response_content})
+
+    return client, prompts, history
 
 
 def init_gpt_chat() -> tuple:
@@ -82,7 +162,10 @@ def init_gpt_chat() -> tuple:
 
     This function reads the OpenAI API key from the environment variables using dotenv, loads the initial setup prompts
     from a YAML file, and prepares the initial chat history. It returns a tuple containing the API client, the loaded
-    prompts, and the initial chat history.
+    prompts, and the initial chat history. The API client and the YAML parser are imported here rather than at
+    module import, so that runs which never generate a module do not pay for them. In replay mode the API key is not
+    required and the client is None, so that generation runs entirely from the response cache. If MODULE_FORMAT is
+    "spec", the generate and update prompts ask for a JSON selector spec instead of a Python function.
 
     Returns:
         tuple: A tuple containing the initialized client, prompts, and chat history.
@@ -90,22 +173,42 @@ def init_gpt_chat() -> tuple:
     Raises:
         OpenAIError: If the API key is not found in the environment variables.
     """
-    load_dotenv()
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise OpenAIError.api_key_not_found()
-    client = OpenAI(api_key=api_key)
-
-    with open('scraper/src/prompts.yaml', 'r') as file:
+    if CACHE_MODE == "replay":
+        client = None
+    else:
+        from dotenv import load_dotenv
+        from openai import OpenAI
+        load_dotenv()
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            raise OpenAIError.api_key_not_found()
+        client = OpenAI(api_key=api_key)
+
+    import yaml
+    with open(os.path.join(os.path.dirname(__file__), 'prompts.yaml'), 'r') as file:
         prompts = yaml.safe_load(file)
-    chat_history = [{"role": "user", "content": prompts["setup_prompt"]}]
+    if MODULE_FORMAT == "spec":
+        prompts['generate_function_prompt'] = prompts['generate_spec_prompt']
+        prompts['update_function_prompt'] = prompts['update_spec_prompt']
+    chat_history = ChatHistory([{"role": "user", "content": prompts["setup_prompt"]}])
     return client, prompts, chat_history
 
 
-def resample_source(prompts: tuple, source: str) -> list:
+def resample_source(prompts: dict, source: str, seed: int = 0) -> ChatHistory:
+    """
+    Resets the chat history with a new sample of the page source.
+
+    Args:
+        prompts (dict): The loaded prompts.
+        source (str): The page source to sample.
+        seed (int): The sample number. Default is 0.
+
+    Returns:
+        ChatHistory: The new chat history.
+    """
     logging.info('Resampling source example')
-    source_sample = "\n".join(_chunk_html(source, SOURCE_CHUNK_LEN))
-    history = [
+    source_sample = condense_source(source, SOURCE_TOKEN_BUDGET, seed=seed)
+    history = ChatHistory([
         {
             "role": "user",
             "content": prompts["setup_prompt"]
@@ -114,5 +217,5 @@ def resample_source(prompts: tuple, source: str) -> list:
             "role": "user",
             "content": prompts['generate_function_prompt'].format(html_chunks=source_sample)
         }
-    ]
+    ])
     return history
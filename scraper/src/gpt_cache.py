@@ -0,0 +1,108 @@
+"""
+This module provides a persistent cache of GPT chat completions for search module generation.
+Responses are stored on disk keyed by the model name and a hash of the full message history, so that
+re-running the generation of a module replays identical requests instead of sending them to the API.
+
+Cache modes:
+    off: The cache is neither read nor written.
+    record: Cached responses are reused, and new responses are written to the cache.
+    replay: Only cached responses are used. A cache miss raises an OpenAIError, no API client is required.
+
+Functions:
+    cache_key(model: str, messages: list) -> str:
+        Computes the cache key for the model and message history.
+
+    load_response(model: str, messages: list) -> Optional[str]:
+        Loads a cached response for the model and message history.
+
+    save_response(model: str, messages: list, response: str) -> None:
+        Saves a response for the model and message history to the cache.
+"""
+
+import os
+import json
+import hashlib
+from typing import Optional
+
+from .utils import read_config, resolve_path, atomic_write
+
+_config = read_config()
+CACHE_MODE = _config.get("GPT_CACHE_MODE", "record")
+CACHE_DIR = resolve_path(_config.get("GPT_CACHE_DIR", "scraper/cache/gpt"))
+
+
+def cache_key(model: str, messages: list) -> str:
+    """
+    Computes the cache key for the model and message history.
+
+    Args:
+        model (str): The name of the GPT model.
+        messages (list): The chat history sent to the model.
+
+    Returns:
+        str: A hex digest identifying the request.
+    """
+    payload = json.dumps(
+        {"model": model, "messages": [[m["role"], m["content"]] for m in messages]},
+        ensure_ascii=False,
+        sort_keys=True
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def load_response(model: str, messages: list) -> Optional[str]:
+    """
+    Loads a cached response for the model and message history.
+
+    Args:
+        model (str): The name of the GPT model.
+        messages (list): The chat history sent to the model.
+
+    Returns:
+        Optional[str]: The cached response content, or None if the cache is off or has no entry.
+    """
+    if CACHE_MODE == "off":
+        return None
+
+    filepath = _cache_path(cache_key(model, messages))
+    if not os.path.exists(filepath):
+        return None
+
+    try:
+        with open(filepath, 'r') as file:
+            return json.load(file)["response"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def save_response(model: str, messages: list, response: str) -> None:
+    """
+    Saves a response for the model and message history to the cache.
+
+    Args:
+        model (str): The name of the GPT model.
+        messages (list): The chat history sent to the model.
+        response (str): The response content returned by the model.
+    """
+    if CACHE_MODE != "record":
+        return
+
+    filepath = _cache_path(cache_key(model, messages))
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+
+    entry = {"model": model, "messages": list(messages), "response": response}
+    with atomic_write(filepath) as file:
+        json.dump(entry, file, indent=4)
+
+
+def _cache_path(key: str) -> str:
+    """
+    Returns the path of the cache entry for the given key.
+
+    Args:
+        key (str): The cache key.
+
+    Returns:
+        str: The file path of the cache entry.
+    """
+    return os.path.join(CACHE_DIR, key[:2], f"{key}.json")
@@ -0,0 +1,342 @@
+"""
+This module provides in-process metrics for the scraper pipeline.
+Stages are timed into histograms, and counters record calls, bytes transferred, cache hits and retries,
+each labeled with the stage and the program being scraped. At the end of a run, the metrics are exported
+as JSON and in the Prometheus textfile format, and summarized in a table.
+
+Functions:
+    timed(stage: str) -> ContextManager[None]:
+        Times a block of code as a call of the stage.
+
+    increment(name: str, value: float = 1, **labels) -> None:
+        Adds a value to a counter.
+
+    observe(name: str, value: float, **labels) -> None:
+        Records a value in a histogram.
+
+    record_bytes(stage: str, num_bytes: int) -> None:
+        Adds the number of bytes transferred by the stage.
+
+    record_cache(cache: str, hit: bool) -> None:
+        Counts a cache lookup.
+
+    program_context(program: Optional[str]) -> ContextManager[None]:
+        Labels the metrics recorded in the block with the program.
+
+    with_program(program: Optional[str], func: Callable, *args) -> Any:
+        Calls the function with the metrics labeled with the program.
+
+    current_program() -> Optional[str]:
+        Returns the program label of the current thread.
+
+    export_metrics(directory: str = METRICS_DIR) -> None:
+        Writes the metrics as JSON and in the Prometheus textfile format.
+
+    summary_table() -> str:
+        Formats a summary of stage throughput, cache hit rates and retry time.
+
+    reset() -> None:
+        Clears all metrics.
+"""
+
+import os
+import json
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .utils import read_config, resolve_path, atomic_write
+
+METRICS_DIR = resolve_path(read_config().get("METRICS_DIR", "scraper/metrics"))
+PREFIX = "scraper_"
+
+# Upper bounds of the histogram buckets in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+_lock = threading.Lock()
+_local = threading.local()
+_counters: Dict[Tuple[str, tuple], float] = {}
+_histograms: Dict[Tuple[str, tuple], dict] = {}
+_started = time.time()
+
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    """
+    Times a block of code as a call of the stage.
+
+    Args:
+        stage (str): The name of the stage.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe("stage_seconds", time.perf_counter() - start, stage=stage)
+
+
+def increment(name: str, value: float = 1, **labels) -> None:
+    """
+    Adds a value to a counter.
+
+    Args:
+        name (str): The name of the counter, without the prefix and the "_total" suffix.
+        value (float): The value to add. Default is 1.
+        **labels: The labels of the counter, the program label is added automatically.
+    """
+    key = (name, _labels(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(name: str, value: float, **labels) -> None:
+    """
+    Records a value in a histogram.
+
+    Args:
+        name (str): The name of the histogram, without the prefix.
+        value (float): The observed value.
+        **labels: The labels of the histogram, the program label is added automatically.
+    """
+    key = (name, _labels(labels))
+    with _lock:
+        histogram = _histograms.setdefault(key, {"buckets": [0] * (len(BUCKETS) + 1), "sum": 0.0, "count": 0})
+        histogram["buckets"][bisect.bisect_left(BUCKETS, value)] += 1
+        histogram["sum"] += value
+        histogram["count"] += 1
+
+
+def record_bytes(stage: str, num_bytes: int) -> None:
+    """
+    Adds the number of bytes transferred by the stage.
+
+    Args:
+        stage (str): The name of the stage.
+        num_bytes (int): The number of bytes.
+    """
+    increment("stage_bytes", num_bytes, stage=stage)
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    """
+    Counts a cache lookup.
+
+    Args:
+        cache (str): The name of the cache.
+        hit (bool): Whether the lookup found an entry.
+    """
+    increment("cache_requests", cache=cache, result="hit" if hit else "miss")
+
+
+@contextmanager
+def program_context(program: Optional[str]) -> Iterator[None]:
+    """
+    Labels the metrics recorded in the block with the program.
+
+    The label applies to the current thread only, use with_program to carry it to worker threads.
+
+    Args:
+        program (Optional[str]): The program name.
+    """
+    previous = current_program()
+    _local.program = program
+    try:
+        yield
+    finally:
+        _local.program = previous
+
+
+def with_program(program: Optional[str], func: Callable, *args) -> Any:
+    """
+    Calls the function with the metrics labeled with the program.
+
+    Args:
+        program (Optional[str]): The program name.
+        func (Callable): The function to call.
+        *args: The arguments of the function.
+
+    Returns:
+        Any: The result of the function.
+    """
+    with program_context(program):
+        return func(*args)
+
+
+def current_program() -> Optional[str]:
+    """
+    Returns the program label of the current thread.
+
+    Returns:
+        Optional[str]: The program name, or None outside of a program context.
+    """
+    return getattr(_local, "program", None)
+
+
+def export_metrics(directory: str = METRICS_DIR) -> None:
+    """
+    Writes the metrics as JSON and in the Prometheus textfile format.
+
+    The files metrics.json and scraper.prom are written to a temporary file and renamed,
+    so that a collector never reads a partial file.
+
+    Args:
+        directory (str): The folder to write the files to.
+    """
+    os.makedirs(directory, exist_ok=True)
+    counters, histograms = _snapshot()
+
+    data = {
+        "started": _started,
+        "duration_seconds": time.time() - _started,
+        "counters": [
+            {"name": name, "labels": dict(labels), "value": value}
+            for (name, labels), value in sorted(counters.items())
+        ],
+        "histograms": [
+            {"name": name, "labels": dict(labels), "buckets": dict(zip(map(str, BUCKETS + ("+Inf",)),
+                                                                        _cumulative(h["buckets"]))),
+             "sum": h["sum"], "count": h["count"]}
+            for (name, labels), h in sorted(histograms.items())
+        ]
+    }
+    with atomic_write(os.path.join(directory, "metrics.json")) as file:
+        json.dump(data, file, indent=4)
+
+    lines = []
+    for name in sorted({name for name, _ in counters}):
+        lines.append(f"# TYPE {PREFIX}{name}_total counter")
+        for (counter_name, labels), value in sorted(counters.items()):
+            if counter_name == name:
+                lines.append(f"{PREFIX}{name}_total{_format_labels(labels)} {value:g}")
+    for name in sorted({name for name, _ in histograms}):
+        lines.append(f"# TYPE {PREFIX}{name} histogram")
+        for (histogram_name, labels), h in sorted(histograms.items()):
+            if histogram_name != name:
+                continue
+            for bound, count in zip(BUCKETS + ("+Inf",), _cumulative(h["buckets"])):
+                lines.append(f"{PREFIX}{name}_bucket{_format_labels(labels + (('le', str(bound)),))} {count}")
+            lines.append(f"{PREFIX}{name}_sum{_format_labels(labels)} {h['sum']:g}")
+            lines.append(f"{PREFIX}{name}_count{_format_labels(labels)} {h['count']}")
+    with atomic_write(os.path.join(directory, "scraper.prom")) as file:
+        file.write("\n".join(lines) + "\n")
+
+
+def summary_table() -> str:
+    """
+    Formats a summary of stage throughput, cache hit rates and retry time.
+
+    Returns:
+        str: The table, with one row per stage followed by the cache and retry totals.
+    """
+    counters, histograms = _snapshot()
+
+    stages = {}
+    for (name, labels), h in histograms.items():
+        if name == "stage_seconds":
+            row = stages.setdefault(dict(labels)["stage"], {"calls": 0, "seconds": 0.0, "bytes": 0})
+            row["calls"] += h["count"]
+            row["seconds"] += h["sum"]
+    for (name, labels), value in counters.items():
+        if name == "stage_bytes":
+            row = stages.setdefault(dict(labels)["stage"], {"calls": 0, "seconds": 0.0, "bytes": 0})
+            row["bytes"] += value
+
+    lines = [f"{'Stage':<20}{'Calls':>8}{'Total s':>10}{'Mean ms':>10}{'Calls/s':>10}{'MB':>9}{'MB/s':>8}"]
+    for stage, row in sorted(stages.items(), key=lambda item: -item[1]["seconds"]):
+        seconds = row["seconds"]
+        mean_ms = 1000 * seconds / row["calls"] if row["calls"] else 0
+        rate = row["calls"] / seconds if seconds else 0
+        megabytes = row["bytes"] / 1e6
+        bandwidth = megabytes / seconds if seconds else 0
+        lines.append(f"{stage:<20}{row['calls']:>8}{seconds:>10.1f}{mean_ms:>10.1f}{rate:>10.1f}"
+                     f"{megabytes:>9.1f}{bandwidth:>8.2f}")
+
+    caches = {}
+    for (name, labels), value in counters.items():
+        if name == "cache_requests":
+            labels = dict(labels)
+            caches.setdefault(labels["cache"], {"hit": 0, "miss": 0})[labels["result"]] += value
+    for cache, counts in sorted(caches.items()):
+        total = counts["hit"] + counts["miss"]
+        lines.append(f"Cache {cache}: {counts['hit']:g}/{total:g} hits ({100 * counts['hit'] / total:.0f}%)")
+
+    retries = sum(value for (name, _), value in counters.items() if name == "retries")
+    retry_seconds = sum(value for (name, _), value in counters.items() if name == "retry_seconds")
+    lines.append(f"Retries: {retries:g} ({retry_seconds:g}s waiting)")
+    return "\n".join(lines)
+
+
+def reset() -> None:
+    """
+    Clears all metrics.
+    """
+    global _started
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+        _started = time.time()
+
+
+def _labels(labels: dict) -> tuple:
+    """
+    Returns the labels as a sorted tuple of pairs, with the program label of the current thread.
+
+    Args:
+        labels (dict): The labels.
+
+    Returns:
+        tuple: The label pairs.
+    """
+    program = current_program()
+    if program is not None and "program" not in labels:
+        labels = {**labels, "program": program}
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _snapshot() -> Tuple[dict, dict]:
+    """
+    Copies the metrics under the lock.
+
+    Returns:
+        Tuple[dict, dict]: The counters and the histograms.
+    """
+    with _lock:
+        counters = dict(_counters)
+        histograms = {key: {**h, "buckets": list(h["buckets"])} for key, h in _histograms.items()}
+    return counters, histograms
+
+
+def _cumulative(buckets: List[int]) -> List[int]:
+    """
+    Converts bucket counts to the cumulative counts used by Prometheus.
+
+    Args:
+        buckets (List[int]): The count of values in each bucket.
+
+    Returns:
+        List[int]: The count of values up to each bucket bound.
+    """
+    total = 0
+    cumulative = []
+    for count in buckets:
+        total += count
+        cumulative.append(total)
+    return cumulative
+
+
+def _format_labels(labels: tuple) -> str:
+    """
+    Formats label pairs in the Prometheus text format.
+
+    Args:
+        labels (tuple): The label pairs.
+
+    Returns:
+        str: The labels in braces, or an empty string without labels.
+    """
+    if not labels:
+        return ""
+    escaped = [(key, value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')) for key, value in labels]
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
@@ -1,57 +1,90 @@
 """
 This module provides functions to generate, validate, and update search modules using GPT-based responses.
-It includes functionality to fetch and process HTML content, chunk HTML for processing, and handle exceptions
+It includes functionality to fetch and process HTML content, condense HTML for prompts, and handle exceptions
 and retries.
 
 Functions:
-    generate_search_module(html_source: str, url: str) -> None:
+    generate_search_module(html_source: str, url: str, headless: bool = False) -> None:
         Generates a search module for extracting names from the given HTML source.
 
-    validate_search_module(html_source: str, url: str) -> None:
+    validate_search_module(html_source: str, url: str, headless: bool = False) -> None:
         Validates the generated search module by extracting and validating names.
 
-    _generate_code(source_chunks: list, gpt_chat: tuple) -> str:
-        Generates code for the search module based on the HTML chunks.
+    _accept_names(module_name: str, url: str, names: list) -> bool:
+        Applies the automatic acceptance rules to names extracted in a headless run.
 
-    _update_code(original_code: str, error_message: str, html_chunk: str, names: list, gpt_chat: tuple) -> str:
-        Updates the search module code based on error messages and additional HTML chunks.
+    _generate_code(source: str, gpt_chat: tuple, seed: int = 0) -> str:
+        Generates code for the search module based on the condensed page source.
+
+    _generate_candidates(source: str, gpt_chat: tuple, num_candidates: int) -> tuple:
+        Generates several candidate search modules concurrently and validates them in parallel.
+
+    _validate_candidate(code: str, source: str, sandbox: SandboxPool) -> Optional[str]:
+        Validates candidate code against the page source in a sandboxed worker process.
+
+    _update_code(original_code: str, error_message: str, source: str, names: list, gpt_chat: tuple) -> str:
+        Updates the search module code based on error messages and extracted names.
 
     _save_module(code: str, url: str) -> None:
-        Saves the generated or updated code to the appropriate file.
+        Saves the generated or updated code or spec to the appropriate file.
 
     _crop_code(code: str) -> str:
-        Crops the generated code to extract the relevant function.
-
-    _chunk_html(html: str, block_size: int) -> list:
-        Chunks the HTML content into smaller blocks for processing.
+        Crops the generated code to extract the relevant function, or the JSON spec.
 """
 
 import os
 import sys
 import logging
 import random
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Optional
 
 from .student_name import validate_names
-from .search_module import search_names
+from .search_module import search_names, search_names_with_code
 from .gpt_api import get_gpt_response, init_gpt_chat, resample_source
-from .utils import parse_module_name, load_config, load_sys_path, _chunk_html
+from .page_source import condense_source
+from .sandbox import get_sandbox, SandboxPool, SANDBOX_TIMEOUT, SANDBOX_MEMORY_MB
+from .selector_spec import is_spec, spec_path
+from .review_queue import enqueue_review, approved_names, pop_rejection
+from .utils import parse_module_name, load_config, load_sys_path, read_config
 from .exceptions import ValidationError, OpenAIError, ModuleError
 
 load_sys_path()
-_, NUM_ITERATIONS, _, SOURCE_CHUNK_LEN = load_config()
+_, NUM_ITERATIONS, _, SOURCE_TOKEN_BUDGET = load_config()
+NUM_CANDIDATES = read_config().get("NUM_CANDIDATES", 1)
+REVIEW_MIN_OVERLAP = read_config().get("REVIEW_MIN_OVERLAP", 0.5)
+REVIEW_MAX_COUNT_CHANGE = read_config().get("REVIEW_MAX_COUNT_CHANGE", 0.5)
+
+# Names accepted for the latest validated snapshot of each module in a headless run
+_accepted_names = {}
 
 
-def generate_search_module(html_source: str, url: str) -> None:
+def generate_search_module(html_source: str, url: str, headless: bool = False) -> None:
     """
         Generates a search module for extracting names from the given HTML source.
 
+        If NUM_CANDIDATES is greater than one, the first version of the module is selected from candidates
+        generated and validated concurrently, and only the selected candidate is saved. If no candidate passes,
+        the module is generated again with a single request and updated by the validation loop.
+
         Args:
             html_source (str): The raw HTML content to generate the search module from.
             url (str): The URL of the page to generate the search module for.
+            headless (bool): If True, the module is validated without user input. Default is False.
         """
     gpt_chat = init_gpt_chat()
 
-    generated_code, gpt_chat = _generate_code(html_source, gpt_chat)
+    generated_code = ""
+    if NUM_CANDIDATES > 1:
+        try:
+            generated_code, gpt_chat = _generate_candidates(html_source, gpt_chat, NUM_CANDIDATES)
+        except ModuleError as e:
+            logging.error(e)
+    if not generated_code:
+        generated_code, gpt_chat = _generate_code(html_source, gpt_chat)
+    if not generated_code:
+        logging.error("Failed to generate search module")
+        return
     _save_module(generated_code, url)
     logging.info(f"Generated name search module")
 
@@ -59,12 +92,11 @@ def generate_search_module(html_source: str, url: str) -> None:
     while iteration < NUM_ITERATIONS:
         iteration += 1
         try:
-            validate_search_module(html_source, url)
+            validate_search_module(html_source, url, headless=headless)
             break
 
         except (ValidationError, ModuleError) as error_message:
 
-            html_chunks = _chunk_html(html_source, SOURCE_CHUNK_LEN)
             try:
                 try:
                     names = search_names(html_source, url)
@@ -74,7 +106,7 @@ def generate_search_module(html_source: str, url: str) -> None:
                 updated_code, gpt_chat = _update_code(
                     generated_code,
                     error_message,
-                    html_chunks[iteration] if iteration < len(html_chunks) else "",
+                    html_source,
                     names,
                     gpt_chat
                 )
@@ -85,26 +117,39 @@ def generate_search_module(html_source: str, url: str) -> None:
 
             logging.info(f"Updated search module")
             if iteration == round(NUM_ITERATIONS / 10):
-                gpt_chat = resample_source(gpt_chat[1], html_source)
+                gpt_chat = (gpt_chat[0], gpt_chat[1], resample_source(gpt_chat[1], html_source, seed=iteration))
     else:
         logging.error(f"Failed to generate module after {NUM_ITERATIONS} updates. Proceeding to the next snapshot")
 
 
-def validate_search_module(html_source: str, url: str) -> bool:
+def validate_search_module(html_source: str, url: str, headless: bool = False) -> bool:
     """
     Validates the generated search module by extracting and validating names.
 
+    In headless mode, the user is not prompted. Names that pass validation are accepted, and extractions that
+    don't meet the automatic acceptance rules are queued for review. A rejection from the review queue fails
+    validation with the reviewer's description, so that the module is regenerated.
+
     Args:
         html_source (str): The raw HTML content to validate the search module against.
         url (str): The URL of the page to validate the search module for.
+        headless (bool): If True, the user is not prompted. Default is False.
 
     Raises:
         ModuleError: If the module file is not found.
         ValidationError: If validation fails.
     """
-    _, filepath = parse_module_name(url)
-    if os.path.exists(filepath):
+    module_name, filepath = parse_module_name(url)
+    if os.path.exists(filepath) or os.path.exists(spec_path(filepath)):
         try:
+            if headless:
+                feedback = pop_rejection(module_name)
+                if feedback:
+                    raise ValidationError.invalid_student_name(feedback)
+                names = search_names(html_source, url)
+                validate_names(html_source, names)
+                return _accept_names(module_name, url, names)
+
             names = search_names(html_source, url)
             if names:
                 print("Extracted names: ", names)
@@ -124,19 +169,52 @@ def validate_search_module(html_source: str, url: str) -> bool:
         raise ModuleError.file_not_found(filepath)
 
 
-def _generate_code(source: str, gpt_chat: tuple) -> tuple:
+def _accept_names(module_name: str, url: str, names: list) -> bool:
+    """
+    Applies the automatic acceptance rules to names extracted in a headless run.
+
+    The names are compared with the names accepted for the previous snapshot of the module, or with the latest
+    names approved in review. The extraction is accepted silently if enough names overlap and the number of names
+    is stable. Otherwise, it is accepted provisionally and queued for review.
+
+    Args:
+        module_name (str): The name of the search module.
+        url (str): The URL of the validated snapshot.
+        names (list): The extracted names.
+
+    Returns:
+        bool: True, as the extraction is accepted either way.
+    """
+    reference = _accepted_names.get(module_name) or approved_names(module_name)
+    _accepted_names[module_name] = names
+
+    if reference is None:
+        enqueue_review(module_name, url, names, "no reference extraction")
+        return True
+
+    overlap = len(set(names) & set(reference)) / max(len(set(names)), len(set(reference)))
+    count_change = abs(len(names) - len(reference)) / len(reference)
+    if overlap < REVIEW_MIN_OVERLAP:
+        enqueue_review(module_name, url, names, f"{overlap:.0%} overlap with the previous snapshot")
+    elif count_change > REVIEW_MAX_COUNT_CHANGE:
+        enqueue_review(module_name, url, names, f"number of names changed by {count_change:.0%}")
+    return True
+
+
+def _generate_code(source: str, gpt_chat: tuple, seed: int = 0) -> tuple:
     """
-    Generates code for the search module based on the HTML chunks.
+    Generates code for the search module based on the condensed page source.
 
     Args:
         source (str): Page source code.
         gpt_chat (tuple): Initialized GPT chat object.
+        seed (int): The number of the source sample shown to the model. Default is 0.
 
     Returns:
         str: The generated code as a string.
     """
 
-    source_sample = "\n".join(_chunk_html(source, SOURCE_CHUNK_LEN))
+    source_sample = condense_source(source, SOURCE_TOKEN_BUDGET, seed=seed)
     prompt = gpt_chat[1]['generate_function_prompt'].format(
         html_chunks=source_sample
     )
@@ -155,6 +233,96 @@ def _generate_code(source: str, gpt_chat: tuple) -> tuple:
         return "", ()
 
 
+def _generate_candidates(source: str, gpt_chat: tuple, num_candidates: int) -> tuple:
+    """
+    Generates several candidate search modules concurrently and validates them in parallel.
+
+    Each candidate is requested with its own copy of the chat and a different sample of the page source.
+    Candidates are validated in sandboxed worker processes as soon as they are generated, and the first one
+    that passes is returned. If the shared sandbox is disabled, a sandbox with one worker per candidate is started
+    for the validation and stopped afterwards, so that a candidate that loops is terminated after SANDBOX_TIMEOUT.
+    If no candidate passes, a ModuleError with the validation failures of the candidates is raised.
+
+    Args:
+        source (str): Page source code.
+        gpt_chat (tuple): Initialized GPT chat object.
+        num_candidates (int): The number of candidates to generate.
+
+    Returns:
+        tuple: The selected code and the chat that produced it.
+
+    Raises:
+        ModuleError: If no candidate passes validation.
+    """
+    client, prompts, history = gpt_chat
+    generator = ThreadPoolExecutor(max_workers=num_candidates)
+    validator = ThreadPoolExecutor(max_workers=num_candidates)
+    sandbox = get_sandbox()
+    own_sandbox = sandbox is None
+    if own_sandbox:
+        sandbox = SandboxPool(num_candidates, SANDBOX_TIMEOUT, SANDBOX_MEMORY_MB)
+
+    pending = {
+        generator.submit(_generate_code, source, (client, prompts, history.copy()), seed)
+        for seed in range(num_candidates)
+    }
+    candidates = {}
+    failures = []
+    selected = None
+
+    try:
+        while pending and selected is None:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future in candidates:
+                    error = future.result()
+                    if error is None:
+                        selected = candidates[future]
+                        break
+                    failures.append(error)
+                    continue
+
+                code, chat = future.result()
+                if not code:
+                    failures.append("Failed to generate")
+                    continue
+                validation = validator.submit(_validate_candidate, code, source, sandbox)
+                candidates[validation] = (code, chat)
+                pending.add(validation)
+    finally:
+        generator.shutdown(wait=False, cancel_futures=True)
+        # Running validations end within the time limit of the sandbox
+        validator.shutdown(wait=True, cancel_futures=True)
+        if own_sandbox:
+            sandbox.close()
+
+    if selected is None:
+        raise ModuleError.no_valid_candidate(failures)
+
+    logging.info(f"Selected candidate module out of {len(candidates)} validated")
+    return selected
+
+
+def _validate_candidate(code: str, source: str, sandbox: SandboxPool) -> Optional[str]:
+    """
+    Validates candidate code against the page source in a sandboxed worker process.
+
+    Args:
+        code (str): The candidate search module code.
+        source (str): Page source code.
+        sandbox (SandboxPool): The pool that runs the candidate, JSON specs run in the selector engine.
+
+    Returns:
+        Optional[str]: None if the candidate passes validation, otherwise the error message.
+    """
+    try:
+        names = search_names_with_code(source, code) if is_spec(code) else sandbox.run(code, source)
+        validate_names(source, names)
+        return None
+    except (ValidationError, ModuleError) as e:
+        return str(e)
+
+
 def _update_code(
     original_code: str,
     error_message: str,
@@ -163,12 +331,12 @@ def _update_code(
     gpt_chat: tuple
 ) -> tuple:
     """
-    Updates the search module code based on error messages and additional HTML chunks.
+    Updates the search module code based on error messages and extracted names.
 
     Args:
         original_code (str): The original generated code.
         error_message (str): The error message from the previous validation attempt.
-        source (str): Additional HTML chunk to use for the update.
+        source (str): Page source code, resampled if the chat history grows too long.
         names (list): List of names found in the HTML.
         gpt_chat (tuple): Initialized GPT chat object.
 
@@ -194,18 +362,25 @@ def _save_module(code: str, url: str) -> None:
     """
     Saves the generated or updated code to the appropriate file.
 
+    A JSON spec is saved next to the Python module with the .json extension, and takes precedence over it.
+    Saving Python code removes the spec of the module, so that the new code is used.
+
     Args:
         code (str): The generated or updated code.
         url (str): The URL to determine the file path for saving.
     """
     module_name, filepath = parse_module_name(url)
+    if is_spec(str(code)):
+        filepath = spec_path(filepath)
+    elif os.path.exists(spec_path(filepath)):
+        os.remove(spec_path(filepath))
     with open(filepath, "w") as f:
         f.write(str(code))
 
 
 def _crop_code(code: str) -> str:
     """
-    Crops the generated code to extract the relevant function.
+    Crops the generated code to extract the relevant function, or the JSON spec.
 
     Args:
         code (str): The full generated code.
@@ -213,6 +388,11 @@ def _crop_code(code: str) -> str:
     Returns:
         str: The cropped function code.
     """
+    if "```json" in code:
+        start_idx = code.find("```json") + len("```json") + 1
+        end_idx = code.find("```", start_idx)
+        return code[start_idx:end_idx if end_idx != -1 else len(code)].strip() + "\n"
+
     start_idx = code.find("```python") + len("```python") + 1
     end_idx = code.find('\n', code.find("return", start_idx)) + 1
     function_code = code[start_idx:end_idx]
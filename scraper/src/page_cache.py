@@ -0,0 +1,216 @@
+"""
+This module provides a persistent cache of archived web pages.
+Wayback Machine snapshots with a timestamp in the URL never change, so their content is stored on disk
+keyed by a hash of the URL, and each snapshot is downloaded only once across runs. Live pages are always
+revalidated: the validators of the last response, its content and content hash, and the names extracted from it
+are stored, so that unchanged pages are fetched with conditional requests and not extracted again.
+The snapshot list of every page is stored as well, so that cached snapshots can be found without network access.
+
+Functions:
+    is_archived(url: str) -> bool:
+        Checks if the URL points to a timestamped Wayback Machine snapshot.
+
+    load_page(url: str) -> Optional[str]:
+        Loads the cached content of an archived page.
+
+    save_page(url: str, content: str) -> None:
+        Saves the content of an archived page to the cache.
+
+    load_snapshot_list(url: str) -> List[str]:
+        Loads the cached snapshot URLs of a page.
+
+    save_snapshot_list(url: str, snapshot_urls: List[str]) -> None:
+        Saves the snapshot URLs of a page to the cache.
+
+    content_hash(content: str) -> str:
+        Returns the hash of the page content.
+
+    load_live_entry(url: str) -> dict:
+        Loads the stored entry of a live page.
+
+    save_live_entry(url: str, entry: dict) -> None:
+        Saves the entry of a live page.
+"""
+
+import os
+import re
+import json
+import hashlib
+from typing import List, Optional
+
+from .utils import read_config, resolve_path, atomic_write
+
+PAGE_CACHE_DIR = resolve_path(read_config().get("PAGE_CACHE_DIR", "scraper/cache/pages"))
+
+ARCHIVED_URL = re.compile(r'/web/\d{14}[a-z_]*/')
+
+
+def is_archived(url: str) -> bool:
+    """
+    Checks if the URL points to a timestamped Wayback Machine snapshot.
+
+    Args:
+        url (str): The URL.
+
+    Returns:
+        bool: True if the URL contains a full snapshot timestamp.
+    """
+    return bool(ARCHIVED_URL.search(url))
+
+
+def load_page(url: str) -> Optional[str]:
+    """
+    Loads the cached content of an archived page.
+
+    Args:
+        url (str): The URL of the snapshot.
+
+    Returns:
+        Optional[str]: The cached content, or None if the URL is not archived or has no entry.
+    """
+    if not PAGE_CACHE_DIR or not is_archived(url):
+        return None
+
+    filepath = _cache_path(url)
+    if not os.path.exists(filepath):
+        return None
+
+    try:
+        with open(filepath, 'r', encoding='utf-8') as file:
+            return file.read()
+    except (OSError, UnicodeDecodeError):
+        return None
+
+
+def save_page(url: str, content: str) -> None:
+    """
+    Saves the content of an archived page to the cache.
+
+    Empty content and live pages are not saved.
+
+    Args:
+        url (str): The URL of the snapshot.
+        content (str): The page content.
+    """
+    if not PAGE_CACHE_DIR or not content or not is_archived(url):
+        return
+
+    filepath = _cache_path(url)
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+
+    with atomic_write(filepath) as file:
+        file.write(content)
+
+
+def load_snapshot_list(url: str) -> List[str]:
+    """
+    Loads the cached snapshot URLs of a page.
+
+    Args:
+        url (str): The URL of the live page.
+
+    Returns:
+        List[str]: The snapshot URLs, or an empty list if the list is not cached.
+    """
+    if not PAGE_CACHE_DIR:
+        return []
+
+    filepath = _cache_path(url, extension="snapshots.json")
+    if not os.path.exists(filepath):
+        return []
+
+    try:
+        with open(filepath, 'r') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return []
+
+
+def save_snapshot_list(url: str, snapshot_urls: List[str]) -> None:
+    """
+    Saves the snapshot URLs of a page to the cache.
+
+    Args:
+        url (str): The URL of the live page.
+        snapshot_urls (List[str]): The snapshot URLs.
+    """
+    if not PAGE_CACHE_DIR:
+        return
+
+    filepath = _cache_path(url, extension="snapshots.json")
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+
+    with atomic_write(filepath) as file:
+        json.dump(snapshot_urls, file, indent=4)
+
+
+def content_hash(content: str) -> str:
+    """
+    Returns the hash of the page content.
+
+    Args:
+        content (str): The page content.
+
+    Returns:
+        str: The SHA-256 hex digest of the content.
+    """
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def load_live_entry(url: str) -> dict:
+    """
+    Loads the stored entry of a live page.
+
+    The entry holds the 'etag' and 'last_modified' validators of the last response, the 'hash' and 'content' of
+    the page, and the extracted 'names' with the 'module' fingerprint of the search module that extracted them.
+
+    Args:
+        url (str): The URL of the live page.
+
+    Returns:
+        dict: The entry, or an empty dict if the page has no entry.
+    """
+    if not PAGE_CACHE_DIR or is_archived(url):
+        return {}
+
+    filepath = _cache_path(url, extension="live.json")
+    if not os.path.exists(filepath):
+        return {}
+
+    try:
+        with open(filepath, 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_live_entry(url: str, entry: dict) -> None:
+    """
+    Saves the entry of a live page.
+
+    Args:
+        url (str): The URL of the live page.
+        entry (dict): The entry, as described in load_live_entry.
+    """
+    if not PAGE_CACHE_DIR or is_archived(url):
+        return
+
+    filepath = _cache_path(url, extension="live.json")
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    with atomic_write(filepath) as file:
+        json.dump(entry, file, indent=4)
+
+
+def _cache_path(url: str, extension: str = "html") -> str:
+    """
+    Returns the path of the cache entry for the URL.
+
+    Args:
+        url (str): The URL of the snapshot.
+        extension (str): The extension of the entry. Default is "html".
+
+    Returns:
+        str: The file path of the cache entry.
+    """
+    key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+    return os.path.join(PAGE_CACHE_DIR, key[:2], f"{key}.{extension}")
@@ -0,0 +1,224 @@
+"""
+This module provides functions to condense the HTML source of a page into a compact sample for GPT prompts.
+Boilerplate such as scripts, styles and the Wayback Machine toolbar is removed, and repeated subtrees that are
+likely to list people are detected and shown as a few representative examples with their location in the page.
+
+Functions:
+    condense_source(html: str, max_tokens: int, seed: int = 0) -> str:
+        Condenses the HTML source into a structural sample within a token budget.
+
+    _strip_boilerplate(soup: BeautifulSoup) -> BeautifulSoup:
+        Removes boilerplate elements, comments and attributes from the parsed source.
+
+    _find_repeated_groups(soup: BeautifulSoup, max_groups: int) -> List[List[Tag]]:
+        Finds the groups of repeated sibling-like subtrees that most likely list people.
+
+    _signature(tag: Tag) -> str:
+        Computes the structural signature of a tag.
+
+    _path(tag: Tag) -> str:
+        Describes the location of a tag as a chain of its ancestors.
+
+    _compact(tag: Tag) -> str:
+        Serializes a tag to HTML with collapsed whitespace.
+"""
+
+import re
+import random
+from collections import defaultdict
+from typing import List
+
+from bs4 import BeautifulSoup, Comment, Tag
+
+from .utils import count_tokens
+
+
+BOILERPLATE_TAGS = ['script', 'style', 'noscript', 'svg', 'iframe', 'link', 'meta', 'head', 'nav', 'footer',
+                    'form', 'input', 'button', 'select', 'img', 'picture', 'video', 'audio', 'canvas']
+WAYBACK_TOOLBAR = re.compile(r'^(wm-|donato|playback)')
+KEPT_ATTRIBUTES = ('id', 'class', 'href')
+NAME_PATTERN = re.compile(r"\b[A-Z][\w'’.-]+,?\s+(\([^)]*\)\s+)?[A-Z][\w'’.-]+")
+MAX_EXAMPLES = 3
+
+
+def condense_source(html: str, max_tokens: int, seed: int = 0) -> str:
+    """
+    Condenses the HTML source into a structural sample within a token budget.
+
+    The sample consists of the repeated subtrees that most likely contain student names, each described by its
+    location in the page and a few examples, followed by the page headings, and the beginning of the condensed
+    page to fill up the remaining budget.
+
+    Args:
+        html (str): The raw HTML content.
+        max_tokens (int): The maximum number of tokens in the sample.
+        seed (int): The sample number, different seeds show different examples of the repeated subtrees. Default is 0.
+
+    Returns:
+        str: The condensed source sample.
+    """
+    soup = _strip_boilerplate(BeautifulSoup(html, 'html.parser'))
+    rng = random.Random(seed)
+
+    groups = _find_repeated_groups(soup, max_groups=3)
+    grouped = {id(tag) for group in groups for tag in group}
+
+    sections = []
+    for group in groups:
+        examples = group[:2]
+        if len(group) > 2:
+            examples += rng.sample(group[2:], min(MAX_EXAMPLES - 2, len(group) - 2))
+        sections.append(
+            f"<!-- {len(group)} repeated elements at {_path(group[0])} -->\n"
+            + "\n".join(_compact(example) for example in examples)
+        )
+
+    headings = [
+        _compact(heading) for heading in soup.find_all(['h1', 'h2', 'h3', 'h4'])
+        if heading.get_text(strip=True)
+        and not any(id(element) in grouped for element in [heading] + list(heading.parents))
+    ]
+    if headings:
+        sections.append("<!-- page headings -->\n" + "\n".join(headings[:20]))
+
+    sample = ""
+    used = 0
+    for section in sections:
+        if used + count_tokens(section) > max_tokens:
+            break
+        sample += section + "\n"
+        used = count_tokens(sample)
+
+    body = _compact(soup.body or soup)
+    remaining = max_tokens - used
+    if remaining > 50:
+        excerpt = body[:remaining * 4]
+        while count_tokens(excerpt) > remaining:
+            excerpt = excerpt[:int(len(excerpt) * 0.9)]
+        if len(excerpt) < len(body):
+            excerpt = excerpt[:excerpt.rfind('>') + 1]
+        sample += "<!-- page excerpt -->\n" + excerpt
+
+    return sample.strip()
+
+
+def _strip_boilerplate(soup: BeautifulSoup) -> BeautifulSoup:
+    """
+    Removes boilerplate elements, comments and attributes from the parsed source.
+
+    Args:
+        soup (BeautifulSoup): The parsed HTML content.
+
+    Returns:
+        BeautifulSoup: The same object with the boilerplate removed.
+    """
+    for comment in soup.find_all(string=lambda text: isinstance(text, Comment)):
+        comment.extract()
+    for tag in soup.find_all(BOILERPLATE_TAGS):
+        tag.decompose()
+    for tag in soup.find_all(id=WAYBACK_TOOLBAR):
+        tag.decompose()
+
+    for tag in soup.find_all(True):
+        tag.attrs = {
+            key: value for key, value in tag.attrs.items()
+            if key in KEPT_ATTRIBUTES and not (key == 'href' and len(value) > 80)
+        }
+    return soup
+
+
+def _find_repeated_groups(soup: BeautifulSoup, max_groups: int) -> List[List[Tag]]:
+    """
+    Finds the groups of repeated sibling-like subtrees that most likely list people.
+
+    Elements are grouped by their structural signature. Groups are ranked by the number of members that
+    contain a name-like text, and groups nested inside an already selected group are skipped.
+
+    Args:
+        soup (BeautifulSoup): The parsed HTML content.
+        max_groups (int): The maximum number of groups to return.
+
+    Returns:
+        List[List[Tag]]: The selected groups in order of rank.
+    """
+    groups = defaultdict(list)
+    for tag in soup.find_all(True):
+        text = tag.get_text(" ", strip=True)
+        if 3 <= len(text) <= 400:
+            groups[_signature(tag)].append(tag)
+
+    scored = []
+    for members in groups.values():
+        if len(members) < 3:
+            continue
+        named = sum(1 for tag in members if NAME_PATTERN.search(tag.get_text(" ", strip=True)))
+        if named:
+            scored.append((named, len(_compact(members[0])), members))
+    scored.sort(key=lambda item: (item[0], item[1]), reverse=True)
+
+    selected = []
+    selected_ids = set()
+    for _, _, members in scored:
+        lineage = [members[0]] + list(members[0].parents)
+        if any(id(element) in selected_ids for element in lineage):
+            continue
+        selected.append(members)
+        selected_ids.update(id(tag) for tag in members)
+        if len(selected) == max_groups:
+            break
+    return selected
+
+
+def _signature(tag: Tag) -> str:
+    """
+    Computes the structural signature of a tag.
+
+    The signature combines the tag name and classes with the names and classes of its direct children.
+
+    Args:
+        tag (Tag): The tag.
+
+    Returns:
+        str: The signature.
+    """
+    def label(element: Tag) -> str:
+        return ".".join([element.name] + sorted(element.get('class', [])))
+
+    children = [label(child) for child in tag.children if isinstance(child, Tag)]
+    return f"{label(tag)}>{','.join(children)}"
+
+
+def _path(tag: Tag) -> str:
+    """
+    Describes the location of a tag as a chain of its ancestors.
+
+    Args:
+        tag (Tag): The tag.
+
+    Returns:
+        str: The chain of ancestors, e.g. "div#content > ul.people > li.person".
+    """
+    parts = []
+    for element in [tag] + list(tag.parents):
+        if element.name in (None, '[document]', 'html', 'body'):
+            break
+        label = element.name
+        if element.get('id'):
+            label += f"#{element['id']}"
+        label += "".join(f".{cls}" for cls in element.get('class', []))
+        parts.append(label)
+    return " > ".join(reversed(parts[:5]))
+
+
+def _compact(tag: Tag) -> str:
+    """
+    Serializes a tag to HTML with collapsed whitespace.
+
+    Args:
+        tag (Tag): The tag.
+
+    Returns:
+        str: The compact HTML.
+    """
+    return re.sub(r'>\s+<', '><', re.sub(r'\s+', ' ', str(tag))).strip()
+
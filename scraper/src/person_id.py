@@ -0,0 +1,306 @@
+"""
+This module provides entity resolution of student names, assigning a stable person ID to every name.
+Variants of the same name, such as "Arango, Alejandro", "Alejandro Arango" and accented spellings, are mapped to
+the same person within a university. Names are normalized to keys, grouped into small blocks by sorted tokens and
+phonetic codes, and compared pairwise only within a block, so that resolution stays fast for large datasets.
+
+Functions:
+    resolve_person_ids(data: pd.DataFrame, existing: Optional[pd.DataFrame] = None) -> pd.Series:
+        Assigns a person ID to every row of the data.
+
+    normalize_name(name: str) -> str:
+        Normalizes a name to a comparison key.
+
+    _blocking_keys(key: str) -> List[str]:
+        Returns the blocking keys of a normalized name.
+
+    _soundex(token: str) -> str:
+        Computes the Soundex code of a token.
+
+    _is_same_person(key_a: str, key_b: str) -> bool:
+        Decides if two normalized names in the same block refer to the same person.
+
+    _is_conflicting(key_a: str, key_b: str) -> bool:
+        Checks if two normalized names have first or middle names that cannot belong to the same person.
+
+    _is_compatible_token(token_a: str, token_b: str) -> bool:
+        Checks if two name tokens can be spellings of the same name.
+
+    _new_person_id(university: str, key: str) -> str:
+        Derives a person ID from the university and the normalized name.
+"""
+
+import re
+import hashlib
+import unicodedata
+from collections import defaultdict
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+# Blocks larger than this are not compared pairwise, only identical keys are merged
+MAX_BLOCK_SIZE = 50
+MIN_SIMILARITY = 0.9
+
+# Nicknames and the full names they stand for, first names are only merged with these or with an initial
+NICKNAMES = {
+    'abby': {'abigail'}, 'al': {'albert', 'alan', 'alfred'}, 'alex': {'alexander'},
+    'andy': {'andrew'}, 'ben': {'benjamin'}, 'beth': {'elizabeth'}, 'bill': {'william'}, 'bob': {'robert'},
+    'cathy': {'catherine', 'cathryn'}, 'chris': {'christopher'}, 'dan': {'daniel'},
+    'dave': {'david'}, 'ed': {'edward'}, 'greg': {'gregory'}, 'jake': {'jacob'}, 'jeff': {'jeffrey'},
+    'jim': {'james'}, 'joe': {'joseph'}, 'jon': {'jonathan'}, 'kate': {'katherine', 'kathryn'},
+    'ken': {'kenneth'}, 'liz': {'elizabeth'}, 'matt': {'matthew'}, 'mike': {'michael'}, 'nick': {'nicholas'},
+    'pat': {'patrick', 'patricia'}, 'pete': {'peter'}, 'rob': {'robert'}, 'sam': {'samuel', 'samantha'},
+    'steve': {'steven', 'stephen'}, 'sue': {'susan'}, 'tom': {'thomas'}, 'tony': {'anthony'},
+    'will': {'william'}, 'zach': {'zachary'},
+}
+
+SOUNDEX_CODES = {
+    **dict.fromkeys('bfpv', '1'), **dict.fromkeys('cgjkqsxz', '2'), **dict.fromkeys('dt', '3'),
+    'l': '4', **dict.fromkeys('mn', '5'), 'r': '6'
+}
+
+
+def resolve_person_ids(data: pd.DataFrame, existing: Optional[pd.DataFrame] = None) -> pd.Series:
+    """
+    Assigns a person ID to every row of the data.
+
+    Names are resolved within each university. Two groups of names are merged only if no names across them have
+    conflicting first or middle names, so that a name like "John Smith" doesn't join "John A Smith" and
+    "John B Smith" into one person. A group of names that includes a name with an ID in the
+    existing data keeps that ID, other groups get an ID derived from the university and the normalized name,
+    so that the same person gets the same ID across snapshots, pages and dataset versions.
+
+    Args:
+        data (pd.DataFrame): Data with 'Name' and 'University' columns.
+        existing (Optional[pd.DataFrame]): Data with 'Name', 'University' and 'Person_ID' columns whose IDs are kept.
+
+    Returns:
+        pd.Series: The person IDs, aligned with the rows of the data.
+    """
+    if data.empty:
+        return pd.Series([], index=data.index, dtype=object)
+
+    pairs = data[['University', 'Name']].astype(str).drop_duplicates().itertuples(index=False, name=None)
+    pairs = list(pairs)
+    keys = {pair: normalize_name(pair[1]) for pair in pairs}
+
+    parent = {pair: pair for pair in pairs}
+    members_of = {pair: [pair] for pair in pairs}
+
+    def find(pair):
+        while parent[pair] != pair:
+            parent[pair] = parent[parent[pair]]
+            pair = parent[pair]
+        return pair
+
+    def union(a, b):
+        root_a, root_b = find(a), find(b)
+        if root_a != root_b:
+            root, child = min(root_a, root_b), max(root_a, root_b)
+            parent[child] = root
+            members_of[root] += members_of.pop(child)
+
+    def is_conflicting(a, b):
+        return any(
+            _is_conflicting(keys[x], keys[y]) for x in members_of[find(a)] for y in members_of[find(b)]
+        )
+
+    blocks = defaultdict(list)
+    for pair in pairs:
+        for block_key in _blocking_keys(keys[pair]):
+            blocks[(pair[0], block_key)].append(pair)
+
+    for members in blocks.values():
+        if len(members) < 2:
+            continue
+        if len(members) > MAX_BLOCK_SIZE:
+            by_key = defaultdict(list)
+            for pair in members:
+                by_key[keys[pair]].append(pair)
+            for same_key in by_key.values():
+                for pair in same_key[1:]:
+                    union(same_key[0], pair)
+            continue
+        for i, a in enumerate(members):
+            for b in members[i + 1:]:
+                if find(a) != find(b) and _is_same_person(keys[a], keys[b]) and not is_conflicting(a, b):
+                    union(a, b)
+
+    known: Dict[tuple, str] = {}
+    if existing is not None and 'Person_ID' in existing.columns:
+        known_rows = existing[['University', 'Name', 'Person_ID']].dropna().astype(str)
+        known = {(u, n): pid for u, n, pid in known_rows.itertuples(index=False, name=None)}
+
+    clusters = defaultdict(list)
+    for pair in pairs:
+        clusters[find(pair)].append(pair)
+
+    person_ids = {}
+    for members in clusters.values():
+        known_ids = sorted(known[pair] for pair in members if pair in known)
+        if known_ids:
+            person_id = known_ids[0]
+        else:
+            person_id = _new_person_id(members[0][0], min(keys[pair] for pair in members))
+        for pair in members:
+            person_ids[pair] = person_id
+
+    index = pd.MultiIndex.from_frame(data[['University', 'Name']].astype(str))
+    return pd.Series(index.map(person_ids), index=data.index, dtype=object)
+
+
+def normalize_name(name: str) -> str:
+    """
+    Normalizes a name to a comparison key.
+
+    Accents and parenthesized nicknames are removed, "Last, First" is reordered to "First Last",
+    punctuation is dropped, and the result is lowercase.
+
+    Args:
+        name (str): The name.
+
+    Returns:
+        str: The normalized name.
+    """
+    name = unicodedata.normalize('NFKD', name)
+    name = ''.join(char for char in name if not unicodedata.combining(char))
+    name = re.sub(r'\([^)]*\)', ' ', name)
+    if name.count(',') == 1:
+        last, first = name.split(',')
+        name = f"{first} {last}"
+    name = re.sub(r"[^\w\s]", ' ', name.lower())
+    return ' '.join(name.split())
+
+
+def _blocking_keys(key: str) -> List[str]:
+    """
+    Returns the blocking keys of a normalized name.
+
+    Names sharing a blocking key are compared with each other. The keys are the sorted tokens of the name,
+    and the Soundex codes of the first and last tokens, so that reordered names and spelling variants meet.
+
+    Args:
+        key (str): The normalized name.
+
+    Returns:
+        List[str]: The blocking keys.
+    """
+    tokens = key.split()
+    if not tokens:
+        return [key]
+    return [
+        ' '.join(sorted(tokens)),
+        f"{_soundex(tokens[0])}:{_soundex(tokens[-1])}",
+        f"{_soundex(tokens[-1])}:{_soundex(tokens[0])}"
+    ]
+
+
+def _soundex(token: str) -> str:
+    """
+    Computes the Soundex code of a token.
+
+    Args:
+        token (str): The lowercase token.
+
+    Returns:
+        str: The four-character code.
+    """
+    letters = [char for char in token if char.isalpha()]
+    if not letters:
+        return token
+    code = letters[0]
+    previous = SOUNDEX_CODES.get(letters[0], '')
+    for char in letters[1:]:
+        digit = SOUNDEX_CODES.get(char, '')
+        if digit and digit != previous:
+            code += digit
+        if char not in 'hw':
+            previous = digit
+    return (code + '000')[:4]
+
+
+def _is_same_person(key_a: str, key_b: str) -> bool:
+    """
+    Decides if two normalized names in the same block refer to the same person.
+
+    Names match if they have the same tokens in any order. Otherwise, the first names must be compatible and the
+    middle names must not conflict, and names match if they have the same last name or are nearly identical,
+    so that "Daniel Kim" and "Daniela Kim", or "John A Smith" and "John B Smith", stay different people.
+
+    Args:
+        key_a (str): The first normalized name.
+        key_b (str): The second normalized name.
+
+    Returns:
+        bool: True if the names refer to the same person.
+    """
+    tokens_a, tokens_b = key_a.split(), key_b.split()
+    if sorted(tokens_a) == sorted(tokens_b):
+        return True
+    if not tokens_a or not tokens_b or _is_conflicting(key_a, key_b):
+        return False
+    if tokens_a[-1] == tokens_b[-1]:
+        return True
+    return SequenceMatcher(None, key_a, key_b).ratio() >= MIN_SIMILARITY
+
+
+def _is_conflicting(key_a: str, key_b: str) -> bool:
+    """
+    Checks if two normalized names have first or middle names that cannot belong to the same person.
+
+    Names with the same tokens in any order never conflict. Middle names are compared in order, and a name
+    without middle names conflicts with none.
+
+    Args:
+        key_a (str): The first normalized name.
+        key_b (str): The second normalized name.
+
+    Returns:
+        bool: True if the names belong to different people.
+    """
+    tokens_a, tokens_b = key_a.split(), key_b.split()
+    if sorted(tokens_a) == sorted(tokens_b) or not tokens_a or not tokens_b:
+        return False
+    if not _is_compatible_token(tokens_a[0], tokens_b[0]):
+        return True
+    return any(not _is_compatible_token(a, b) for a, b in zip(tokens_a[1:-1], tokens_b[1:-1]))
+
+
+def _is_compatible_token(token_a: str, token_b: str) -> bool:
+    """
+    Checks if two name tokens can be spellings of the same name.
+
+    Tokens are compatible if they are equal, if one is the initial of the other, or if one is a known nickname of
+    the other in NICKNAMES, as "Alex" and "Alexander". Other prefixes make different names, as "Chris" and
+    "Christina", or "Daniel" and "Daniela".
+
+    Args:
+        token_a (str): The first token.
+        token_b (str): The second token.
+
+    Returns:
+        bool: True if the tokens are compatible.
+    """
+    token_a, token_b = token_a.rstrip('.'), token_b.rstrip('.')
+    if token_a == token_b:
+        return True
+    short, long = sorted((token_a, token_b), key=len)
+    if len(short) == 1:
+        return long.startswith(short)
+    return long in NICKNAMES.get(short, ()) or short in NICKNAMES.get(long, ())
+
+
+def _new_person_id(university: str, key: str) -> str:
+    """
+    Derives a person ID from the university and the normalized name.
+
+    Args:
+        university (str): The university.
+        key (str): The normalized name.
+
+    Returns:
+        str: A 12-character hex ID.
+    """
+    return hashlib.sha1(f"{university}|{key}".encode('utf-8')).hexdigest()[:12]
@@ -1,22 +1,59 @@
+"""
+This module provides functions to track student placements from program placement pages.
+Besides the live placement page, archived snapshots of the page are fetched concurrently with the program scrape,
+so that placements which have since dropped off the page are kept together with the date they first appeared.
+
+Functions:
+    update_placement(database_df: pd.DataFrame, placement_page: str, log: bool = True,
+                     history: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+        Updates the 'Placement' and 'Placement_Date' columns with names found on the placement page.
+
+    fetch_placement_history(placement_page: str) -> Optional[pd.DataFrame]:
+        Fetches the archived snapshots of the placement page and extracts the names with their first-seen dates.
+
+    _extract_placement_names(html_content: str) -> Set[str]:
+        Extracts name-like strings from the placement page content.
+
+    _name_keys(name: str) -> Set[frozenset]:
+        Returns the keys under which a student name matches placement names.
+"""
+
 import logging
 import re
+from itertools import combinations
+from typing import Optional, Set
+
 import requests
 from bs4 import BeautifulSoup
 import pandas as pd
 
+from .snapshot_url import get_snapshot_urls
+from .program_page import fetch_pages, _parse_date
+from .transport import fetch
+from .exceptions import TransportError
+
+PLACEMENT_NAME = re.compile(r'\b[A-Z][a-z]+ [A-Z][a-z]+\b')
 
-def update_placement(database_df: pd.DataFrame, placement_page: str, log: bool = True) -> pd.DataFrame:
+
+def update_placement(
+        database_df: pd.DataFrame,
+        placement_page: str,
+        log: bool = True,
+        history: Optional[pd.DataFrame] = None
+) -> pd.DataFrame:
     """
     Update 'Placement' column in the database dataframe with names found in the placement webpage.
 
     This function sends a request to the specified URL and updates the 'Placement' column in the provided
     DataFrame to True for names that are found on the webpage. If the 'Placement' column does not exist,
-    it is created.
+    it is created. If the placement history is provided, names found in any archived snapshot of the page
+    are also placed, and the 'Placement_Date' column is set to the date the name first appeared.
 
     Args:
         placement_page:
         log:
         database_df (pd.DataFrame): DataFrame containing the database with a 'Name' column.
+        history (Optional[pd.DataFrame]): Placement names with first-seen dates from fetch_placement_history.
 
     Returns:
         pd.DataFrame: Updated DataFrame with 'Placement' column reflecting found names.
@@ -32,40 +69,107 @@ def update_placement(database_df: pd.DataFrame, placement_page: str, log: bool =
     # Add the placement_page URL to a new column in the DataFrame
     database_df['PlacementURL'] = placement_page
 
-    try:
-        response = requests.get(placement_page)
-        response.raise_for_status()
-        response_content = response.content
-        soup_object = BeautifulSoup(response_content, 'html.parser')
-        html_content = soup_object.get_text()
-    except requests.RequestException:
-        logging.error(f"Error fetching placement page {placement_page}")
-        html_content = ''
+    first_seen = {}
+    if history is not None and not history.empty:
+        for name, date in history[['Name', 'Date']].itertuples(index=False, name=None):
+            key = frozenset(name.split())
+            if key not in first_seen or date < first_seen[key]:
+                first_seen[key] = date
+
+    if history is None:
+        try:
+            response = fetch(placement_page)
+            response.raise_for_status()
+            html_content = response.text
+        except (requests.RequestException, TransportError):
+            logging.error(f"Error fetching placement page {placement_page}")
+            html_content = ''
+        for name in _extract_placement_names(html_content):
+            first_seen.setdefault(frozenset(name.split()), None)
+
+    def placement_date(name):
+        dates = [first_seen[key] for key in _name_keys(name) if key in first_seen]
+        if not dates:
+            return None
+        known = [date for date in dates if date is not None]
+        return min(known) if known else ''
+
+    dates = database_df['Name'].apply(placement_date)
+    database_df['Placement'] = dates.notna()
+    if history is not None:
+        database_df['Placement_Date'] = dates
 
-    webpage_names = set(re.findall(r'\b[A-Z][a-z]+ [A-Z][a-z]+\b', html_content))
+    matching_placements = database_df['Placement'].sum()
 
-    def preprocess_name(name):
-        return sorted(name.replace(',', '').split())
+    if log:
+        logging.info(f"Found {matching_placements} placements")
 
-    def check_two_word_match(name_parts, webpage_name_parts_list):
-        for webpage_name_parts in webpage_name_parts_list:
-            match_count = sum(part in webpage_name_parts for part in name_parts)
-            if match_count >= 2:
-                return True
-        return False
+    return database_df
 
-    database_df['ProcessedName'] = database_df['Name'].apply(preprocess_name)
 
-    processed_webpage_names = [preprocess_name(name) for name in webpage_names]
+def fetch_placement_history(placement_page: str) -> Optional[pd.DataFrame]:
+    """
+    Fetches the archived snapshots of the placement page and extracts the names with their first-seen dates.
 
-    database_df['Placement'] = database_df['ProcessedName'].apply(
-        lambda x: check_two_word_match(x, processed_webpage_names))
+    Snapshots are fetched concurrently through the page cache, and the live page is included as the latest snapshot.
 
-    database_df.drop('ProcessedName', axis=1, inplace=True)
+    Args:
+        placement_page (str): The URL of the placement page.
 
-    matching_placements = database_df['Placement'].sum()
+    Returns:
+        Optional[pd.DataFrame]: A DataFrame with 'Name' and 'Date' columns, one row per name with the earliest date
+            it was found, or None if the snapshots could not be fetched.
+    """
+    if not placement_page:
+        return None
 
-    if log:
-        logging.info(f"Found {matching_placements} placements")
+    try:
+        snapshot_urls = get_snapshot_urls((placement_page,))
+        pages = fetch_pages(snapshot_urls)
+    except requests.RequestException as e:
+        logging.error(f"Error fetching placement history {placement_page}: {e}")
+        return None
+
+    first_seen = {}
+    for url, page_source in zip(snapshot_urls, pages):
+        if not page_source:
+            continue
+        date, _ = _parse_date(url)
+        for name in _extract_placement_names(page_source):
+            if name not in first_seen or date < first_seen[name]:
+                first_seen[name] = date
+
+    logging.info(f"Found {len(first_seen)} placement names in {len(snapshot_urls)} snapshots of {placement_page}")
+    return pd.DataFrame(list(first_seen.items()), columns=['Name', 'Date'])
+
+
+def _extract_placement_names(html_content: str) -> Set[str]:
+    """
+    Extracts name-like strings from the placement page content.
 
-    return database_df
+    Args:
+        html_content (str): The raw HTML content of the page.
+
+    Returns:
+        Set[str]: Pairs of capitalized words found in the page text.
+    """
+    if not html_content:
+        return set()
+    text = BeautifulSoup(html_content, 'html.parser').get_text(' ')
+    return set(PLACEMENT_NAME.findall(text))
+
+
+def _name_keys(name: str) -> Set[frozenset]:
+    """
+    Returns the keys under which a student name matches placement names.
+
+    A placement name matches a student if both of its words are parts of the student name, in any order.
+
+    Args:
+        name (str): The student name.
+
+    Returns:
+        Set[frozenset]: The pairs of name parts.
+    """
+    parts = set(name.replace(',', '').split())
+    return {frozenset(pair) for pair in combinations(sorted(parts), 2)}
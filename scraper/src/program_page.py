@@ -3,7 +3,7 @@ This module provides functions to fetch and process data from Wayback Machine sn
 It includes functionality to handle pagination, retry failed requests, and extract and process student timestamps.
 
 Functions:
-    add_data_from_pages(data, program_tuple, page_urls) -> pd.DataFrame:
+    scrape_data_from_pages(data, program_tuple, page_urls, headless=False) -> pd.DataFrame:
         Adds data from paginated web pages to the existing DataFrame.
 
     get_pagination(url_tuple) -> List[str]:
@@ -12,36 +12,76 @@ Functions:
     get_page(url, max_retries=10, initial_retry_delay=16) -> str:
         Fetches and returns the content of the given URL with retry logic that doubles the delay after each failed attempt.
 
-    _track_presence_in_page(page_tuple, log_snapshot_search) -> pd.DataFrame:
+    fetch_pages(urls) -> List[str]:
+        Fetches the content of several URLs concurrently.
+
+    raw_snapshot_url(url) -> str:
+        Returns the URL of the original archived bytes of a snapshot.
+
+    _fetch_page(url, max_retries=10, initial_retry_delay=16) -> str:
+        Fetches the content of the given URL through the page cache with retry logic.
+
+    _save_live_response(url, response, previous) -> None:
+        Stores the validators and content of a live page response.
+
+    _track_presence_in_page(page_tuple, log_snapshot_search, headless=False) -> pd.DataFrame:
         Tracks and processes student presence data from a given URL page.
 
+    _sample_snapshots(snapshot_urls, load_snapshot) -> List[pd.DataFrame]:
+        Extracts a coarse sample of snapshots and bisects the intervals where the names changed.
+
+    _load_snapshot(url, university, headless=False) -> Optional[pd.DataFrame]:
+        Fetches a snapshot and extracts the student timestamps from it.
+
     _extract_timestamps_from_snapshot(page_source, url, university=None) -> pd.DataFrame:
         Extracts student timestamps from the webpage snapshot.
 
+    _timestamps_from_names(names, url, university=None) -> pd.DataFrame:
+        Builds the student timestamps of a snapshot from the names found in it.
+
+    _previous_names(url, page_source) -> Optional[List[str]]:
+        Returns the names extracted from the same content of a live page in an earlier run.
+
     _parse_date(url) -> Tuple[str, bool]:
         Parses the date and status from the snapshot URL.
 """
 
+import re
 import logging
-from typing import Tuple, List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Tuple, List, Optional
 
-import requests
 import pandas as pd
 import datetime
 from bs4 import BeautifulSoup
 from requests.exceptions import HTTPError, ConnectionError
 
-from ..src.search_module import search_names
+from ..src.search_module import search_names, module_fingerprint
 from ..src.snapshot_url import get_snapshot_urls
+from ..src.page_cache import is_archived, load_page, save_page, content_hash, load_live_entry, save_live_entry
+from ..src.metrics import timed, record_bytes, record_cache, increment, current_program, with_program
+from ..src.utils import read_config
 from ..src.module_manager import generate_search_module, validate_search_module
 from ..src.database import process_data
-from ..src.exceptions import ValidationError, ModuleError, WaybackMachineError, handle_retry_exception
+from ..src.schema import concat
+from ..src.exceptions import ValidationError, ModuleError, WaybackMachineError, TransportError, handle_retry_exception
+from ..src.transport import fetch
+
+_config = read_config()
+FETCH_WORKERS = _config.get("FETCH_WORKERS", 4)
+SNAPSHOT_SAMPLING = _config.get("SNAPSHOT_SAMPLING", "all")
+SAMPLE_INTERVAL_DAYS = _config.get("SAMPLE_INTERVAL_DAYS", 91)
+RAW_SNAPSHOTS = _config.get("RAW_SNAPSHOTS", False)
+
+SNAPSHOT_TIMESTAMP = re.compile(r'/web/(\d{8})\d{6}')
+SNAPSHOT_PREFIX = re.compile(r'(/web/\d{14})[a-z_]*/')
 
 
 def scrape_data_from_pages(
         data: pd.DataFrame,
         program_tuple: Tuple[str, str, str],
-        page_urls: List[str]
+        page_urls: List[str],
+        headless: bool = False
 ) -> pd.DataFrame:
     """
         Adds data from paginated web pages to the existing DataFrame.
@@ -50,6 +90,7 @@ def scrape_data_from_pages(
             data (pd.DataFrame): The existing DataFrame to append new data to.
             program_tuple (Tuple[str, str, str]): A tuple containing the base URL, placement URL, and program name.
             page_urls (List[str]): A list of paginated URLs to fetch data from.
+            headless (bool): If True, search modules are validated without user input. Default is False.
 
         Returns:
             pd.DataFrame: Updated DataFrame with new data appended.
@@ -57,32 +98,29 @@ def scrape_data_from_pages(
     log = True
     for url_page in page_urls:
         page_tuple = (url_page, program_tuple[1], program_tuple[2])
-        data_from_url = _track_presence_in_page(page_tuple, log)
+        data_from_url = _track_presence_in_page(page_tuple, log, headless=headless)
         log = False
-        data = pd.concat([data_from_url, data], ignore_index=True)
-
-    if not data.empty:
-        data['Start_Date'] = pd.to_datetime(data['Start_Date'])
-        data['End_Date'] = pd.to_datetime(data['End_Date'])
+        data = concat([data_from_url, data])
 
     return data
 
 
-def load_search_module(validation_url):
+def load_search_module(validation_url, headless=False):
     """
     Validate or generate the search function.
 
     Args:
         validation_url: The URL to validate the function.
+        headless: If True, the function is validated without user input.
     Returns:
         None
     """
     logging.info(f'Validating snapshot: {validation_url}')
     validation_html = get_page(validation_url)
     try:
-        validate_search_module(validation_html, validation_url)
+        validate_search_module(validation_html, validation_url, headless=headless)
     except (ValidationError, ModuleError):
-        generate_search_module(validation_html, validation_url)
+        generate_search_module(validation_html, validation_url, headless=headless)
     # save snapshot items to a text file
     # with open('scraper/tests/snapshots.csv', 'w') as file:
     #     for url in snapshot_urls:
@@ -144,6 +182,50 @@ def get_page(url: str, max_retries: int = 10, initial_retry_delay: int = 16) ->
     """
     Fetches and returns the content of the given URL with retry logic that doubles the delay after each failed attempt.
 
+    Archived snapshots are served from the page cache when available, and saved to it after a successful fetch.
+    If RAW_SNAPSHOTS is set, the original archived bytes of a snapshot are requested, without the toolbar, scripts
+    and rewritten links of the archive, and the rewritten page is fetched only if the raw capture is not available.
+
+    Args:
+        url (str): The URL to fetch.
+        max_retries (int): Maximum number of retries for the request. Default is 10.
+        initial_retry_delay (int): Initial delay in seconds before retrying the request. Default is 16.
+
+    Returns:
+        str: The content of the page as text, or an empty string if the request fails.
+    """
+    if RAW_SNAPSHOTS and is_archived(url):
+        page_source = _fetch_page(raw_snapshot_url(url), max_retries, initial_retry_delay)
+        if page_source:
+            return page_source
+        increment("raw_fallbacks")
+
+    return _fetch_page(url, max_retries, initial_retry_delay)
+
+
+def raw_snapshot_url(url: str) -> str:
+    """
+    Returns the URL of the original archived bytes of a snapshot.
+
+    The 'id_' modifier after the timestamp makes the Wayback Machine serve the capture as it was archived.
+    The snapshot URL itself is kept everywhere else, so that dates and parent URLs are parsed as before.
+
+    Args:
+        url (str): The URL of the snapshot.
+
+    Returns:
+        str: The URL of the raw capture, or the URL unchanged if it is not a timestamped snapshot.
+    """
+    return SNAPSHOT_PREFIX.sub(r'\1id_/', url, count=1)
+
+
+def _fetch_page(url: str, max_retries: int = 10, initial_retry_delay: int = 16) -> str:
+    """
+    Fetches the content of the given URL through the page cache with retry logic.
+
+    Live pages are fetched with conditional requests using the validators of the previous response,
+    and the stored content is returned if the page was not modified.
+
     Args:
         url (str): The URL to fetch.
         max_retries (int): Maximum number of retries for the request. Default is 10.
@@ -152,6 +234,12 @@ def get_page(url: str, max_retries: int = 10, initial_retry_delay: int = 16) ->
     Returns:
         str: The content of the page as text, or an empty string if the request fails.
     """
+    cached = load_page(url)
+    if is_archived(url):
+        record_cache("page", cached is not None)
+    if cached is not None:
+        return cached
+
     attempts = 0
     retry_delay = initial_retry_delay
 
@@ -166,52 +254,239 @@ def get_page(url: str, max_retries: int = 10, initial_retry_delay: int = 16) ->
         'TE': 'Trailers'
     }
 
+    live_entry = {} if is_archived(url) else load_live_entry(url)
+    if live_entry.get('content'):
+        if live_entry.get('etag'):
+            headers['If-None-Match'] = live_entry['etag']
+        if live_entry.get('last_modified'):
+            headers['If-Modified-Since'] = live_entry['last_modified']
+
     while attempts < max_retries:
         try:
-            response = requests.get(url, headers=headers)
+            with timed("get_page"):
+                response = fetch(url, headers=headers)
+            record_bytes("get_page", len(response.content))
 
             if response.status_code == 406:
                 logging.error(f"Snapshot not available: {url}")
                 return ''
             if response.status_code == 403:
                 return ''
+            if response.status_code == 304 and live_entry.get('content'):
+                record_cache("live_page", True)
+                return live_entry['content']
+            if response.status_code == 200:
+                save_page(url, response.text)
+                if not is_archived(url):
+                    record_cache("live_page", False)
+                    _save_live_response(url, response, live_entry)
             return response.text
 
+        except TransportError as e:
+            logging.error(e)
+            return ''
+
         except (WaybackMachineError, ConnectionError) as e:
+            increment("retries", stage="get_page")
+            increment("retry_seconds", retry_delay, stage="get_page")
             retry_delay, attempts = handle_retry_exception(e, attempts, retry_delay)
 
     logging.error(f"Failed to fetch content after {max_retries} attempts.")
     return ""
 
 
-def _track_presence_in_page(page_tuple: Tuple[str, str, str], log_snapshot_search: bool) -> pd.DataFrame:
+def _save_live_response(url: str, response, previous: dict) -> None:
+    """
+    Stores the validators and content of a live page response.
+
+    The names extracted from the previous content are kept if the content did not change.
+
+    Args:
+        url (str): The URL of the live page.
+        response (requests.Response): The successful response.
+        previous (dict): The previous entry of the page.
+    """
+    page_hash = content_hash(response.text)
+    entry = previous if previous.get('hash') == page_hash else {}
+    entry.update({
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified'),
+        'hash': page_hash,
+        'content': response.text
+    })
+    save_live_entry(url, entry)
+
+
+def fetch_pages(urls: List[str]) -> List[str]:
+    """
+    Fetches the content of several URLs concurrently.
+
+    Args:
+        urls (List[str]): The URLs to fetch.
+
+    Returns:
+        List[str]: The content of each page in the order of the URLs, empty for pages that failed.
+    """
+    if FETCH_WORKERS <= 1 or len(urls) <= 1:
+        return [get_page(url) for url in urls]
+    program = current_program()
+    with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as executor:
+        return list(executor.map(lambda url: with_program(program, get_page, url), urls))
+
+
+def _track_presence_in_page(
+        page_tuple: Tuple[str, str, str],
+        log_snapshot_search: bool,
+        headless: bool = False
+) -> pd.DataFrame:
     """
     Tracks and processes student presence data from a given URL page.
 
     Args:
         page_tuple (Tuple[str, str, str]): A tuple containing the URL, placement URL, and program name.
         log_snapshot_search (bool): Whether to log the snapshot search.
+        headless (bool): If True, search modules are validated without user input. Default is False.
 
     Returns:
         pd.DataFrame: DataFrame with processed and updated data.
     """
     snapshot_urls = get_snapshot_urls(page_tuple, log=log_snapshot_search)
 
-    list_data = pd.DataFrame()
+    def load_snapshot(url):
+        return _load_snapshot(url, page_tuple[2], headless=headless)
 
-    for url in snapshot_urls:
-        page_source = get_page(url)
-        if not page_source:
-            continue
-        load_search_module(validation_url=url)
-        snapshot_data = _extract_timestamps_from_snapshot(page_source, url, university=page_tuple[2])
-        list_data = pd.concat([list_data, snapshot_data], ignore_index=True)
+    if SNAPSHOT_SAMPLING == "adaptive":
+        snapshots = _sample_snapshots(snapshot_urls, load_snapshot)
+    else:
+        snapshots = [snapshot for snapshot in map(load_snapshot, snapshot_urls) if snapshot is not None]
+
+    list_data = pd.concat(snapshots, ignore_index=True) if snapshots else pd.DataFrame()
 
     presence_data = process_data(list_data, log=True)
 
     return presence_data
 
 
+def _sample_snapshots(
+        snapshot_urls: List[str],
+        load_snapshot: Callable[[str], Optional[pd.DataFrame]]
+) -> List[pd.DataFrame]:
+    """
+    Extracts a coarse sample of snapshots and bisects the intervals where the names changed.
+
+    The first capture in every SAMPLE_INTERVAL_DAYS period is extracted, along with the first and the last snapshot.
+    Each interval between neighbouring extracted snapshots with different names is split at its middle capture
+    until the change is pinned to two adjacent captures, so that the first and last dates of every student match
+    the full scan with O(changes x log n) fetches. Names that appear and disappear again between two sampled
+    snapshots with the same names are not detected.
+
+    Args:
+        snapshot_urls (List[str]): The snapshot URLs in chronological order, with the live URL last.
+        load_snapshot (Callable[[str], Optional[pd.DataFrame]]): Extracts the student timestamps of a snapshot,
+            or returns None if the snapshot could not be fetched.
+
+    Returns:
+        List[pd.DataFrame]: The student timestamps of the extracted snapshots in chronological order.
+    """
+    extracted = {}
+    failed = set()
+
+    def extract(index):
+        snapshot = load_snapshot(snapshot_urls[index])
+        if snapshot is None:
+            failed.add(index)
+            return False
+        extracted[index] = (snapshot, frozenset(snapshot['Name']))
+        return True
+
+    periods = set()
+    for index, url in enumerate(snapshot_urls):
+        match = SNAPSHOT_TIMESTAMP.search(url)
+        period = datetime.datetime.strptime(match.group(1), '%Y%m%d').toordinal() // SAMPLE_INTERVAL_DAYS \
+            if match else None
+        if index in (0, len(snapshot_urls) - 1) or period not in periods:
+            periods.add(period)
+            extract(index)
+
+    sampled = sorted(extracted)
+    intervals = list(zip(sampled, sampled[1:]))
+    while intervals:
+        start, end = intervals.pop()
+        if extracted[start][1] == extracted[end][1]:
+            continue
+        candidates = [index for index in range(start + 1, end) if index not in failed]
+        if not candidates:
+            continue
+        middle = candidates[len(candidates) // 2]
+        if extract(middle):
+            intervals += [(start, middle), (middle, end)]
+        else:
+            intervals.append((start, end))
+
+    increment("snapshots_skipped", len(snapshot_urls) - len(extracted) - len(failed))
+    logging.info(f"Extracted {len(extracted)} of {len(snapshot_urls)} snapshots")
+
+    return [extracted[index][0] for index in sorted(extracted)]
+
+
+def _load_snapshot(url: str, university: str, headless: bool = False) -> Optional[pd.DataFrame]:
+    """
+    Fetches a snapshot and extracts the student timestamps from it.
+
+    The names of a live page are reused from the previous run if the page and its search module did not change,
+    and the search module is not loaded or validated again.
+
+    Args:
+        url (str): The URL of the snapshot.
+        university (str): The name of the university.
+        headless (bool): If True, search modules are validated without user input. Default is False.
+
+    Returns:
+        Optional[pd.DataFrame]: The student timestamps, or None if the page could not be fetched.
+    """
+    page_source = get_page(url)
+    if not page_source:
+        return None
+
+    names = _previous_names(url, page_source)
+    if names is not None:
+        increment("extractions_skipped")
+        return _timestamps_from_names(names, url, university=university)
+
+    load_search_module(validation_url=url, headless=headless)
+    snapshot = _extract_timestamps_from_snapshot(page_source, url, university=university)
+
+    if not is_archived(url):
+        entry = load_live_entry(url)
+        if entry.get('hash') == content_hash(page_source):
+            entry.update({'names': snapshot['Name'].tolist(), 'module': module_fingerprint(url)})
+            save_live_entry(url, entry)
+    return snapshot
+
+
+def _previous_names(url: str, page_source: str) -> Optional[List[str]]:
+    """
+    Returns the names extracted from the same content of a live page in an earlier run.
+
+    Names are reused only if neither the page content nor the search module changed since they were extracted.
+
+    Args:
+        url (str): The URL of the live page.
+        page_source (str): The current content of the page.
+
+    Returns:
+        Optional[List[str]]: The previous names, or None if the page must be extracted again.
+    """
+    if is_archived(url):
+        return None
+    entry = load_live_entry(url)
+    if entry.get('names') is None or entry.get('hash') != content_hash(page_source):
+        return None
+    if entry.get('module') is None or entry['module'] != module_fingerprint(url):
+        return None
+    return entry['names']
+
+
 def _extract_timestamps_from_snapshot(page_source: str, url: str, university: str = None) -> pd.DataFrame:
     """
     Extracts student timestamps from the webpage snapshot.
@@ -222,8 +497,8 @@ def _extract_timestamps_from_snapshot(page_source: str, url: str, university: st
             - Name: The name of the student.
             - University: The name of the university.
             - URL: The URL of the webpage snapshot.
-            - Date: The date of the snapshot.
             - Active: The active status of the student.
+    The date of the snapshot is added from the URL when the timestamps are processed.
 
     Args:
         page_source (str): The HTML source code of the page.
@@ -236,25 +511,38 @@ def _extract_timestamps_from_snapshot(page_source: str, url: str, university: st
     Raises:
         SystemExit: If an unexpected error occurs during the name search process.
     """
-    columns = ['Name', 'University', 'URL', 'Date', 'Active']
-    data = []
-
     try:
         names = search_names(page_source, url)
     except Exception as e:
         logging.error(e)
         names = []
 
-    date, status = _parse_date(url)
+    return _timestamps_from_names(names, url, university=university)
+
+
+def _timestamps_from_names(names: List[str], url: str, university: str = None) -> pd.DataFrame:
+    """
+    Builds the student timestamps of a snapshot from the names found in it.
+
+    The date is not stored per name; it is parsed once per capture by schema.observations.
 
-    for name in names:
-        data.append({
-            'Name': name,
-            'University': university,
-            'URL': url,
-            'Date': date,
-            'Active': status
-        })
+    Args:
+        names (List[str]): The student names.
+        url (str): The URL of the webpage snapshot.
+        university (str, optional): The name of the university. Default is None.
+
+    Returns:
+        pd.DataFrame: A DataFrame with one row per name.
+    """
+    columns = ['Name', 'University', 'URL', 'Active']
+    _, status = _parse_date(url)
+
+    data = [{
+        'Name': name,
+        'University': university,
+        'URL': url,
+        'Active': status
+    } for name in names]
 
     return pd.DataFrame(data, columns=columns)
 
@@ -0,0 +1,183 @@
+"""
+This module provides re-extraction of student data from locally stored pages.
+After a search module is regenerated or fixed by hand, the names are extracted again from the snapshots in the
+page cache and the WARC archive, without pagination probing or downloads. Pages are processed in parallel
+processes, and the entries of the re-extracted programs are replaced in the dataset.
+
+Functions:
+    reextract_programs(programs: List[tuple], workers: Optional[int] = None) -> pd.DataFrame:
+        Re-extracts the student data of the programs from locally stored pages and updates the dataset.
+
+    select_programs(programs: List[tuple], selected: Optional[List[str]]) -> List[tuple]:
+        Selects programs by university name or URL.
+
+    _stored_snapshots(program_tuple: tuple, dataset: pd.DataFrame) -> Optional[List[Tuple[str, str]]]:
+        Finds the locally stored snapshots of a program.
+
+    _extract_page(task: Tuple[str, str, str]) -> pd.DataFrame:
+        Extracts the student timestamps from a stored snapshot in a worker process.
+
+    _init_worker() -> None:
+        Limits the sandbox of a worker process to a single search module worker.
+"""
+
+import os
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+import pandas as pd
+
+from . import sandbox
+from .page_cache import is_archived, load_page, load_snapshot_list, load_live_entry
+from .transport import recorded_page
+from .program_page import raw_snapshot_url, _extract_timestamps_from_snapshot
+from .database import process_data, update_dataset, load_dataset
+from .person_id import resolve_person_ids
+
+PLACEMENT_COLUMNS = ['Placement', 'PlacementURL', 'Placement_Date']
+
+
+def reextract_programs(programs: List[tuple], workers: Optional[int] = None) -> pd.DataFrame:
+    """
+    Re-extracts the student data of the programs from locally stored pages and updates the dataset.
+
+    The placements of the existing entries are kept for the same people, other people are marked as not placed.
+    Programs without stored pages, or whose existing entries were found on a live page that is not stored,
+    are skipped.
+
+    Args:
+        programs (List[tuple]): The program tuples with the URL, placement URL and university name.
+        workers (Optional[int]): The number of worker processes. Defaults to the number of CPUs.
+
+    Returns:
+        pd.DataFrame: The re-extracted data of the programs.
+    """
+    dataset = load_dataset()
+    tasks = []
+    for program_tuple in programs:
+        snapshots = _stored_snapshots(program_tuple, dataset)
+        if snapshots is None:
+            logging.warning(f"Skipping {program_tuple[2]} to keep its active students.")
+            continue
+        logging.info(f"Found {len(snapshots)} stored snapshots for {program_tuple[2]}")
+        tasks += [(page_source, url, program_tuple[2]) for url, page_source in snapshots]
+
+    if not tasks:
+        logging.info("No stored snapshots found. Skipping update.")
+        return pd.DataFrame()
+
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        timestamps = list(executor.map(_extract_page, tasks, chunksize=max(1, len(tasks) // (workers * 4))))
+
+    data = pd.DataFrame()
+    universities = []
+    for program_tuple in programs:
+        university = program_tuple[2]
+        program_timestamps = [t for t, task in zip(timestamps, tasks) if task[2] == university and not t.empty]
+        if not program_timestamps:
+            continue
+        program_data = process_data(pd.concat(program_timestamps, ignore_index=True), log=True)
+
+        previous = dataset[dataset['University'] == university] if 'University' in dataset.columns else dataset
+        if not previous.empty and 'Person_ID' in previous.columns:
+            program_data['Person_ID'] = resolve_person_ids(program_data, existing=previous)
+            placements = previous.drop_duplicates('Person_ID').set_index('Person_ID')
+            for column in PLACEMENT_COLUMNS:
+                if column in placements.columns:
+                    program_data[column] = program_data['Person_ID'].map(placements[column])
+
+        program_data['Placement'] = program_data.get('Placement', pd.Series(False, index=program_data.index)) \
+            .fillna(False).astype(bool)
+        program_data['PlacementURL'] = program_tuple[1]
+
+        data = pd.concat([data, program_data], ignore_index=True)
+        universities.append(university)
+
+    if universities:
+        update_dataset(data, replace=universities)
+    return data
+
+
+def select_programs(programs: List[tuple], selected: Optional[List[str]]) -> List[tuple]:
+    """
+    Selects programs by university name or URL.
+
+    Args:
+        programs (List[tuple]): The program tuples.
+        selected (Optional[List[str]]): University names, or substrings of program URLs. All programs if empty.
+
+    Returns:
+        List[tuple]: The selected programs.
+    """
+    if not selected:
+        return programs
+    return [
+        program_tuple for program_tuple in programs
+        if any(name == program_tuple[2] or name in program_tuple[0] for name in selected)
+    ]
+
+
+def _stored_snapshots(program_tuple: tuple, dataset: pd.DataFrame) -> Optional[List[Tuple[str, str]]]:
+    """
+    Finds the locally stored snapshots of a program.
+
+    Snapshot URLs are taken from the cached snapshot list of the program page and from the snapshots of the
+    existing entries, which include pagination pages. Archived pages are read from the page cache or the WARC
+    archive, preferring the raw capture of a snapshot over the rewritten page. Live pages are read from their
+    stored live entry.
+
+    Args:
+        program_tuple (tuple): The program tuple.
+        dataset (pd.DataFrame): The existing dataset.
+
+    Returns:
+        Optional[List[Tuple[str, str]]]: The URL and content of every stored snapshot, or None if a live page of
+            the existing entries is not stored, since the active students and end dates would be lost.
+    """
+    urls = list(load_snapshot_list(program_tuple[0]))
+    if 'Snapshots' in dataset.columns:
+        rows = dataset[dataset['University'] == program_tuple[2]]
+        urls += [url for snapshots in rows['Snapshots'] for url in snapshots]
+    else:
+        rows = pd.DataFrame()
+
+    stored = []
+    for url in dict.fromkeys(urls):
+        if is_archived(url):
+            locations = dict.fromkeys([raw_snapshot_url(url), url])
+            page_source = next(filter(None, (load_page(location) or recorded_page(location)
+                                             for location in locations)), None)
+        else:
+            page_source = load_live_entry(url).get('content') or recorded_page(url)
+        if page_source:
+            stored.append((url, page_source))
+
+    found = {url for url, _ in stored}
+    live = {url for snapshots in rows.get('Snapshots', []) for url in snapshots if not is_archived(url)}
+    if live - found:
+        logging.warning(f"No stored live page for {program_tuple[2]}: {', '.join(sorted(live - found))}")
+        return None
+    return stored
+
+
+def _extract_page(task: Tuple[str, str, str]) -> pd.DataFrame:
+    """
+    Extracts the student timestamps from a stored snapshot in a worker process.
+
+    Args:
+        task (Tuple[str, str, str]): The page content, the snapshot URL and the university name.
+
+    Returns:
+        pd.DataFrame: The student timestamps of the snapshot.
+    """
+    page_source, url, university = task
+    return _extract_timestamps_from_snapshot(page_source, url, university=university)
+
+
+def _init_worker() -> None:
+    """
+    Limits the sandbox of a worker process to a single search module worker.
+    """
+    sandbox.SANDBOX_WORKERS = min(sandbox.SANDBOX_WORKERS, 1)
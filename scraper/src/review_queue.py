@@ -0,0 +1,191 @@
+"""
+This module provides a review queue for search module validation in headless runs.
+Extractions that cannot be accepted automatically are appended to a JSON lines file and approved or rejected
+later, so that unattended runs don't block on user input.
+
+Each entry of the queue has the following fields:
+    - module: The name of the search module.
+    - url: The URL of the validated snapshot.
+    - names: The extracted names.
+    - reason: Why the extraction was not accepted automatically.
+    - status: One of "pending", "approved", "rejected" and "resolved".
+    - feedback: The error description provided when the extraction was rejected.
+
+Functions:
+    enqueue_review(module_name: str, url: str, names: List[str], reason: str) -> None:
+        Appends an extraction to the review queue.
+
+    approved_names(module_name: str) -> Optional[List[str]]:
+        Returns the names of the latest approved extraction of the module.
+
+    pop_rejection(module_name: str) -> Optional[str]:
+        Returns the feedback of a rejected extraction of the module and marks it as resolved.
+
+    review_pending() -> None:
+        Prompts the user to approve or reject pending extractions.
+
+    _update_entry(reviewed: dict) -> None:
+        Saves the review of a pending extraction to the queue.
+
+    _entry_key(entry: dict) -> tuple:
+        Returns the key that identifies an entry of the queue.
+
+    _load_queue() -> List[dict]:
+        Loads the entries of the review queue.
+
+    _save_queue(entries: List[dict]) -> None:
+        Saves the entries of the review queue.
+"""
+
+import os
+import json
+import logging
+import datetime
+from typing import List, Optional
+
+from .utils import read_config, resolve_path, atomic_write, file_lock
+
+QUEUE_PATH = resolve_path(read_config().get("REVIEW_QUEUE", "scraper/review_queue.jsonl"))
+LOCK_PATH = QUEUE_PATH + ".lock"
+
+
+def enqueue_review(module_name: str, url: str, names: List[str], reason: str) -> None:
+    """
+    Appends an extraction to the review queue.
+
+    Args:
+        module_name (str): The name of the search module.
+        url (str): The URL of the validated snapshot.
+        names (List[str]): The extracted names.
+        reason (str): Why the extraction was not accepted automatically.
+    """
+    entry = {
+        "module": module_name,
+        "url": url,
+        "names": list(names),
+        "reason": reason,
+        "status": "pending",
+        "feedback": "",
+        "queued": datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    }
+    with file_lock(LOCK_PATH):
+        with open(QUEUE_PATH, 'a') as file:
+            file.write(json.dumps(entry) + "\n")
+    logging.info(f"Queued {module_name} extraction for review: {reason}")
+
+
+def approved_names(module_name: str) -> Optional[List[str]]:
+    """
+    Returns the names of the latest approved extraction of the module.
+
+    Args:
+        module_name (str): The name of the search module.
+
+    Returns:
+        Optional[List[str]]: The approved names, or None if no extraction of the module was approved.
+    """
+    approved = [e for e in _load_queue() if e["module"] == module_name and e["status"] == "approved"]
+    return approved[-1]["names"] if approved else None
+
+
+def pop_rejection(module_name: str) -> Optional[str]:
+    """
+    Returns the feedback of a rejected extraction of the module and marks it as resolved.
+
+    Args:
+        module_name (str): The name of the search module.
+
+    Returns:
+        Optional[str]: The feedback, or None if there is no unresolved rejection.
+    """
+    with file_lock(LOCK_PATH):
+        entries = _load_queue()
+        for entry in entries:
+            if entry["module"] == module_name and entry["status"] == "rejected":
+                entry["status"] = "resolved"
+                _save_queue(entries)
+                return entry["feedback"] or "Extraction rejected in review"
+    return None
+
+
+def review_pending() -> None:
+    """
+    Prompts the user to approve or reject pending extractions.
+
+    An empty answer approves the extraction, any other answer rejects it with the answer as the error description.
+    Rejected modules are regenerated with the description on the next run. Every answer is saved to the queue
+    as it is read again, so that entries appended by a concurrent headless run are kept.
+    """
+    entries = _load_queue()
+    pending = [entry for entry in entries if entry["status"] == "pending"]
+    logging.info(f"Found {len(pending)} extraction{'s' if len(pending) != 1 else ''} to review")
+
+    for entry in pending:
+        print(f"\n{entry['url']} ({entry['reason']})")
+        print("Extracted names: ", entry["names"])
+        user_prompt = input("Press enter to approve or provide error description: ")
+        if user_prompt:
+            entry["status"] = "rejected"
+            entry["feedback"] = user_prompt
+        else:
+            entry["status"] = "approved"
+        _update_entry(entry)
+
+
+def _update_entry(reviewed: dict) -> None:
+    """
+    Saves the review of a pending extraction to the queue.
+
+    The queue is read again under the lock, and only the status and feedback of the reviewed entry are changed.
+
+    Args:
+        reviewed (dict): The reviewed entry.
+    """
+    with file_lock(LOCK_PATH):
+        entries = _load_queue()
+        for entry in entries:
+            if _entry_key(entry) == _entry_key(reviewed) and entry["status"] == "pending":
+                entry["status"] = reviewed["status"]
+                entry["feedback"] = reviewed["feedback"]
+                break
+        _save_queue(entries)
+
+
+def _entry_key(entry: dict) -> tuple:
+    """
+    Returns the key that identifies an entry of the queue.
+
+    Args:
+        entry (dict): The entry.
+
+    Returns:
+        tuple: The module, URL, time of queueing and names of the entry.
+    """
+    return entry["module"], entry["url"], entry.get("queued"), tuple(entry["names"])
+
+
+def _load_queue() -> List[dict]:
+    """
+    Loads the entries of the review queue.
+
+    Returns:
+        List[dict]: The entries, or an empty list if the queue file does not exist.
+    """
+    if not os.path.exists(QUEUE_PATH):
+        return []
+    with open(QUEUE_PATH, 'r') as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def _save_queue(entries: List[dict]) -> None:
+    """
+    Saves the entries of the review queue.
+
+    The caller holds the lock of the queue.
+
+    Args:
+        entries (List[dict]): The entries to save.
+    """
+    with atomic_write(QUEUE_PATH) as file:
+        for entry in entries:
+            file.write(json.dumps(entry) + "\n")
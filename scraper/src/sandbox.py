@@ -0,0 +1,230 @@
+"""
+This module provides a pool of sandboxed worker processes to run generated search modules.
+Search modules are written by GPT and may loop forever or exhaust memory. Running them in pre-started worker
+processes with a time limit per call and a memory limit per worker protects the scraper, and workers keep loaded
+modules in memory, so that a module is compiled once per worker rather than once per snapshot.
+
+Classes:
+    SandboxPool:
+        Pool of worker processes that run search modules with time and memory limits.
+
+Functions:
+    get_sandbox() -> Optional[SandboxPool]:
+        Returns the shared sandbox pool, starting it on first use.
+
+    _worker_main(connection, memory_limit_mb: int) -> None:
+        Runs search modules sent by the parent process.
+"""
+
+import atexit
+import hashlib
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional
+
+from .utils import read_config
+from .metrics import observe
+from .exceptions import ModuleError
+
+_config = read_config()
+SANDBOX_WORKERS = _config.get("SANDBOX_WORKERS", 0)
+SANDBOX_TIMEOUT = _config.get("SANDBOX_TIMEOUT", 30)
+SANDBOX_MEMORY_MB = _config.get("SANDBOX_MEMORY_MB", 1024)
+
+# Number of compiled modules kept by each worker
+MODULE_CACHE_SIZE = 32
+
+_sandbox = None
+_sandbox_lock = threading.Lock()
+
+
+class SandboxPool:
+    """
+    Pool of worker processes that run search modules with time and memory limits.
+
+    Each call is sent to an idle worker together with the module code. A worker that doesn't answer within
+    the time limit, or that dies, is terminated and replaced by a new one.
+
+    Attributes:
+        num_workers (int): The number of worker processes.
+        timeout (float): The time limit of a call in seconds.
+        memory_limit_mb (int): The address space limit of a worker in megabytes.
+    """
+
+    def __init__(self, num_workers: int, timeout: float, memory_limit_mb: int):
+        methods = multiprocessing.get_all_start_methods()
+        self._context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+        self.num_workers = num_workers
+        self.timeout = timeout
+        self.memory_limit_mb = memory_limit_mb
+        self._workers = [self._start_worker() for _ in range(num_workers)]
+        self._idle = queue.Queue()
+        for index in range(num_workers):
+            self._idle.put(index)
+
+    def run(self, code: str, html_content: str) -> List[str]:
+        """
+        Extracts names from the HTML content with the search module code in a worker process.
+
+        The stages timed by the worker are recorded in the metrics of the parent process, since the metrics of
+        the worker are never exported.
+
+        Args:
+            code (str): The source code of the search module.
+            html_content (str): The raw HTML content to search for names.
+
+        Returns:
+            List[str]: A list of names found within the HTML content.
+
+        Raises:
+            ModuleError: If the module fails to load or execute, exceeds the time limit, or crashes the worker.
+        """
+        index = self._idle.get()
+        try:
+            connection = self._workers[index][1]
+            try:
+                connection.send((code, html_content))
+                if not connection.poll(self.timeout):
+                    self._restart_worker(index)
+                    raise ModuleError.timeout(self.timeout)
+                status, result, timings = connection.recv()
+            except (EOFError, OSError):
+                self._restart_worker(index)
+                raise ModuleError.execution_error()
+            if status == "memory_limit":
+                self._restart_worker(index)
+        finally:
+            self._idle.put(index)
+
+        for stage, seconds in timings.items():
+            observe("stage_seconds", seconds, stage=stage)
+        if status == "ok":
+            return result
+        raise getattr(ModuleError, status)()
+
+    def close(self) -> None:
+        """
+        Stops all worker processes.
+        """
+        for process, connection in self._workers:
+            try:
+                connection.send(None)
+            except (OSError, BrokenPipeError):
+                pass
+            process.join(timeout=1)
+            if process.is_alive():
+                process.kill()
+            connection.close()
+        self._workers = []
+
+    def _start_worker(self) -> tuple:
+        """
+        Starts a worker process.
+
+        Returns:
+            tuple: The process and the parent end of its connection.
+        """
+        parent_connection, child_connection = self._context.Pipe()
+        process = self._context.Process(
+            target=_worker_main,
+            args=(child_connection, self.memory_limit_mb),
+            daemon=True
+        )
+        process.start()
+        child_connection.close()
+        return process, parent_connection
+
+    def _restart_worker(self, index: int) -> None:
+        """
+        Terminates a worker process and starts a new one in its place.
+
+        Args:
+            index (int): The index of the worker.
+        """
+        process, connection = self._workers[index]
+        process.kill()
+        process.join()
+        connection.close()
+        logging.warning("Restarted search module worker")
+        self._workers[index] = self._start_worker()
+
+
+def get_sandbox() -> Optional[SandboxPool]:
+    """
+    Returns the shared sandbox pool, starting it on first use.
+
+    Returns:
+        Optional[SandboxPool]: The pool, or None if SANDBOX_WORKERS is zero.
+    """
+    global _sandbox
+    if SANDBOX_WORKERS <= 0:
+        return None
+    with _sandbox_lock:
+        if _sandbox is None:
+            _sandbox = SandboxPool(SANDBOX_WORKERS, SANDBOX_TIMEOUT, SANDBOX_MEMORY_MB)
+            atexit.register(_sandbox.close)
+    return _sandbox
+
+
+def _worker_main(connection, memory_limit_mb: int) -> None:
+    """
+    Runs search modules sent by the parent process.
+
+    The worker receives pairs of module code and HTML content, and answers with ("ok", names), or with the
+    name of the ModuleError constructor for the failure and None, followed by the seconds spent in the parsing
+    and extraction stages. Compiled modules are cached by the hash of their code. The worker exits when it receives None, or after running out of memory.
+
+    Args:
+        connection: The child end of the connection to the parent process.
+        memory_limit_mb (int): The address space limit of the worker in megabytes.
+    """
+    from .search_module import _parse_source, _exec_code, _extract_names
+
+    try:
+        import resource
+        limit = memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ImportError, ValueError, OSError):
+        pass
+
+    modules = OrderedDict()
+    while True:
+        try:
+            request = connection.recv()
+        except (EOFError, KeyboardInterrupt):
+            return
+        if request is None:
+            return
+
+        code, html_content = request
+        key = hashlib.sha256(code.encode('utf-8')).hexdigest()
+        try:
+            if key not in modules:
+                modules[key] = _exec_code(code)
+                if len(modules) > MODULE_CACHE_SIZE:
+                    modules.popitem(last=False)
+            modules.move_to_end(key)
+        except ModuleError:
+            connection.send(("load_error", None, {}))
+            continue
+
+        timings = {}
+        try:
+            start = time.perf_counter()
+            source = _parse_source(html_content)
+            timings["parse_source"] = time.perf_counter() - start
+            start = time.perf_counter()
+            try:
+                names = _extract_names(modules[key], source)
+            finally:
+                timings["extract_names"] = time.perf_counter() - start
+            connection.send(("ok", names, timings))
+        except ModuleError:
+            connection.send(("execution_error", None, timings))
+        except MemoryError:
+            connection.send(("memory_limit", None, timings))
+            return
@@ -0,0 +1,239 @@
+"""
+This module defines the typed in-memory schema of the student data.
+Universities and URLs are stored as categoricals, so that every row holds an integer code into a table of distinct
+values instead of a repeated Python string, and dates are datetime64 columns, which are int64 timestamps parsed once
+when data enters the pipeline and formatted once when a dataset version is written. The snapshots of a student are
+categorical arrays whose codes index the capture table of the program, the snapshot URLs in chronological order.
+
+Functions:
+    observations(data: pd.DataFrame) -> pd.DataFrame:
+        Casts the student timestamps of snapshots to the observation schema.
+
+    dataset(data: pd.DataFrame) -> pd.DataFrame:
+        Casts student entries to the dataset schema.
+
+    concat(frames: List[pd.DataFrame]) -> pd.DataFrame:
+        Concatenates typed frames and keeps the categorical columns.
+
+    to_records(data: pd.DataFrame) -> List[dict]:
+        Converts typed student entries to JSON serializable records.
+
+    capture_table(urls: Iterable[str]) -> pd.CategoricalDtype:
+        Builds the capture table of snapshot URLs.
+
+    capture_dates(urls: pd.Series) -> pd.Series:
+        Parses the dates of snapshot URLs.
+
+    snapshot_arrays(keys: pd.Series, urls: pd.Series) -> pd.Series:
+        Groups snapshot URLs into one categorical array per key.
+"""
+
+import datetime
+from typing import Iterable, List
+
+import numpy as np
+import pandas as pd
+
+OBSERVATION_COLUMNS = ['Name', 'University', 'URL', 'Date', 'Active']
+CATEGORICAL_COLUMNS = ['University', 'URL', 'PlacementURL']
+DATE_COLUMNS = ['Start_Date', 'End_Date']
+BOOLEAN_COLUMNS = ['Active', 'Placement']
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def observations(data: pd.DataFrame) -> pd.DataFrame:
+    """
+    Casts the student timestamps of snapshots to the observation schema.
+
+    The snapshot URLs are encoded against their capture table, and the date of every row is taken from the parsed
+    date of its capture, so that each snapshot URL is parsed once however many names it holds.
+
+    Args:
+        data (pd.DataFrame): The student timestamps with 'Name', 'University', 'URL' and 'Active' columns.
+
+    Returns:
+        pd.DataFrame: The timestamps with categorical 'University' and 'URL', a datetime 'Date' and a boolean 'Active'.
+    """
+    data = data.reindex(columns=OBSERVATION_COLUMNS)
+    urls = pd.Categorical(data['URL'], dtype=capture_table(data['URL'].dropna().unique()))
+    dates = capture_dates(pd.Series(urls.categories, dtype=object)).to_numpy()
+
+    return data.assign(
+        University=data['University'].astype('category'),
+        URL=urls,
+        Date=pd.Series(dates[urls.codes], index=data.index) if len(dates) else pd.Series(pd.NaT, index=data.index),
+        Active=data['Active'].fillna(False).astype(bool)
+    )
+
+
+def dataset(data: pd.DataFrame) -> pd.DataFrame:
+    """
+    Casts student entries to the dataset schema.
+
+    Entries loaded from a dataset file hold dates as strings and snapshots as lists of URLs. They are converted to
+    datetime columns and to snapshot arrays over the capture table of each university. Typed entries are returned
+    with their snapshots unchanged.
+
+    Args:
+        data (pd.DataFrame): The student entries.
+
+    Returns:
+        pd.DataFrame: The entries with categorical 'University', 'URL' and 'PlacementURL', datetime 'Start_Date' and
+            'End_Date', boolean 'Active' and 'Placement', and numeric 'Years' columns.
+    """
+    if data.empty:
+        return data
+
+    data = data.copy()
+    for column in CATEGORICAL_COLUMNS:
+        if column in data.columns:
+            data[column] = data[column].astype('category')
+    for column in DATE_COLUMNS:
+        if column in data.columns:
+            data[column] = pd.to_datetime(data[column], format=DATE_FORMAT)
+    for column in BOOLEAN_COLUMNS:
+        if column in data.columns:
+            data[column] = data[column].fillna(False).astype(bool)
+    if 'Years' in data.columns:
+        data['Years'] = pd.to_numeric(data['Years'], errors='coerce')
+
+    if 'Snapshots' in data.columns:
+        listed = data['Snapshots'].map(lambda snapshots: not isinstance(snapshots, pd.Categorical))
+        if listed.any():
+            data['Snapshots'] = data['Snapshots'].where(
+                ~listed, _encode_snapshots(data.loc[listed, ['University', 'Snapshots']])
+            )
+    return data
+
+
+def concat(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Concatenates typed frames and keeps the categorical columns.
+
+    Categorical columns with different categories are concatenated as strings by pandas, so they are cast back
+    to categoricals over the union of the categories.
+
+    Args:
+        frames (List[pd.DataFrame]): The frames to concatenate.
+
+    Returns:
+        pd.DataFrame: The concatenated frame with a new index.
+    """
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return pd.DataFrame()
+
+    data = pd.concat(frames, ignore_index=True)
+    for column in CATEGORICAL_COLUMNS:
+        if column in data.columns and not isinstance(data[column].dtype, pd.CategoricalDtype):
+            data[column] = data[column].astype('category')
+    return data
+
+
+def to_records(data: pd.DataFrame) -> List[dict]:
+    """
+    Converts typed student entries to JSON serializable records.
+
+    Dates are formatted once per column, categoricals are decoded to strings, snapshot arrays to lists of URLs,
+    and missing values to None.
+
+    Args:
+        data (pd.DataFrame): The student entries.
+
+    Returns:
+        List[dict]: One record per entry, with the columns of the dataset file.
+    """
+    data = data.copy()
+    for column in data.columns:
+        values = data[column]
+        if pd.api.types.is_datetime64_any_dtype(values):
+            data[column] = values.dt.strftime(DATE_FORMAT)
+        elif isinstance(values.dtype, pd.CategoricalDtype):
+            data[column] = values.astype(object)
+        elif values.dtype == object:
+            data[column] = values.map(
+                lambda value: value.tolist() if isinstance(value, (np.ndarray, pd.api.extensions.ExtensionArray))
+                else value
+            )
+
+    data = data.astype(object).where(data.notna(), None)
+    return data.to_dict(orient='records')
+
+
+def capture_table(urls: Iterable[str]) -> pd.CategoricalDtype:
+    """
+    Builds the capture table of snapshot URLs.
+
+    Args:
+        urls (Iterable[str]): The distinct snapshot URLs.
+
+    Returns:
+        pd.CategoricalDtype: The URLs in chronological order, with live URLs last.
+    """
+    urls = pd.Series(list(urls), dtype=object)
+    order = pd.DataFrame({'Date': capture_dates(urls), 'URL': urls}).sort_values(['Date', 'URL'], kind='stable')
+    return pd.CategoricalDtype(pd.Index(order['URL'], dtype=object))
+
+
+def capture_dates(urls: pd.Series) -> pd.Series:
+    """
+    Parses the dates of snapshot URLs.
+
+    Args:
+        urls (pd.Series): The snapshot URLs.
+
+    Returns:
+        pd.Series: The dates of the snapshots at midnight, today for live URLs.
+    """
+    stamps = urls.astype(str).str.extract(r'/web/(\d{8})\d{6}', expand=False)
+    dates = pd.to_datetime(stamps, format='%Y%m%d', errors='coerce')
+    return dates.fillna(pd.Timestamp(datetime.date.today())).astype('datetime64[ns]')
+
+
+def snapshot_arrays(keys: pd.Series, urls: pd.Series) -> pd.Series:
+    """
+    Groups snapshot URLs into one categorical array per key.
+
+    Every array shares the categories of the URLs, so it holds only the integer codes of the snapshots.
+
+    Args:
+        keys (pd.Series): The key of every snapshot, e.g. the person ID.
+        urls (pd.Series): The categorical snapshot URLs, in the order kept within each key.
+
+    Returns:
+        pd.Series: The snapshot arrays indexed by key, in sorted order of the keys.
+    """
+    order = np.argsort(keys.to_numpy(), kind='stable')
+    labels = keys.to_numpy()[order]
+    codes = urls.cat.codes.to_numpy()[order]
+
+    boundaries = np.flatnonzero(labels[1:] != labels[:-1]) + 1
+    starts = np.r_[0, boundaries] if len(labels) else np.array([], dtype=int)
+
+    arrays = np.empty(len(starts), dtype=object)
+    for position, chunk in enumerate(np.split(codes, boundaries) if len(labels) else []):
+        arrays[position] = pd.Categorical.from_codes(chunk, dtype=urls.dtype, validate=False)
+    return pd.Series(arrays, index=pd.Index(labels[starts], name=keys.name), dtype=object)
+
+
+def _encode_snapshots(data: pd.DataFrame) -> pd.Series:
+    """
+    Encodes lists of snapshot URLs as arrays over the capture table of each university.
+
+    Args:
+        data (pd.DataFrame): Entries with 'University' and 'Snapshots' columns.
+
+    Returns:
+        pd.Series: The snapshot arrays indexed like the entries.
+    """
+    exploded = data.explode('Snapshots')
+    encoded = pd.Series(np.empty(len(data), dtype=object), index=data.index)
+
+    for _, rows in exploded.groupby('University', observed=True, sort=False, dropna=False):
+        snapshots = rows['Snapshots'].dropna().astype(str)
+        dtype = capture_table(snapshots.unique())
+        urls = pd.Series(pd.Categorical(snapshots, dtype=dtype), index=snapshots.index)
+        arrays = snapshot_arrays(pd.Series(snapshots.index, index=snapshots.index), urls)
+        for row in rows.index.unique():
+            encoded.at[row] = arrays[row] if row in arrays.index else pd.Categorical([], dtype=dtype)
+    return encoded
@@ -5,19 +5,36 @@ Functions:
     search_names(html_content: str, url: str) -> List[str]:
         Searches for names in the provided HTML content using the appropriate search module.
 
+    search_names_with_code(html_content: str, code: str) -> List[str]:
+        Searches for names in the provided HTML content using the given search module code.
+
+    search_names_batch(pages: List[str], url: str) -> List[List[str]]:
+        Searches for names in several pages using the same search module.
+
+    module_fingerprint(url: str) -> Optional[str]:
+        Returns the hash of the search module code for the URL.
+
     _parse_source(html_content: str) -> BeautifulSoup:
         Parses the HTML content and removes script and style elements.
 
     _load_module(url: str) -> types.ModuleType:
         Loads the search module based on the provided URL.
 
+    _read_module(url: str) -> str:
+        Reads the code of the search module based on the provided URL, preferring a spec over Python code.
+
+    _exec_code(code: str) -> types.ModuleType:
+        Executes search module code in an isolated module namespace.
+
     _extract_names(module: types.ModuleType, soup: BeautifulSoup) -> List[str]:
         Extracts names using the provided module from the parsed HTML content.
 """
 
+import os
+import hashlib
 import importlib.util
 import warnings
-from typing import List
+from typing import List, Optional
 import types
 
 from bs4 import BeautifulSoup
@@ -25,6 +42,9 @@ from bs4 import BeautifulSoup
 
 from .utils import parse_module_name, load_sys_path
 from .exceptions import ModuleError
+from .sandbox import get_sandbox
+from .selector_spec import is_spec, spec_path, compile_spec, extract_names, extract_batch
+from .metrics import timed
 
 
 load_sys_path()
@@ -35,7 +55,8 @@ def search_names(html_content: str, url: str) -> list:
     Searches for names in the provided HTML content.
 
     This function parses the raw HTML content to extract and return a list of names.
-    The provided URL is used to load the appropriate search module.
+    The provided URL is used to load the appropriate search module. Spec modules run in the selector engine.
+    If the sandbox is enabled, Python modules run in a sandboxed worker process.
 
     Args:
         html_content (str): The raw HTML content to search for names.
@@ -47,12 +68,91 @@ def search_names(html_content: str, url: str) -> list:
     Raises:
         ModuleError: If there is an issue loading or executing the search module.
     """
+    _, filepath = parse_module_name(url)
+    if os.path.exists(spec_path(filepath)):
+        with timed("extract_names"):
+            return extract_names(compile_spec(_read_module(url)), html_content)
+
+    sandbox = get_sandbox()
+    if sandbox is not None:
+        with timed("sandbox_run"):
+            return sandbox.run(_read_module(url), html_content)
+
     source = _parse_source(html_content)
     search_module = _load_module(url)
     names = _extract_names(search_module, source)
     return names
 
 
+def search_names_with_code(html_content: str, code: str) -> list:
+    """
+    Searches for names in the provided HTML content using the given search module code.
+
+    The code is executed in a fresh module namespace, or in a sandboxed worker process if the sandbox
+    is enabled, so that candidate modules can be tried without writing them to the search modules directory.
+    Code that is a JSON spec runs in the selector engine.
+
+    Args:
+        html_content (str): The raw HTML content to search for names.
+        code (str): The source code of the search module.
+
+    Returns:
+        List[str]: A list of names found within the HTML content.
+
+    Raises:
+        ModuleError: If there is an issue loading or executing the search module.
+    """
+    if is_spec(code):
+        return extract_names(compile_spec(code), html_content)
+
+    sandbox = get_sandbox()
+    if sandbox is not None:
+        return sandbox.run(code, html_content)
+
+    source = _parse_source(html_content)
+    search_module = _exec_code(code)
+    names = _extract_names(search_module, source)
+    return names
+
+
+def search_names_batch(pages: List[str], url: str) -> List[List[str]]:
+    """
+    Searches for names in several pages using the same search module.
+
+    A spec module is compiled once and evaluated on all pages, other modules are run page by page.
+
+    Args:
+        pages (List[str]): The raw HTML content of the pages.
+        url (str): The URL used to load the search module.
+
+    Returns:
+        List[List[str]]: The names found in each page.
+
+    Raises:
+        ModuleError: If there is an issue loading or executing the search module.
+    """
+    _, filepath = parse_module_name(url)
+    if os.path.exists(spec_path(filepath)):
+        return extract_batch(compile_spec(_read_module(url)), pages)
+    return [search_names(page, url) for page in pages]
+
+
+def module_fingerprint(url: str) -> Optional[str]:
+    """
+    Returns the hash of the search module code for the URL.
+
+    Args:
+        url (str): The URL used to determine the module.
+
+    Returns:
+        Optional[str]: The SHA-256 hex digest of the module code, or None if there is no module.
+    """
+    try:
+        return hashlib.sha256(_read_module(url).encode('utf-8')).hexdigest()
+    except ModuleError:
+        return None
+
+
 def _parse_source(html_content: str) -> BeautifulSoup:
     """
         Parses the HTML content and removes script and style elements.
@@ -63,8 +163,9 @@ def _parse_source(html_content: str) -> BeautifulSoup:
         Returns:
             BeautifulSoup: The parsed HTML content.
     """
-    parsed_source = BeautifulSoup(html_content, 'html.parser')
-    [s.extract() for s in parsed_source(['script', 'style'])]
+    with timed("parse_source"):
+        parsed_source = BeautifulSoup(html_content, 'html.parser')
+        [s.extract() for s in parsed_source(['script', 'style'])]
     return parsed_source
 
 
@@ -95,6 +196,52 @@ def _load_module(url: str) -> types.ModuleType:
         raise ModuleError.load_error()
 
 
+def _read_module(url: str) -> str:
+    """
+    Reads the code of the search module based on the provided URL, preferring a spec over Python code.
+
+    Args:
+        url (str): The URL used to determine the module to read.
+
+    Returns:
+        str: The source code of the module.
+
+    Raises:
+        ModuleError: If the module file cannot be read.
+    """
+    _, filepath = parse_module_name(url)
+    if os.path.exists(spec_path(filepath)):
+        filepath = spec_path(filepath)
+    try:
+        with open(filepath, 'r') as file:
+            return file.read()
+    except OSError:
+        raise ModuleError.load_error()
+
+
+def _exec_code(code: str) -> types.ModuleType:
+    """
+    Executes search module code in an isolated module namespace.
+
+    Args:
+        code (str): The source code of the search module.
+
+    Returns:
+        types.ModuleType: The module created from the code.
+
+    Raises:
+        ModuleError: If the code fails to compile or execute.
+    """
+    module = types.ModuleType("search_module_candidate")
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", SyntaxWarning)
+            exec(compile(code, module.__name__, "exec"), module.__dict__)
+        return module
+    except Exception:
+        raise ModuleError.load_error()
+
+
 def _extract_names(module: types.ModuleType, soup: BeautifulSoup) -> List[str]:
     """
     Extracts names using the provided module from the parsed HTML content.
@@ -108,9 +255,13 @@ def _extract_names(module: types.ModuleType, soup: BeautifulSoup) -> List[str]:
 
     Raises:
         ModuleError: If there is an issue during the execution of the module.
+        MemoryError: If the module runs out of memory, so that a sandbox worker can report the memory limit.
     """
     try:
-        names = module.extract_phd_student_names(soup)
+        with timed("extract_names"):
+            names = module.extract_phd_student_names(soup)
         return [name.replace('\n', '').replace(r'\s+', ' ') for name in names if name]
+    except MemoryError:
+        raise
     except Exception:
         raise ModuleError.execution_error()
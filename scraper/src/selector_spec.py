@@ -0,0 +1,287 @@
+"""
+This module provides a declarative format for search modules and an engine that runs it.
+Instead of Python code, a search module can be a JSON spec of selectors, filters and name normalization rules.
+Specs are compiled once into XPath expressions and evaluated on pages parsed with lxml, so that many snapshots
+can be processed without executing generated code.
+
+Spec format:
+    items (str): CSS selector, or XPath expression starting with "/" or "./", matching one element per person.
+    name (str, optional): Selector relative to the item for the element with the name. Defaults to the item.
+    require (list, optional): Filters that an item must match, each with a "select" relative selector
+        (defaults to the item) and a "text" regular expression searched in the selected text.
+    exclude (list, optional): Filters in the same format that an item must not match.
+    normalize (dict, optional): Name normalization rules:
+        - reorder_comma (bool): Converts "Last, First" to "First Last".
+        - remove_parentheses (bool): Removes parenthesized parts, such as nicknames.
+        - replace (list): Pairs of regular expression and replacement applied in order.
+    min_words (int, optional): Minimum number of words in a name. Default is 1.
+    unique (bool, optional): Whether to remove repeated names. Default is True.
+
+Example:
+    {
+        "items": "article",
+        "require": [{"select": "p.position", "text": "^PhD$"}],
+        "name": "h4.name",
+        "normalize": {"reorder_comma": true}
+    }
+
+Functions:
+    is_spec(code: str) -> bool:
+        Checks if the search module code is a JSON spec.
+
+    spec_path(filepath: str) -> str:
+        Returns the path of the spec file for the search module file path.
+
+    compile_spec(code: str) -> CompiledSpec:
+        Parses and compiles a JSON spec.
+
+    extract_names(spec: CompiledSpec, html_content: str) -> List[str]:
+        Extracts names from the HTML content with the compiled spec.
+
+    extract_batch(spec: CompiledSpec, pages: Iterable[str]) -> List[List[str]]:
+        Extracts names from several pages with the compiled spec.
+
+Classes:
+    CompiledSpec:
+        Spec with selectors compiled to XPath expressions.
+"""
+
+import os
+import re
+import json
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+from lxml import etree, html as lxml_html
+from cssselect import GenericTranslator, SelectorError
+
+from .exceptions import ModuleError
+
+# lxml rejects strings with an encoding declaration, which XHTML pages start with
+XML_DECLARATION = re.compile(r'^\s*<\?xml[^>]*\?>')
+
+
+class CompiledSpec(NamedTuple):
+    """
+    Spec with selectors compiled to XPath expressions.
+
+    Attributes:
+        items (etree.XPath): Expression matching one element per person.
+        name (Optional[etree.XPath]): Expression for the name element relative to the item.
+        require (List[Tuple[Optional[etree.XPath], re.Pattern]]): Filters that an item must match.
+        exclude (List[Tuple[Optional[etree.XPath], re.Pattern]]): Filters that an item must not match.
+        reorder_comma (bool): Whether to convert "Last, First" to "First Last".
+        remove_parentheses (bool): Whether to remove parenthesized parts.
+        replace (List[Tuple[re.Pattern, str]]): Replacements applied to names.
+        min_words (int): Minimum number of words in a name.
+        unique (bool): Whether to remove repeated names.
+    """
+    items: etree.XPath
+    name: Optional[etree.XPath]
+    require: List[Tuple[Optional[etree.XPath], re.Pattern]]
+    exclude: List[Tuple[Optional[etree.XPath], re.Pattern]]
+    reorder_comma: bool
+    remove_parentheses: bool
+    replace: List[Tuple[re.Pattern, str]]
+    min_words: int
+    unique: bool
+
+
+def is_spec(code: str) -> bool:
+    """
+    Checks if the search module code is a JSON spec.
+
+    Args:
+        code (str): The search module code.
+
+    Returns:
+        bool: True if the code is a JSON object.
+    """
+    return code.lstrip().startswith('{')
+
+
+def spec_path(filepath: str) -> str:
+    """
+    Returns the path of the spec file for the search module file path.
+
+    Args:
+        filepath (str): The path of the Python search module.
+
+    Returns:
+        str: The path with the .json extension.
+    """
+    return os.path.splitext(filepath)[0] + '.json'
+
+
+def compile_spec(code: str) -> CompiledSpec:
+    """
+    Parses and compiles a JSON spec.
+
+    Args:
+        code (str): The JSON spec.
+
+    Returns:
+        CompiledSpec: The compiled spec.
+
+    Raises:
+        ModuleError: If the spec is not valid JSON, misses the items selector, or has an invalid selector.
+    """
+    try:
+        spec = json.loads(code)
+        normalize = spec.get("normalize", {})
+        return CompiledSpec(
+            items=_compile_selector(spec["items"]),
+            name=_compile_selector(spec["name"]) if spec.get("name") else None,
+            require=[_compile_filter(f) for f in spec.get("require", [])],
+            exclude=[_compile_filter(f) for f in spec.get("exclude", [])],
+            reorder_comma=bool(normalize.get("reorder_comma", False)),
+            remove_parentheses=bool(normalize.get("remove_parentheses", False)),
+            replace=[(re.compile(pattern), replacement) for pattern, replacement in normalize.get("replace", [])],
+            min_words=int(spec.get("min_words", 1)),
+            unique=bool(spec.get("unique", True))
+        )
+    except (ValueError, KeyError, TypeError, AttributeError, re.error, SelectorError, etree.XPathError):
+        raise ModuleError.load_error()
+
+
+def extract_names(spec: CompiledSpec, html_content: str) -> List[str]:
+    """
+    Extracts names from the HTML content with the compiled spec.
+
+    The XML declaration of XHTML pages is removed before parsing, since the content is already decoded.
+
+    Args:
+        spec (CompiledSpec): The compiled spec.
+        html_content (str): The raw HTML content.
+
+    Returns:
+        List[str]: A list of names found within the HTML content.
+
+    Raises:
+        ModuleError: If the page cannot be parsed or the spec fails to evaluate on it.
+    """
+    html_content = XML_DECLARATION.sub('', html_content, count=1)
+    if not html_content.strip():
+        return []
+    try:
+        root = lxml_html.fromstring(html_content)
+    except (etree.ParserError, ValueError):
+        raise ModuleError.parse_error()
+    etree.strip_elements(root, 'script', 'style', with_tail=False)
+
+    names = []
+    try:
+        for item in spec.items(root):
+            if not isinstance(item, etree._Element):
+                continue
+            if not all(_matches(item, selector, pattern) for selector, pattern in spec.require):
+                continue
+            if any(_matches(item, selector, pattern) for selector, pattern in spec.exclude):
+                continue
+            element = item
+            if spec.name is not None:
+                matches = spec.name(item)
+                if not matches:
+                    continue
+                element = matches[0]
+            name = _normalize(spec, _text(element))
+            if name and len(name.split()) >= spec.min_words:
+                names.append(name)
+    except etree.XPathError:
+        raise ModuleError.execution_error()
+
+    if spec.unique:
+        names = list(dict.fromkeys(names))
+    return names
+
+
+def extract_batch(spec: CompiledSpec, pages: Iterable[str]) -> List[List[str]]:
+    """
+    Extracts names from several pages with the compiled spec.
+
+    Args:
+        spec (CompiledSpec): The compiled spec.
+        pages (Iterable[str]): The raw HTML content of the pages.
+
+    Returns:
+        List[List[str]]: The names found in each page.
+    """
+    return [extract_names(spec, page) for page in pages]
+
+
+def _compile_selector(selector: str) -> etree.XPath:
+    """
+    Compiles a CSS selector or an XPath expression.
+
+    Args:
+        selector (str): The CSS selector, or the XPath expression if it starts with "/" or "./".
+
+    Returns:
+        etree.XPath: The compiled expression, relative to the context element.
+    """
+    if selector.startswith(('/', './')):
+        return etree.XPath(selector)
+    return etree.XPath(GenericTranslator().css_to_xpath(selector, prefix='descendant-or-self::'))
+
+
+def _compile_filter(spec_filter: dict) -> Tuple[Optional[etree.XPath], re.Pattern]:
+    """
+    Compiles an item filter.
+
+    Args:
+        spec_filter (dict): The filter with an optional "select" selector and a "text" regular expression.
+
+    Returns:
+        Tuple[Optional[etree.XPath], re.Pattern]: The compiled selector and pattern.
+    """
+    selector = _compile_selector(spec_filter["select"]) if spec_filter.get("select") else None
+    return selector, re.compile(spec_filter.get("text", ""))
+
+
+def _matches(item: etree._Element, selector: Optional[etree.XPath], pattern: re.Pattern) -> bool:
+    """
+    Checks if the text of an element selected from the item matches the pattern.
+
+    Args:
+        item (etree._Element): The item element.
+        selector (Optional[etree.XPath]): The selector relative to the item, or None for the item itself.
+        pattern (re.Pattern): The pattern to search.
+
+    Returns:
+        bool: True if any selected element matches.
+    """
+    elements = selector(item) if selector is not None else [item]
+    return any(pattern.search(_text(element)) for element in elements if isinstance(element, etree._Element))
+
+
+def _text(element: etree._Element) -> str:
+    """
+    Returns the text content of an element with collapsed whitespace.
+
+    Args:
+        element (etree._Element): The element.
+
+    Returns:
+        str: The text.
+    """
+    return ' '.join(element.text_content().split())
+
+
+def _normalize(spec: CompiledSpec, name: str) -> str:
+    """
+    Applies the normalization rules of the spec to a name.
+
+    Args:
+        spec (CompiledSpec): The compiled spec.
+        name (str): The extracted name.
+
+    Returns:
+        str: The normalized name.
+    """
+    if spec.remove_parentheses:
+        name = re.sub(r'\([^)]*\)', ' ', name)
+    for pattern, replacement in spec.replace:
+        name = pattern.sub(replacement, name)
+    if spec.reorder_comma and name.count(',') == 1:
+        last, first = name.split(',')
+        name = f"{first} {last}"
+    return ' '.join(name.split())
@@ -9,13 +9,15 @@ Functions:
         Extracts snapshot URLs from the Wayback Machine API response.
 """
 
-import requests
 import logging
 from typing import Tuple, List
 
 from requests.exceptions import ConnectionError, HTTPError, Timeout
 
-from .exceptions import handle_retry_exception
+from .exceptions import TransportError, handle_retry_exception
+from .transport import fetch
+from .page_cache import save_snapshot_list
+from .metrics import timed, record_bytes, increment
 
 
 def get_snapshot_urls(
@@ -43,17 +45,26 @@ def get_snapshot_urls(
 
     while attempts < max_retries:
         try:
-            response = requests.get(timegate_url + url)
+            with timed("snapshot_urls"):
+                response = fetch(timegate_url + url)
+            record_bytes("snapshot_urls", len(response.content))
             response.raise_for_status()
             snapshot_urls = _match_urls(response.text)
             snapshot_urls.append(url)
+            save_snapshot_list(url, snapshot_urls)
 
             if log:
                 logging.info(
                     f"Found {len(snapshot_urls)} archive snapshot{'s' if len(snapshot_urls) > 1 else ''}")
             return snapshot_urls
 
+        except TransportError as e:
+            logging.error(e)
+            return [url_tuple[0]]
+
         except (HTTPError, ConnectionError, Timeout) as e:
+            increment("retries", stage="snapshot_urls")
+            increment("retry_seconds", retry_delay, stage="snapshot_urls")
             retry_delay, attempts = handle_retry_exception(e, attempts, retry_delay)
 
     else:
@@ -16,22 +16,36 @@ Functions:
     _is_in_source(name: str, source: str) -> bool:
         Checks if a name is present in the provided source content.
 
+    _find_missing_names(source: str, name_list: List[str]) -> Set[str]:
+        Finds the names that are not present in the source content, checking all names in a single pass.
+
     _is_student_name(name: str) -> bool:
         Determines if a given name is likely a student's name by analyzing its structure and named entities.
 
     _normalize_source(text: str) -> str:
         Normalizes the source by decoding HTML entities, stripping extra spaces, and converting to lowercase.
+
+    _tokenize(text: str) -> List[str]:
+        Splits normalized text into words, dropping nicknames in parentheses.
+
+Classes:
+    _NameMatcher:
+        Aho-Corasick automaton over word sequences for matching many names in one pass.
 """
 
 import re
 import html
-from typing import List
+from collections import deque
+from typing import Dict, Iterable, List, Set, Tuple
 
 from .utils import load_sys_path
 from .exceptions import ValidationError
 
 load_sys_path()
 
+TAG_PATTERN = re.compile(r'<[^>]*>')
+TOKEN_PATTERN = re.compile(r"\([^()]*\)|[^\W_]+(?:['’][^\W_]+)*")
+
 
 def validate_names(source: str, name_list: List[str]) -> bool:
     """
@@ -58,12 +72,14 @@ def validate_names(source: str, name_list: List[str]) -> bool:
 
     # print("Validating names:", name_list)
 
+    missing = _find_missing_names(source, name_list)
+
     for name in name_list:
         if not _is_valid_name(name):
             raise ValidationError.invalid_name_format(name)
 
-        # if not _is_in_source(name, source):
-        #     raise ValidationError.name_not_in_source(name)
+        if name in missing:
+            raise ValidationError.name_not_in_source(name)
 
         if not _is_student_name(name):
             raise ValidationError.invalid_student_name(name)
@@ -95,20 +111,40 @@ def _is_in_source(name: str, source: str) -> bool:
     Returns:
         bool: True if the name is found in the source, False otherwise.
     """
-    normalized_name = _normalize_source(name)
-    normalized_source = _normalize_source(source)
+    return name not in _find_missing_names(source, [name])
 
-    parts = normalized_name.split()
-    if len(parts) == 2:
-        first_name, last_name = parts
-    else:
-        return False
 
-    name_pattern = re.compile(
-        rf'{re.escape(first_name)}\s*(\(\w+\)\s*)?{re.escape(last_name)}', re.IGNORECASE
-    )
+def _find_missing_names(source: str, name_list: List[str]) -> Set[str]:
+    """
+    Finds the names that are not present in the source content, checking all names in a single pass.
+
+    The source is normalized once, and the words of all names are matched together with an automaton.
+    A name is found if its words appear in order, with an optional nickname in parentheses between them,
+    or in the "Last, First" order.
+
+    Args:
+        source (str): The source content to search within.
+        name_list (List[str]): The names to search for.
+
+    Returns:
+        Set[str]: The names that were not found.
+    """
+    patterns = {}
+    for name in name_list:
+        words = tuple(_tokenize(_normalize_source(name)))
+        if not words:
+            continue
+        patterns.setdefault(words, set()).add(name)
+        if len(words) >= 2:
+            patterns.setdefault(words[-1:] + words[:-1], set()).add(name)
+
+    if not patterns:
+        return set(name_list)
+
+    text = _normalize_source(TAG_PATTERN.sub(' ', source))
+    found = _NameMatcher(patterns).search(_tokenize(text))
+    return {name for name in name_list if name not in found}
 
-    return name_pattern.search(normalized_source) is not None
 
 def _is_student_name(name: str) -> bool:
     """
@@ -139,5 +175,75 @@ def _normalize_source(text: str) -> str:
             str: The normalized text.
     """
     text = html.unescape(text)
-    text = re.sub(r'[\s\(\)-]+', ' ', text).strip().lower()
+    text = re.sub(r'[\s-]+', ' ', text).strip().lower()
     return text
+
+
+def _tokenize(text: str) -> List[str]:
+    """
+        Splits normalized text into words, dropping nicknames in parentheses.
+
+        Args:
+            text (str): The normalized text.
+
+        Returns:
+            List[str]: The words.
+    """
+    return [token for token in TOKEN_PATTERN.findall(text) if not token.startswith('(')]
+
+
+class _NameMatcher:
+    """
+    Aho-Corasick automaton over word sequences for matching many names in one pass.
+
+    Attributes:
+        goto (List[Dict[str, int]]): The transitions of each state by word.
+        fail (List[int]): The failure transition of each state.
+        output (List[Set[str]]): The names matched when reaching each state.
+    """
+
+    def __init__(self, patterns: Dict[Tuple[str, ...], Iterable[str]]):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [set()]
+
+        for words, names in patterns.items():
+            state = 0
+            for word in words:
+                if word not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append(set())
+                    self.goto[state][word] = len(self.goto) - 1
+                state = self.goto[state][word]
+            self.output[state].update(names)
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for word, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and word not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(word, 0)
+                self.output[next_state] |= self.output[self.fail[next_state]]
+
+    def search(self, words: Iterable[str]) -> Set[str]:
+        """
+        Finds the names whose words occur in the word sequence.
+
+        Args:
+            words (Iterable[str]): The words of the text.
+
+        Returns:
+            Set[str]: The names found.
+        """
+        found = set()
+        state = 0
+        for word in words:
+            while state and word not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(word, 0)
+            found |= self.output[state]
+        return found
@@ -0,0 +1,259 @@
+"""
+This module provides the HTTP transport used to fetch snapshot lists and pages.
+Depending on the transport mode, requests go to the network, are recorded to compressed WARC files,
+or are replayed from the recorded WARC files without network access.
+
+Transport modes:
+    live: Requests are sent to the network.
+    record: Requests are sent to the network and every exchange is appended to a WARC file. Timestamped
+        Wayback Machine snapshots that were already recorded are served from the archive.
+    replay: Requests are served from the recorded WARC files only. A missing URL raises a TransportError.
+
+Functions:
+    fetch(url: str, headers: Optional[dict] = None) -> requests.Response:
+        Fetches the URL with the configured transport.
+
+    recorded_page(url: str) -> Optional[str]:
+        Returns the recorded content of the URL without network access.
+
+    _response_encoding(response: requests.Response) -> str:
+        Determines the encoding of the response body.
+
+    _recorded_response(url: str) -> Optional[requests.Response]:
+        Reads the latest recorded response for the URL from the archive.
+
+    _record_exchange(url: str, headers: dict, response: requests.Response) -> None:
+        Appends the request and response to the WARC file of the run.
+
+    _load_index() -> Dict[str, Tuple[str, int]]:
+        Indexes the responses in the WARC files by target URL.
+"""
+
+import os
+import io
+import re
+import codecs
+import atexit
+import datetime
+import threading
+from typing import Dict, Optional, Tuple
+
+import requests
+from warcio.archiveiterator import ArchiveIterator
+from warcio.statusandheaders import StatusAndHeaders
+from warcio.warcwriter import WARCWriter
+
+from .utils import read_config, resolve_path
+from .page_cache import is_archived
+from .exceptions import TransportError
+
+_config = read_config()
+TRANSPORT_MODE = _config.get("TRANSPORT_MODE", "live")
+WARC_DIR = resolve_path(_config.get("WARC_DIR", "scraper/cache/warc"))
+
+# Headers that describe the transfer rather than the stored, decoded body
+TRANSFER_HEADERS = {'content-encoding', 'transfer-encoding', 'content-length', 'connection'}
+
+# Declared charset of a page, searched in the first bytes of the body if the headers don't declare one
+META_CHARSET = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([\w.:-]+)', re.IGNORECASE)
+META_SEARCH_BYTES = 4096
+
+_lock = threading.Lock()
+_index: Optional[Dict[str, Tuple[str, int]]] = None
+_writer = None
+_warc_file = None
+_warc_path = None
+
+
+def fetch(url: str, headers: Optional[dict] = None) -> requests.Response:
+    """
+    Fetches the URL with the configured transport.
+
+    If the headers declare no charset, the encoding of the body is taken from the page, see _response_encoding.
+
+    Args:
+        url (str): The URL to fetch.
+        headers (Optional[dict]): The request headers.
+
+    Returns:
+        requests.Response: The response, with the decoded body.
+
+    Raises:
+        TransportError: If the URL is not recorded in replay mode.
+        requests.RequestException: If the request fails in live or record mode.
+    """
+    headers = headers or {}
+    if TRANSPORT_MODE == "replay":
+        response = _recorded_response(url)
+        if response is None:
+            raise TransportError.not_recorded(url)
+        return response
+
+    if TRANSPORT_MODE == "record" and is_archived(url):
+        response = _recorded_response(url)
+        if response is not None:
+            return response
+
+    response = requests.get(url, headers=headers)
+    response.encoding = _response_encoding(response)
+    if TRANSPORT_MODE == "record":
+        _record_exchange(url, headers, response)
+    return response
+
+
+def recorded_page(url: str) -> Optional[str]:
+    """
+    Returns the recorded content of the URL without network access.
+
+    Args:
+        url (str): The requested URL.
+
+    Returns:
+        Optional[str]: The content of the latest successful recorded response, or None if there is none.
+    """
+    response = _recorded_response(url)
+    if response is None or response.status_code != 200:
+        return None
+    return response.text
+
+
+def _response_encoding(response: requests.Response) -> str:
+    """
+    Determines the encoding of the response body.
+
+    The charset of the Content-Type header is used if there is one. Otherwise requests assumes ISO-8859-1 for
+    text, which decodes UTF-8 pages as mojibake, e.g. raw Wayback Machine captures that replay the original
+    headers. The charset declared by a meta tag of the page is used instead, or the encoding detected from
+    the body.
+
+    Args:
+        response (requests.Response): The response.
+
+    Returns:
+        str: The name of the encoding.
+    """
+    if 'charset' in response.headers.get('Content-Type', '').lower():
+        return requests.utils.get_encoding_from_headers(response.headers)
+
+    match = META_CHARSET.search(response.content[:META_SEARCH_BYTES])
+    if match:
+        encoding = match.group(1).decode('ascii', 'ignore')
+        try:
+            codecs.lookup(encoding)
+            return encoding
+        except LookupError:
+            pass
+    return response.apparent_encoding or 'utf-8'
+
+
+def _recorded_response(url: str) -> Optional[requests.Response]:
+    """
+    Reads the latest recorded response for the URL from the archive.
+
+    Args:
+        url (str): The requested URL.
+
+    Returns:
+        Optional[requests.Response]: The recorded response, or None if the URL is not recorded.
+    """
+    with _lock:
+        location = _load_index().get(url)
+        if location is None:
+            return None
+        if _warc_file is not None and location[0] == _warc_path:
+            _warc_file.flush()
+
+    filepath, offset = location
+    with open(filepath, 'rb') as file:
+        file.seek(offset)
+        record = next(iter(ArchiveIterator(file)))
+        content = record.content_stream().read()
+        http_headers = record.http_headers
+
+    response = requests.Response()
+    response.url = url
+    response.status_code = int(http_headers.get_statuscode())
+    response.reason = http_headers.statusline.split(' ', 1)[-1]
+    response.headers.update(http_headers.headers)
+    response._content = content
+    response.encoding = _response_encoding(response)
+    return response
+
+
+def _record_exchange(url: str, headers: dict, response: requests.Response) -> None:
+    """
+    Appends the request and response to the WARC file of the run.
+
+    The body is stored decoded, so the transfer headers are replaced by the length of the stored body.
+
+    Args:
+        url (str): The requested URL.
+        headers (dict): The request headers.
+        response (requests.Response): The response.
+    """
+    global _writer, _warc_file, _warc_path
+
+    content = response.content
+    response_headers = [(key, value) for key, value in response.headers.items()
+                        if key.lower() not in TRANSFER_HEADERS]
+    response_headers.append(('Content-Length', str(len(content))))
+    status_line = f"{response.status_code} {response.reason or ''}".strip()
+
+    with _lock:
+        index = _load_index()
+        if _writer is None:
+            os.makedirs(WARC_DIR, exist_ok=True)
+            stamp = datetime.datetime.now().strftime('%Y%m%d%H%M%S')
+            _warc_path = os.path.join(WARC_DIR, f"scraper-{stamp}-{os.getpid()}.warc.gz")
+            _warc_file = open(_warc_path, 'ab')
+            _writer = WARCWriter(_warc_file, gzip=True)
+            atexit.register(_warc_file.close)
+
+        response_record = _writer.create_warc_record(
+            url, 'response',
+            payload=io.BytesIO(content),
+            length=len(content),
+            http_headers=StatusAndHeaders(status_line, response_headers, protocol='HTTP/1.1')
+        )
+        request_record = _writer.create_warc_record(
+            url, 'request',
+            payload=io.BytesIO(b''),
+            length=0,
+            http_headers=StatusAndHeaders(f"GET {url} HTTP/1.1", list(headers.items()), is_http_request=True),
+            warc_headers_dict={'WARC-Concurrent-To': response_record.rec_headers.get_header('WARC-Record-ID')}
+        )
+
+        offset = _warc_file.tell()
+        _writer.write_record(response_record)
+        _writer.write_record(request_record)
+        index[url] = (_warc_path, offset)
+
+
+def _load_index() -> Dict[str, Tuple[str, int]]:
+    """
+    Indexes the responses in the WARC files by target URL.
+
+    The index is built on first use from all WARC files in WARC_DIR, later recordings are added as they are
+    written. The caller must hold the lock.
+
+    Returns:
+        Dict[str, Tuple[str, int]]: The file path and offset of the latest response for each URL.
+    """
+    global _index
+    if _index is not None:
+        return _index
+
+    _index = {}
+    if not os.path.isdir(WARC_DIR):
+        return _index
+
+    for filename in sorted(os.listdir(WARC_DIR)):
+        if not filename.endswith(('.warc', '.warc.gz')):
+            continue
+        filepath = os.path.join(WARC_DIR, filename)
+        with open(filepath, 'rb') as file:
+            iterator = ArchiveIterator(file)
+            for record in iterator:
+                if record.rec_type == 'response':
+                    _index[record.rec_headers.get_header('WARC-Target-URI')] = (filepath, iterator.get_record_offset())
+    return _index
@@ -4,6 +4,18 @@ setting up logging, handling NLTK downloads, reading programs from CSV files, pa
 names from URLs, and cleaning archived URLs.
 
 Functions:
+    read_config() -> dict:
+        Reads the configuration file once.
+
+    resolve_path(path: str) -> str:
+        Resolves a path relative to the project root.
+
+    atomic_write(path: str) -> Iterator[TextIO]:
+        Opens a temporary file that replaces the file at the path when it is closed without an error.
+
+    file_lock(path: str) -> Iterator[None]:
+        Holds an exclusive lock on the file at the path.
+
     load_config() -> tuple:
         Loads configuration settings from a JSON file.
 
@@ -24,6 +36,9 @@ Functions:
 
     parent_url(url: str) -> str:
         Cleans an archived URL to its original form.
+
+    count_tokens(text: str, model: str = "gpt-3.5-turbo") -> int:
+        Counts the number of tokens in the text for the given model.
 """
 
 import os
@@ -31,28 +46,130 @@ import csv
 import re
 import json
 import sys
-import random
 import logging
+import tempfile
+import threading
+import functools
+import contextlib
+from typing import Iterator, TextIO
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
 
 from .exceptions import handle_exception
 
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+
+# Thread locks of the lock files held by file_lock
+_file_locks = {}
+_file_locks_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=None)
+def read_config() -> dict:
+    """
+    Reads the configuration file once.
+
+    The file is located next to this module, so the settings do not depend on the working directory.
+    The parsed settings are shared by all callers and must not be modified.
+
+    Returns:
+        dict: The configuration settings.
+    """
+    with open(os.path.join(os.path.dirname(__file__), 'config.json'), 'r') as file:
+        return json.load(file)
+
+
+def resolve_path(path: str) -> str:
+    """
+    Resolves a path relative to the project root.
+
+    Paths in the configuration, such as cache and data folders, are relative to the project root,
+    so that the scraper can be run from any working directory. Absolute and empty paths are returned unchanged.
+
+    Args:
+        path (str): The path to resolve.
+
+    Returns:
+        str: The absolute path, or the path unchanged if it is absolute or empty.
+    """
+    if not path or os.path.isabs(path):
+        return path
+    return os.path.join(PROJECT_ROOT, path)
+
+
+@contextlib.contextmanager
+def atomic_write(path: str) -> Iterator[TextIO]:
+    """
+    Opens a temporary file that replaces the file at the path when it is closed without an error.
+
+    The temporary file is created in the same folder and flushed to disk before it is renamed, so that readers
+    see either the previous or the complete new file, also after a crash. On an error the temporary file is removed
+    and the file at the path is left unchanged.
+
+    Args:
+        path (str): The path of the file.
+
+    Yields:
+        TextIO: The temporary file, open for writing.
+    """
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as file:
+            yield file
+            file.flush()
+            os.fsync(file.fileno())
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+@contextlib.contextmanager
+def file_lock(path: str) -> Iterator[None]:
+    """
+    Holds an exclusive lock on the file at the path.
+
+    The lock is an advisory lock of the file, created if it does not exist, and is released by the system if the
+    process exits, so that a crashed process never leaves it locked. It is held by one process and one thread at a
+    time and is not reentrant. On systems without fcntl, only the threads of the process are excluded.
+
+    Args:
+        path (str): The path of the lock file.
+    """
+    path = os.path.abspath(path)
+    with _file_locks_lock:
+        thread_lock = _file_locks.setdefault(path, threading.Lock())
+
+    with thread_lock, open(path, 'a') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
 
 def load_config() -> tuple:
     """
     Loads configuration settings from a JSON file.
 
     Returns:
-        tuple: A tuple containing configuration settings for MODEL, NUM_ITERATIONS, MAX_HISTORY_LEN, and SOURCE_CHUNK_LEN.
+        tuple: A tuple containing configuration settings for MODEL, NUM_ITERATIONS, MAX_HISTORY_TOKENS, and SOURCE_TOKEN_BUDGET.
     """
-    with open('scraper/src/config.json', 'r') as file:
-        config = json.load(file)
+    config = read_config()
 
     MODEL = config["MODEL"]
     NUM_ITERATIONS = config["NUM_ITERATIONS"]
-    MAX_HISTORY_LEN = config["MAX_HISTORY_LEN"]
-    SOURCE_CHUNK_LEN = config["SOURCE_CHUNK_LEN"]
+    MAX_HISTORY_TOKENS = config["MAX_HISTORY_TOKENS"]
+    SOURCE_TOKEN_BUDGET = config["SOURCE_TOKEN_BUDGET"]
 
-    return MODEL, NUM_ITERATIONS, MAX_HISTORY_LEN, SOURCE_CHUNK_LEN
+    return MODEL, NUM_ITERATIONS, MAX_HISTORY_TOKENS, SOURCE_TOKEN_BUDGET
 
 
 def load_sys_path() -> None:
@@ -61,7 +178,7 @@ def load_sys_path() -> None:
 
     This function inserts the project root directory into the system path to enable absolute imports.
     """
-    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+    sys.path.insert(0, PROJECT_ROOT)
 
 
 def load_logging(level='INFO') -> None:
@@ -71,9 +188,7 @@ def load_logging(level='INFO') -> None:
     This function configures the logging settings, including the log format and log levels for different libraries.
     It also sets a custom exception handler for unhandled exceptions.
     """
-    with open('scraper/src/config.json', 'r') as file:
-        config = json.load(file)
-    level = config['LOG_LEVEL']
+    level = read_config()['LOG_LEVEL']
     sys.excepthook = handle_exception
     logging.basicConfig(level=logging.getLevelName(level), format='%(asctime)s - %(levelname)s - %(message)s')
     logging.getLogger("openai").setLevel(logging.ERROR)
@@ -115,7 +230,7 @@ def parse_module_name(url: str) -> tuple:
     url_parts = url.replace("https://", "").replace("http://", "").split(":")[0].split("/")[0].split(".")
     first_subdomain, second_subdomain = url_parts[:2]
     filename = f"{first_subdomain}_{second_subdomain}.py"
-    directory = "scraper/src/search_modules"
+    directory = os.path.join(os.path.dirname(__file__), "search_modules")
     os.makedirs(directory, exist_ok=True)
     filepath = os.path.join(directory, filename)
     return filename[:-3], filepath
@@ -140,19 +255,43 @@ def parent_url(url: str) -> str:
     return url_match
 
 
-def _chunk_html(html: str, block_size: int) -> list:
+def count_tokens(text: str, model: str = "gpt-3.5-turbo") -> int:
+    """
+    Counts the number of tokens in the text for the given model.
+
+    The count uses the model's tiktoken encoding. If tiktoken or the encoding is not available, it is estimated
+    as one token per four characters.
+
+    Args:
+        text (str): The text to count tokens in.
+        model (str): The name of the GPT model. Default is "gpt-3.5-turbo".
+
+    Returns:
+        int: The number of tokens.
+    """
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+@functools.lru_cache(maxsize=None)
+def _get_encoding(model: str):
     """
-    Chunks the HTML content into smaller blocks for processing.
+    Loads the tiktoken encoding for the given model once.
 
     Args:
-        html (str): The raw HTML content to chunk.
-        block_size (int): The size of each chunk.
+        model (str): The name of the GPT model.
 
     Returns:
-        list: A list of HTML chunks.
+        The tiktoken encoding, or None if it is not available.
     """
-    chunks = []
-    for i in range(0, len(html), block_size):
-        chunks.append(html[i:i + block_size])
-    chunk_sample = random.sample(chunks, min(10, len(chunks)))
-    return chunk_sample
\ No newline at end of file
+    try:
+        import tiktoken
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        logging.warning("Token encoding not available, estimating token counts")
+        return None
@@ -0,0 +1,144 @@
+import json
+import multiprocessing
+import os
+
+import pandas as pd
+import pytest
+
+from scraper.src import database
+from scraper.src.database import (load_dataset, dataset_lock, process_data, _get_latest_version, _merge_and_save,
+                                  MANIFEST_FILE)
+from scraper.src.schema import to_records
+
+ARCHIVE = 'http://web.archive.org/web/{}000000/https://example.edu/students'
+
+
+def _students(university, names, dates=('20200101', '20210101')):
+    rows = [
+        {'Name': name, 'University': university, 'URL': ARCHIVE.format(date), 'Active': False}
+        for name in names for date in dates
+    ]
+    data = process_data(pd.DataFrame(rows), log=False)
+    data['Placement'] = False
+    return data
+
+
+def _commit(data_folder, data):
+    with dataset_lock(data_folder):
+        latest_version = _get_latest_version(data_folder) or 0
+        return _merge_and_save(data, latest_version, data_folder=data_folder)
+
+
+def _read_manifest(data_folder):
+    with open(os.path.join(data_folder, MANIFEST_FILE), 'r') as file:
+        return json.load(file)
+
+
+def test_commits_versions_through_the_manifest(tmp_path):
+    data_folder = str(tmp_path)
+    assert _get_latest_version(data_folder) is None
+
+    assert _commit(data_folder, _students('U', ['Jane Doe', 'John Smith'])) == 1
+    assert _commit(data_folder, _students('U', ['Mary Major'])) == 2
+
+    manifest = _read_manifest(data_folder)
+    assert manifest['latest_version'] == 2
+    assert manifest['data_file'] == 'student_data_v2.json'
+    assert manifest['entries'] == 3
+    assert os.path.exists(os.path.join(data_folder, manifest['aggregates_file']))
+    assert sorted(load_dataset(data_folder)['Name']) == ['Jane Doe', 'John Smith', 'Mary Major']
+    assert not [name for name in os.listdir(data_folder) if name.endswith('.tmp')]
+
+
+def test_uncommitted_version_is_ignored_and_overwritten(tmp_path):
+    data_folder = str(tmp_path)
+    _commit(data_folder, _students('U', ['Jane Doe']))
+    with open(os.path.join(data_folder, 'student_data_v2.json'), 'w') as file:
+        file.write('partial')
+
+    assert _get_latest_version(data_folder) == 1
+    assert _commit(data_folder, _students('U', ['John Smith'])) == 2
+    assert sorted(load_dataset(data_folder)['Name']) == ['Jane Doe', 'John Smith']
+
+
+def test_folder_is_scanned_without_a_valid_manifest(tmp_path):
+    data_folder = str(tmp_path)
+    _commit(data_folder, _students('U', ['Jane Doe']))
+    _commit(data_folder, _students('U', ['John Smith']))
+
+    with open(os.path.join(data_folder, MANIFEST_FILE), 'w') as file:
+        file.write('{"latest_v')
+    assert _get_latest_version(data_folder) == 2
+
+    os.remove(os.path.join(data_folder, MANIFEST_FILE))
+    assert _get_latest_version(data_folder) == 2
+
+
+def test_manifest_names_the_data_file(tmp_path):
+    data_folder = str(tmp_path)
+    _commit(data_folder, _students('U', ['Jane Doe']))
+    os.rename(os.path.join(data_folder, 'student_data_v1.json'), os.path.join(data_folder, 'renamed.json'))
+    manifest = _read_manifest(data_folder)
+    manifest['data_file'] = 'renamed.json'
+    with open(os.path.join(data_folder, MANIFEST_FILE), 'w') as file:
+        json.dump(manifest, file)
+
+    assert load_dataset(data_folder)['Name'].tolist() == ['Jane Doe']
+    assert _commit(data_folder, _students('U', ['John Smith'])) == 2
+
+
+def test_failed_commit_keeps_the_previous_version(tmp_path, monkeypatch):
+    data_folder = str(tmp_path)
+    _commit(data_folder, _students('U', ['Jane Doe']))
+
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(database, 'export_aggregates', fail)
+    with pytest.raises(OSError):
+        _commit(data_folder, _students('U', ['John Smith']))
+
+    assert _read_manifest(data_folder)['latest_version'] == 1
+    assert load_dataset(data_folder)['Name'].tolist() == ['Jane Doe']
+
+
+def test_unreadable_version_is_not_replaced(tmp_path):
+    data_folder = str(tmp_path)
+    _commit(data_folder, _students('U', ['Jane Doe']))
+    with open(os.path.join(data_folder, 'student_data_v1.json'), 'w') as file:
+        file.write('{"format": 2, "len')
+
+    with pytest.raises(ValueError):
+        _commit(data_folder, _students('U', ['John Smith']))
+    assert _read_manifest(data_folder)['latest_version'] == 1
+
+
+def test_merged_entries_keep_the_tenure_of_every_spelling(tmp_path):
+    data_folder = str(tmp_path)
+    _commit(data_folder, _students('U', ['Doe, Jane'], dates=('20180101', '20190101')))
+    _commit(data_folder, _students('U', ['Jane Doe', 'John Smith'], dates=('20200101', '20210101')))
+
+    data = load_dataset(data_folder)
+    assert sorted(data['Name']) == ['Doe, Jane', 'John Smith']
+    record = to_records(data[data['Name'] == 'Doe, Jane'])[0]
+    assert record['Start_Date'] == '2018-01-01 00:00:00'
+    assert record['End_Date'] == '2021-01-01 00:00:00'
+    assert len(record['Snapshots']) == 4
+
+
+def _worker(data_folder, index):
+    _commit(data_folder, _students(f'University {index}', [f'Student Number{index}']))
+
+
+def test_concurrent_processes_commit_every_update(tmp_path):
+    data_folder = str(tmp_path)
+    context = multiprocessing.get_context('fork')
+    workers = [context.Process(target=_worker, args=(data_folder, index)) for index in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=120)
+        assert worker.exitcode == 0
+
+    assert _read_manifest(data_folder)['latest_version'] == 4
+    assert sorted(load_dataset(data_folder)['University']) == [f'University {index}' for index in range(4)]
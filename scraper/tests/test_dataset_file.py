@@ -0,0 +1,144 @@
+import io
+import json
+import os
+
+import pytest
+
+from scraper.src import dataset_file
+from scraper.src.dataset_file import read_dataset, write_dataset, encode_dataset, decode_dataset, _JsonStream
+from scraper.src.schema import to_records
+from scraper.src.utils import resolve_path
+
+V16_PATH = resolve_path('public/data/student_data_v16.json')
+
+
+@pytest.fixture(scope='module')
+def v16_records():
+    with open(V16_PATH, 'r') as file:
+        return json.load(file)
+
+
+@pytest.fixture(scope='module')
+def v16_data():
+    return read_dataset(V16_PATH)
+
+
+def test_reads_record_format(v16_records, v16_data):
+    assert to_records(v16_data) == v16_records
+
+
+@pytest.mark.parametrize('chunk_size', [10000, 7, 1])
+def test_compact_round_trip(v16_records, v16_data, tmp_path, monkeypatch, chunk_size):
+    monkeypatch.setattr(dataset_file, 'DATASET_FORMAT', 'compact')
+    monkeypatch.setattr(dataset_file, 'DATASET_CHUNK_SIZE', chunk_size)
+    path = str(tmp_path / 'student_data_v1.json')
+
+    write_dataset(v16_data, path)
+
+    assert os.path.getsize(path) < os.path.getsize(V16_PATH) / 5
+    assert to_records(read_dataset(path)) == v16_records
+
+
+@pytest.mark.parametrize('chunk_size', [10000, 3])
+def test_records_round_trip_matches_json_dump(v16_records, v16_data, tmp_path, monkeypatch, chunk_size):
+    monkeypatch.setattr(dataset_file, 'DATASET_FORMAT', 'records')
+    monkeypatch.setattr(dataset_file, 'DATASET_CHUNK_SIZE', chunk_size)
+    path = str(tmp_path / 'student_data_v1.json')
+
+    write_dataset(v16_data, path)
+
+    with open(path, 'r') as file:
+        assert file.read() == json.dumps(v16_records, indent=4)
+    assert to_records(read_dataset(path)) == v16_records
+
+
+@pytest.mark.parametrize('buffer_size', [1, 2, 3, 7, 64])
+def test_compact_streamed_with_small_buffers(v16_records, v16_data, buffer_size):
+    subset = v16_data.iloc[:40]
+    text = json.dumps(encode_dataset(subset))
+
+    stream = _JsonStream(io.StringIO(text), buffer_size=buffer_size)
+    assert to_records(dataset_file._read_compact(stream)) == v16_records[:40]
+
+
+def test_decode_dataset_accepts_both_formats(v16_records, v16_data):
+    subset = v16_data.iloc[:25]
+    assert to_records(decode_dataset(encode_dataset(subset))) == v16_records[:25]
+    assert to_records(decode_dataset(v16_records[:25])) == v16_records[:25]
+
+
+def test_empty_dataset_round_trip(tmp_path, v16_data):
+    path = str(tmp_path / 'student_data_v1.json')
+    write_dataset(v16_data.iloc[:0], path)
+    assert read_dataset(path).empty
+
+
+def test_failed_write_keeps_previous_file(tmp_path, v16_data):
+    path = tmp_path / 'student_data_v1.json'
+    path.write_text('previous')
+
+    with pytest.raises(AttributeError):
+        write_dataset(None, str(path))
+
+    assert path.read_text() == 'previous'
+    assert os.listdir(tmp_path) == ['student_data_v1.json']
+
+
+VALUES = [
+    'plain',
+    'quote " and backslash \\ and slash /',
+    'escapes \n\t\r\b\f and \u0001',
+    'unicode Żółć José 北京 and emoji \U0001F600',
+    '',
+    0, -1, 12345678901234567890, 3.25, -0.5e-7, 1E+21,
+    True, False, None,
+    [], {}, [[1, [2, [3, []]]], [{'a': [None, 'x']}]],
+    {'nested': {'list': [1, 2, {'deep': ['a,b', ']', '}']}]}, 'comma, ': ',[]{}:'},
+]
+
+
+def _json_texts():
+    return [
+        json.dumps(VALUES),
+        json.dumps(VALUES, ensure_ascii=False),
+        json.dumps(VALUES, indent=4),
+        json.dumps(VALUES, separators=(',', ':')),
+    ]
+
+
+@pytest.mark.parametrize('text', _json_texts())
+@pytest.mark.parametrize('buffer_size', [1, 2, 3, 5, 8, 13, 1 << 16])
+def test_stream_items_at_every_buffer_boundary(text, buffer_size):
+    stream = _JsonStream(io.StringIO(text), buffer_size=buffer_size)
+    assert list(stream.items()) == VALUES
+    assert stream.peek() == ''
+
+
+@pytest.mark.parametrize('buffer_size', [1, 2, 4, 1 << 16])
+def test_stream_members_and_values(buffer_size):
+    content = {'format': 2, 'length': 12345, 'name': 'a "quoted" \\ value', 'list': [1.5, [2], {}],
+               'unicode': 'é京', 'last': -98765}
+    stream = _JsonStream(io.StringIO(json.dumps(content)), buffer_size=buffer_size)
+
+    decoded = {}
+    for key in stream.members():
+        decoded[key] = stream.value()
+    assert decoded == content
+
+
+@pytest.mark.parametrize('buffer_size', [1, 3, 1 << 16])
+def test_stream_numbers_split_at_buffer_end(buffer_size):
+    numbers = [10 ** exponent + 7 for exponent in range(20)] + [1.0e-10, 123.456e7]
+    stream = _JsonStream(io.StringIO(json.dumps(numbers)), buffer_size=buffer_size)
+    assert list(stream.items()) == numbers
+
+
+@pytest.mark.parametrize('text', ['[1, 2', '[1 2]', '{"a" 1}', '[1, 2,]'])
+def test_stream_rejects_invalid_json(text):
+    stream = _JsonStream(io.StringIO(text), buffer_size=2)
+    with pytest.raises(ValueError):
+        if text.startswith('['):
+            list(stream.items())
+        else:
+            for _ in stream.members():
+                stream.value()
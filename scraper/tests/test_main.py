@@ -0,0 +1,22 @@
+import pandas as pd
+
+from scraper.__main__ import _update_program_placement
+
+
+def _history(names):
+    return pd.DataFrame({'Name': names, 'Date': '2022-01-01'})
+
+
+def test_placements_of_earlier_programs_are_kept():
+    data = pd.DataFrame({'Name': ['Jane Doe', 'John Roe'], 'University': ['U', 'V']})
+    data = _update_program_placement(data, ('', 'https://u.edu/placement', 'U'), _history(['Jane Doe']))
+    data = _update_program_placement(data, ('', 'https://v.edu/placement', 'V'), _history(['John Roe']))
+
+    assert data['Name'].tolist() == ['Jane Doe', 'John Roe']
+    assert data['Placement'].tolist() == [True, True]
+    assert data['Placement_Date'].tolist() == ['2022-01-01', '2022-01-01']
+    assert data['PlacementURL'].tolist() == ['https://u.edu/placement', 'https://v.edu/placement']
+
+
+def test_empty_data_is_returned_unchanged():
+    assert _update_program_placement(pd.DataFrame(), ('', 'https://u.edu/placement', 'U'), None).empty
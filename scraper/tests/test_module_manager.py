@@ -0,0 +1,95 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from scraper.src import gpt_api, gpt_cache, module_manager
+from scraper.src.exceptions import ModuleError
+
+SOURCE = """
+<html><body><h2>Graduate Students</h2>
+<ul class="students"><li>Jane Doe</li><li>John Smith</li><li>Mary Major</li></ul>
+</body></html>
+"""
+
+VALID = """```python
+def extract_phd_student_names(soup):
+    return [li.get_text() for li in soup.select('ul.students li')]
+```"""
+
+INVALID = """```python
+def extract_phd_student_names(soup):
+    return ['Nobody Here']
+```"""
+
+LOOPING = """```python
+def extract_phd_student_names(soup):
+    while True:
+        pass
+    return []
+```"""
+
+
+class FakeClient:
+    """
+    Chat client that answers every request with the next of the given responses.
+    """
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.requests = 0
+        self.lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model, messages):
+        with self.lock:
+            content = self.responses[self.requests % len(self.responses)]
+            self.requests += 1
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=None)
+
+
+@pytest.fixture
+def gpt_chat(tmp_path, monkeypatch):
+    monkeypatch.setattr(gpt_cache, 'CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(gpt_cache, 'CACHE_MODE', 'record')
+    monkeypatch.setattr(gpt_api, 'CACHE_MODE', 'replay')
+    return gpt_api.init_gpt_chat()
+
+
+def _with_client(gpt_chat, client):
+    return (client,) + tuple(gpt_chat[1:])
+
+
+def test_selects_a_valid_candidate(gpt_chat):
+    client = FakeClient([INVALID, VALID, INVALID])
+    code, chat = module_manager._generate_candidates(SOURCE, _with_client(gpt_chat, client), 3)
+
+    assert 'ul.students' in code
+    assert chat[2][-1]['content'] == VALID
+    assert client.requests == 3
+
+
+def test_candidates_are_replayed_from_the_cache(gpt_chat, monkeypatch):
+    module_manager._generate_candidates(SOURCE, _with_client(gpt_chat, FakeClient([VALID])), 2)
+
+    monkeypatch.setattr(gpt_cache, 'CACHE_MODE', 'replay')
+    code, _ = module_manager._generate_candidates(SOURCE, gpt_chat, 2)
+    assert 'ul.students' in code
+
+
+def test_raises_with_the_failures_of_all_candidates(gpt_chat):
+    with pytest.raises(ModuleError, match="No candidate passed validation: .*Nobody Here"):
+        module_manager._generate_candidates(SOURCE, _with_client(gpt_chat, FakeClient([INVALID])), 2)
+
+
+def test_raises_if_no_candidate_is_generated(gpt_chat, monkeypatch):
+    monkeypatch.setattr(gpt_cache, 'CACHE_MODE', 'replay')
+    with pytest.raises(ModuleError, match="Failed to generate"):
+        module_manager._generate_candidates(SOURCE, gpt_chat, 2)
+
+
+def test_looping_candidate_is_stopped(gpt_chat, monkeypatch):
+    monkeypatch.setattr(module_manager, 'get_sandbox', lambda: None)
+    monkeypatch.setattr(module_manager, 'SANDBOX_TIMEOUT', 2)
+    with pytest.raises(ModuleError, match="exceeded 2s"):
+        module_manager._generate_candidates(SOURCE, _with_client(gpt_chat, FakeClient([LOOPING])), 2)
@@ -0,0 +1,73 @@
+import pandas as pd
+import pytest
+
+from scraper.src.person_id import resolve_person_ids, normalize_name, _is_same_person
+
+
+@pytest.mark.parametrize('name, key', [
+    ('Arango, Alejandro', 'alejandro arango'),
+    ('José Álvarez', 'jose alvarez'),
+    ('Robert (Bob) Jones', 'robert jones'),
+    ('  Mary-Jane   O\'Neil ', 'mary jane o neil'),
+])
+def test_normalize_name(name, key):
+    assert normalize_name(name) == key
+
+
+@pytest.mark.parametrize('key_a, key_b', [
+    ('alejandro arango', 'arango alejandro'),
+    ('john smith', 'john a smith'),
+    ('john a smith', 'john alan smith'),
+    ('j smith', 'john smith'),
+    ('chris lee', 'christopher lee'),
+    ('alex lee', 'alexander lee'),
+    ('john smith', 'john smyth'),
+])
+def test_same_person(key_a, key_b):
+    assert _is_same_person(key_a, key_b)
+    assert _is_same_person(key_b, key_a)
+
+
+@pytest.mark.parametrize('key_a, key_b', [
+    ('daniel kim', 'daniela kim'),
+    ('dan kim', 'daniela kim'),
+    ('chris lee', 'christina lee'),
+    ('alex lee', 'alexandra lee'),
+    ('john a smith', 'john b smith'),
+    ('john smith', 'jane smith'),
+    ('maria lopez', 'mario lopez'),
+])
+def test_different_people(key_a, key_b):
+    assert not _is_same_person(key_a, key_b)
+    assert not _is_same_person(key_b, key_a)
+
+
+def test_resolves_variants_within_university():
+    data = pd.DataFrame({
+        'University': ['U', 'U', 'U', 'V'],
+        'Name': ['Arango, Alejandro', 'Alejandro Arango', 'Alejandro Árango', 'Alejandro Arango'],
+    })
+    ids = resolve_person_ids(data)
+    assert ids.iloc[0] == ids.iloc[1] == ids.iloc[2]
+    assert ids.iloc[3] != ids.iloc[0]
+
+
+def test_conflicting_names_are_not_joined_through_a_shorter_name():
+    data = pd.DataFrame({'University': 'U', 'Name': ['John Smith', 'John A Smith', 'John B Smith']})
+    ids = resolve_person_ids(data)
+    assert ids.iloc[1] != ids.iloc[2]
+    assert ids.nunique() == 2
+
+
+def test_ids_are_stable_and_existing_ids_are_kept():
+    data = pd.DataFrame({'University': 'U', 'Name': ['Jane Doe', 'Daniel Kim']})
+    assert resolve_person_ids(data).tolist() == resolve_person_ids(data.iloc[::-1]).iloc[::-1].tolist()
+
+    existing = pd.DataFrame({'University': ['U'], 'Name': ['Doe, Jane'], 'Person_ID': ['known']})
+    ids = resolve_person_ids(pd.concat([existing[['University', 'Name']], data], ignore_index=True),
+                             existing=existing)
+    assert ids.tolist()[:2] == ['known', 'known']
+
+
+def test_empty_data():
+    assert resolve_person_ids(pd.DataFrame(columns=['University', 'Name'])).empty
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from scraper.src import page_cache, reextract, transport
+from scraper.src.page_cache import save_page, save_snapshot_list, save_live_entry
+from scraper.src.reextract import reextract_programs, _stored_snapshots
+
+LIVE = 'https://example.edu/students'
+ARCHIVED = 'http://web.archive.org/web/20240303000000/https://example.edu/students'
+PROGRAM = (LIVE, 'https://example.edu/placement', 'U')
+
+
+@pytest.fixture(autouse=True)
+def page_store(tmp_path, monkeypatch):
+    monkeypatch.setattr(page_cache, 'PAGE_CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(transport, '_index', {})
+    save_snapshot_list(LIVE, [ARCHIVED, LIVE])
+    save_page(ARCHIVED, '<p>archived</p>')
+
+
+def _dataset(snapshots):
+    return pd.DataFrame({'Name': ['Jane Doe'], 'University': ['U'], 'Snapshots': [np.array(snapshots)]})
+
+
+def test_live_page_is_read_from_the_live_entry():
+    save_live_entry(LIVE, {'hash': 'h', 'content': '<p>live</p>'})
+    stored = _stored_snapshots(PROGRAM, _dataset([ARCHIVED, LIVE]))
+    assert stored == [(ARCHIVED, '<p>archived</p>'), (LIVE, '<p>live</p>')]
+
+
+def test_program_without_its_live_page_is_skipped(monkeypatch):
+    dataset = _dataset([ARCHIVED, LIVE])
+    assert _stored_snapshots(PROGRAM, dataset) is None
+
+    monkeypatch.setattr(reextract, 'load_dataset', lambda: dataset)
+    monkeypatch.setattr(reextract, 'update_dataset', pytest.fail)
+    assert reextract_programs([PROGRAM], workers=1).empty
+
+
+def test_live_page_is_not_required_if_no_entry_was_found_on_it():
+    assert _stored_snapshots(PROGRAM, _dataset([ARCHIVED])) == [(ARCHIVED, '<p>archived</p>')]
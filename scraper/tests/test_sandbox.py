@@ -0,0 +1,64 @@
+import pytest
+
+from scraper.src import metrics
+from scraper.src.sandbox import SandboxPool
+from scraper.src.exceptions import ModuleError
+
+SOURCE = '<ul class="students"><li>Jane Doe</li><li>John Smith</li></ul>'
+
+VALID = """
+def extract_phd_student_names(soup):
+    return [li.get_text() for li in soup.select('ul.students li')]
+"""
+
+
+@pytest.fixture(scope='module')
+def sandbox():
+    pool = SandboxPool(1, 5, 256)
+    yield pool
+    pool.close()
+
+
+@pytest.fixture(autouse=True)
+def clean_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+def _stage_counts():
+    _, histograms = metrics._snapshot()
+    return {dict(labels)['stage']: histogram['count'] for (name, labels), histogram in histograms.items()
+            if name == 'stage_seconds'}
+
+
+def test_runs_module_and_records_worker_stages(sandbox):
+    assert sandbox.run(VALID, SOURCE) == ['Jane Doe', 'John Smith']
+    assert sandbox.run(VALID, SOURCE) == ['Jane Doe', 'John Smith']
+
+    assert _stage_counts() == {'parse_source': 2, 'extract_names': 2}
+
+
+def test_failing_module_records_stages_and_raises(sandbox):
+    with pytest.raises(ModuleError, match="Failed to execute"):
+        sandbox.run("def extract_phd_student_names(soup):\n    raise KeyError()\n", SOURCE)
+    assert _stage_counts() == {'parse_source': 1, 'extract_names': 1}
+
+    with pytest.raises(ModuleError, match="Failed to load"):
+        sandbox.run("def extract_phd_student_names(soup) return", SOURCE)
+
+
+def test_memory_limit_restarts_the_worker(sandbox):
+    with pytest.raises(ModuleError, match="memory limit"):
+        sandbox.run("def extract_phd_student_names(soup):\n    return [bytearray(10 ** 9)]\n", SOURCE)
+    assert sandbox.run(VALID, SOURCE) == ['Jane Doe', 'John Smith']
+
+
+def test_timeout_restarts_the_worker():
+    pool = SandboxPool(1, 1, 256)
+    try:
+        with pytest.raises(ModuleError, match="exceeded 1s"):
+            pool.run("def extract_phd_student_names(soup):\n    while True:\n        pass\n", SOURCE)
+        assert pool.run(VALID, SOURCE) == ['Jane Doe', 'John Smith']
+    finally:
+        pool.close()
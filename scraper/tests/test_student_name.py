@@ -0,0 +1,58 @@
+import pytest
+
+from scraper.src.student_name import validate_names, _find_missing_names, _is_in_source, _NameMatcher
+from scraper.src.exceptions import ValidationError
+
+SOURCE = """
+<ul>
+  <li><a href="/people/smith">John Smith</a></li>
+  <li>Mary-Jane &amp; O&#39;Neil</li>
+  <li><span>Robert</span> (Bob) <span>Jones</span></li>
+  <li>Arango, Alejandro</li>
+  <li>José   Álvarez</li>
+</ul>
+"""
+
+
+@pytest.mark.parametrize('name', [
+    'John Smith', 'john smith', 'Robert Jones', 'Robert (Bob) Jones', 'Alejandro Arango', 'Arango Alejandro',
+    'José Álvarez', "O'Neil", 'Mary Jane'
+])
+def test_finds_names_in_source(name):
+    assert _is_in_source(name, SOURCE)
+
+
+@pytest.mark.parametrize('name', ['John Jones', 'Smith John Robert', 'Jose Alvarez', 'Mary Jones', 'Bob Jones'])
+def test_misses_names_not_in_source(name):
+    assert not _is_in_source(name, SOURCE)
+
+
+def test_words_must_not_match_inside_other_words():
+    assert _find_missing_names('<p>Johnny Smithson</p>', ['John Smith']) == {'John Smith'}
+
+
+def test_finds_all_names_in_one_pass():
+    names = ['John Smith', 'Robert Jones', 'Alejandro Arango', 'Jane Doe', 'Nobody Here']
+    assert _find_missing_names(SOURCE, names) == {'Jane Doe', 'Nobody Here'}
+
+
+def test_matcher_handles_overlapping_patterns():
+    matcher = _NameMatcher({
+        ('a', 'b', 'c'): ['abc'],
+        ('b', 'c'): ['bc'],
+        ('b', 'd'): ['bd'],
+        ('c',): ['c'],
+    })
+    assert matcher.search(['a', 'b', 'c']) == {'abc', 'bc', 'c'}
+    assert matcher.search(['a', 'b', 'd']) == {'bd'}
+    assert matcher.search(['a', 'b', 'b', 'c']) == {'bc', 'c'}
+    assert matcher.search([]) == set()
+
+
+def test_validate_names_rejects_missing_name():
+    with pytest.raises(ValidationError):
+        validate_names(SOURCE, ['John Smith', 'Jane Doe'])
+
+
+def test_validate_names_accepts_present_names():
+    assert validate_names(SOURCE, ['John Smith', 'Alejandro Arango']) is not False
@@ -11,12 +11,45 @@ import ProgramSummary from './components/ProgramSummary';
 import SnapshotLinks from './components/SnapshotLinks';
 import ProgramIndex from './components/ProgramIndex';
 import StatisticsTab from './components/StatisticsTab'; // Import the new StatisticsTab component
-import { fetchVersions, fetchStudentData } from './utils/dataFetch';
-import { computeProgramSummary, computeProgramIndex } from './utils/dataProcess';
+import { fetchManifest, fetchStudentData, fetchAggregates } from './utils/dataFetch';
+import {
+    computeProgramSummary,
+    computeProgramSummaryFromAggregates,
+    computeProgramIndex,
+    computeProgramIndexFromAggregates,
+    deriveStudentDates
+} from './utils/dataProcess';
 import { formatValue } from './utils/helpers';
 // import { updateDatesAndCalculateAverage } from './utils/dataProcess';
 import './App.css';
 
+// The student data is only downloaded when the aggregate tables are missing, or when the students or snapshots
+// of a program are shown
+const loadStudentData = () => {
+    if (!window.studentDataRequest) {
+        window.studentDataRequest = fetchStudentData(window.manifest)
+            .then(data => {
+                window.studentData = data;
+                return data;
+            })
+            .catch(error => {
+                window.studentDataRequest = null;
+                throw error;
+            });
+    }
+    return window.studentDataRequest;
+};
+
+const programNames = () => {
+    if (window.aggregates) return window.aggregates.programs.map(row => row.University);
+    if (window.studentData) return Array.from(new Set(window.studentData.map(item => item.University)));
+    return [];
+};
+
+const studentsOf = (data, university) => university
+    ? data.filter(item => item.University.toLowerCase().includes(university.toLowerCase()))
+    : data;
+
 const App = () => {
     const [query, setQuery] = useState('');
     const [universities, setUniversities] = useState([]);
@@ -34,21 +67,37 @@ const App = () => {
     const searchInputRef = useRef(null);
 
     useEffect(() => {
-        fetchVersions()
-            .then(fetchStudentData)
-            .then(data => {
-                window.studentData = data;
+        fetchManifest()
+            .then(manifest => {
+                window.manifest = manifest;
+                return fetchAggregates(manifest);
+            })
+            .then(aggregates => {
+                window.aggregates = aggregates;
+                if (!aggregates) return loadStudentData();
             })
             .catch(error => console.error('Error fetching the JSON data:', error));
     }, []);
 
+    useEffect(() => {
+        if (!window.aggregates || !currentProgram || !['data', 'snapshots'].includes(activeTab)) return;
+        let cancelled = false;
+        loadStudentData()
+            .then(data => {
+                if (cancelled) return;
+                const matches = studentsOf(data, currentProgram === 'Overview' ? '' : currentProgram);
+                deriveStudentDates(matches);
+                setStats(matches);
+            })
+            .catch(error => console.error('Error fetching the JSON data:', error));
+        return () => { cancelled = true; };
+    }, [activeTab, currentProgram]);
+
     const fetchData = useCallback((query) => {
-        if (query && window.studentData) {
-            const matches = window.studentData.filter(item =>
-                item.University.toLowerCase().includes(query.toLowerCase())
-            );
-            const uniqueUniversities = Array.from(new Set(matches.map(item => item.University)));
-            setUniversities(uniqueUniversities);
+        if (query) {
+            setUniversities(programNames().filter(university =>
+                university.toLowerCase().includes(query.toLowerCase())
+            ));
         } else {
             setUniversities([]);
         }
@@ -92,10 +141,7 @@ const App = () => {
     }, []);
 
     const fetchAllPrograms = () => {
-        if (window.studentData) {
-            const uniqueUniversities = Array.from(new Set(window.studentData.map(item => item.University)));
-            setUniversities(uniqueUniversities);
-        }
+        setUniversities(programNames());
     };
 
     const handleSearchChange = (event) => {
@@ -110,12 +156,17 @@ const App = () => {
     };
 
     const handleStatistics = (university = '') => {
-        if (!window.studentData) return;
-        const filteredMatches = university ? window.studentData.filter(item => item.University.toLowerCase().includes(university.toLowerCase())) : window.studentData;
-
-        setStats(filteredMatches);
-        setProgramStatistics(computeProgramIndex(window.studentData));
-        setStatistics(computeProgramSummary(filteredMatches));
+        if (window.aggregates) {
+            setStats([]);
+            setProgramStatistics(computeProgramIndexFromAggregates(window.aggregates));
+            setStatistics(university ? computeProgramSummaryFromAggregates(window.aggregates, university) : {});
+        } else {
+            if (!window.studentData) return;
+            const filteredMatches = studentsOf(window.studentData, university);
+            setStats(filteredMatches);
+            setProgramStatistics(computeProgramIndex(window.studentData));
+            setStatistics(computeProgramSummary(filteredMatches));
+        }
         setCurrentProgram(university ? university : 'Overview');
         setActiveTab(university ? 'statistics' : 'programStatistics');
         setUniversities([]);
@@ -1,11 +1,69 @@
-export const fetchVersions = async () => {
+// The manifest names the data and aggregates files of the latest committed version; manifests of earlier
+// versions only hold the version number
+export const fetchManifest = async () => {
     const response = await fetch('/data/versions.json');
-    const versionData = await response.json();
-    return versionData.latest_version;
+    return await response.json();
 };
 
-export const fetchStudentData = async (latestVersion) => {
-    const response = await fetch(`/data/student_data_v${latestVersion}.json`);
+export const fetchStudentData = async (manifest) => {
+    const dataFile = manifest.data_file || `student_data_v${manifest.latest_version}.json`;
+    const response = await fetch(`/data/${dataFile}`);
     const data = await response.json();
-    return data;
-};
\ No newline at end of file
+    return decodeStudentData(data);
+};
+
+const formatTimestamp = (seconds) => new Date(seconds * 1000).toISOString().replace(/\D/g, '').slice(0, 14);
+
+// Rebuilds the snapshot URLs of a capture table: the archive prefix, the capture time and the archived page,
+// or the page itself for captures without a time
+export const captureUrls = (table) => {
+    let seconds = 0;
+    return table.page.map((page, index) => {
+        const delta = table.time[index];
+        if (delta === null) return table.pages[page];
+        seconds += delta;
+        return `${table.archive}${formatTimestamp(seconds)}/${table.pages[page]}`;
+    });
+};
+
+// Decodes a dataset file to student records. Files in the compact format store columns, with categorical
+// columns as categories and codes, and snapshots as delta-encoded indexes into the capture table of the
+// university. Files in the record format of earlier versions are returned as they are.
+export const decodeStudentData = (content) => {
+    if (Array.isArray(content)) return content;
+
+    const { columns, length } = content;
+    const records = Array.from({ length }, () => ({}));
+
+    Object.entries(columns).forEach(([column, values]) => {
+        if (column === 'Snapshots') {
+            const tables = values.captures.map(captureUrls);
+            const universities = columns.University.codes;
+            values.codes.forEach((deltas, row) => {
+                const urls = tables[universities[row]];
+                let index = 0;
+                records[row].Snapshots = deltas.map(delta => urls[index += delta]);
+            });
+        } else if (values && !Array.isArray(values)) {
+            values.codes.forEach((code, row) => {
+                records[row][column] = code < 0 ? null : values.categories[code];
+            });
+        } else {
+            values.forEach((value, row) => {
+                records[row][column] = value;
+            });
+        }
+    });
+    return records;
+};
+
+export const fetchAggregates = async (manifest) => {
+    if (!manifest.aggregates_file) return null;
+    try {
+        const response = await fetch(`/data/${manifest.aggregates_file}`);
+        if (!response.ok) return null;
+        return await response.json();
+    } catch (error) {
+        return null;
+    }
+};
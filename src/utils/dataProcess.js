@@ -130,12 +130,43 @@ const calculateAverageYearsToDegree = (data) => {
     return yearsCount > 0 ? (totalYears / yearsCount).toFixed(2) : 'N/A';
 };
 
-export const computeProgramIndex = (data) => {
+export const deriveStudentDates = (data) => {
     const programs = initialize_programs(data);
-    updateStatus(programs, data);
     updateSnapshotInfo(programs, data);
     updateDates(data, programs);
     updateTimeToDegree(data, programs);
+    return programs;
+};
+
+export const computeProgramIndexFromAggregates = (aggregates) => {
+    return aggregates.programs.map(row => ({
+        program: row.University,
+        totalEntries: row.Total_Entries,
+        currentlyActive: row.Currently_Active,
+        percentageOfPlacements: row.Placement_Rate.toFixed(2),
+        averageDuration: row.Mean_Years_To_Degree !== null ? row.Mean_Years_To_Degree.toFixed(2) : 'N/A',
+        earliestSnapshot: new Date(row.Earliest_Record).toLocaleDateString(),
+    }));
+};
+
+export const computeProgramSummaryFromAggregates = (aggregates, university) => {
+    const row = aggregates.programs.find(program => program.University === university);
+    if (!row) return null;
+    return {
+        totalEntries: row.Total_Entries,
+        percentageOfPlacements: row.Placement_Rate.toFixed(2),
+        currentlyActive: row.Currently_Active,
+        earliestSnapshot: new Date(row.Earliest_Record).toLocaleDateString(),
+        averageDuration: row.Mean_Years_To_Degree !== null ? row.Mean_Years_To_Degree.toFixed(2) : 'N/A',
+        programLink: row.URL,
+        placementLink: row.PlacementURL,
+        numberOfSnapshots: row.Snapshots,
+    };
+};
+
+export const computeProgramIndex = (data) => {
+    const programs = deriveStudentDates(data);
+    updateStatus(programs, data);
 
     return Object.keys(programs).map(program => {
         const stats = programs[program];